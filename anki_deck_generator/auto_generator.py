@@ -1,15 +1,33 @@
 import os
+import io
 import argparse
 import sys
 import re
-import shutil
-import json
-from datetime import datetime
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Tuple
+from typing import TYPE_CHECKING, Iterable, List, Optional, Dict, Any, Sequence, Tuple, Iterator
 
-from anki_deck_generator.core import create_dynamic_deck_generator, DeckGenerator
-from anki_deck_generator.config import CSV_DIR, OUTPUT_DIR, MEDIA_DIR, load_config, save_config
+from anki_deck_generator import profiling
+from anki_deck_generator.core import create_dynamic_deck_generator, DeckGenerator, iter_csv_chunks, DEFAULT_CHUNK_SIZE
+from anki_deck_generator.source import DeckSource
+from anki_deck_generator.ids import get_id_registry
+from anki_deck_generator.manifest import BuildManifest, config_fingerprint, snapshot_csv
+from anki_deck_generator.media_store import get_media_store
+from anki_deck_generator.merge import merge_packages
+from anki_deck_generator.history import GenerationHistory
+from anki_deck_generator.config import (
+    CSV_DIR, OUTPUT_DIR, MEDIA_DIR, DEFAULT_EXPORT_ENGINE, EXPORT_ENGINES, ensure_data_dirs, get_config, save_config
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Matches <img src="..."> (group 1) and [sound:...] (group 2) references
+MEDIA_REFERENCE_PATTERN = r'<img\s+src=["\']([^"\'>]+)["\']|\[sound:([^\]]+)\]'
+MEDIA_REFERENCE_REGEX = re.compile(MEDIA_REFERENCE_PATTERN)
 
 
 def discover_csv_files(csv_dir: Path = CSV_DIR) -> List[str]:
@@ -34,67 +52,119 @@ def discover_csv_files(csv_dir: Path = CSV_DIR) -> List[str]:
     return csv_files
 
 
-def process_media_files(csv_path: str, generator: DeckGenerator) -> List[str]:
+def process_media_files(
+    csv_path: str,
+    generator: DeckGenerator,
+    chunksize: int = DEFAULT_CHUNK_SIZE,
+    source: Optional[DeckSource] = None
+) -> List[str]:
     """
     Process media files referenced in the CSV and add them to the deck.
     
+    Every referenced name, whether or not the file exists, is kept in
+    generator.media_references.
+    
     Args:
         csv_path: Path to the CSV file
         generator: The deck generator instance
+        chunksize: Maximum number of CSV rows scanned at once
+        source: Optional already-parsed source for csv_path; when given its rows
+            are scanned instead of re-reading the file in chunks
         
     Returns:
         List of media files that were added to the deck
     """
     try:
-        import pandas as pd
-        import genanki
-        import re
-        
-        # Read the CSV file
-        df = pd.read_csv(csv_path)
-        
-        # Patterns to match media references
-        img_pattern = re.compile(r'<img\s+src=["\']([^"\'>]+)["\']')
-        sound_pattern = re.compile(r'\[sound:([^\]]+)\]')
-        
-        # Track processed media files
-        media_files = []
-        
-        # Process each cell in the dataframe
-        for _, row in df.iterrows():
-            for col in df.columns:
-                cell = str(row[col])
-                
-                # Process image references
-                for img_match in img_pattern.finditer(cell):
-                    img_path = img_match.group(1)
-                    # Check if it's a local file path
-                    if not img_path.startswith(('http://', 'https://')):  
-                        # Check if the file exists in the media directory
-                        full_path = os.path.join(MEDIA_DIR, os.path.basename(img_path))
-                        if os.path.exists(full_path):
-                            media_files.append(full_path)
-                
-                # Process sound references
-                for sound_match in sound_pattern.finditer(cell):
-                    sound_path = sound_match.group(1)
-                    # Check if the file exists in the media directory
-                    full_path = os.path.join(MEDIA_DIR, os.path.basename(sound_path))
-                    if os.path.exists(full_path):
-                        media_files.append(full_path)
-        
-        return media_files
+        with generator.profile_stage('media') as counters:
+            # Collect the unique referenced file names, one chunk of rows at a time
+            referenced: Dict[str, None] = {}
+            if source is not None and source.load().has_rows:
+                referenced = dict.fromkeys(extract_media_references_from_rows(source.rows))
+                counters['rows'] += len(source.rows)
+            else:
+                chunks = [source.frame] if source is not None else iter_csv_chunks(csv_path, chunksize=chunksize)
+                for df in chunks:
+                    for name in extract_media_references(df):
+                        referenced.setdefault(name, None)
+                    counters['rows'] += len(df)
+            counters['bytes'] += source.size if source is not None else os.path.getsize(csv_path)
+            generator.media_references = list(referenced)
+            
+            # Keep the references that exist in the media store's directory
+            return get_media_store(MEDIA_DIR).resolve(referenced)
     except Exception as e:
         print(f"Error processing media files: {e}")
         return []
 
 
+def extract_media_references(df: 'pd.DataFrame') -> List[str]:
+    """
+    Extract the media file names referenced anywhere in a DataFrame.
+    
+    All cells are matched at once with a vectorized extractall instead of
+    running the regexes cell by cell. Remote images (http/https) are ignored.
+    
+    Args:
+        df: DataFrame of CSV rows
+        
+    Returns:
+        Unique referenced file names (basenames), in order of first appearance
+    """
+    import pandas as pd
+
+    # Flatten every column into one Series of non-empty cells
+    cells = pd.Series(df.to_numpy().ravel(), dtype=object).dropna().astype(str)
+    if cells.empty:
+        return []
+    
+    matches = cells.str.extractall(MEDIA_REFERENCE_PATTERN)
+    if matches.empty:
+        return []
+    
+    # Column 0 holds <img src="..."> paths, column 1 holds [sound:...] paths
+    images = matches[0].dropna()
+    images = images[~images.str.startswith(('http://', 'https://'))]
+    references = pd.concat([images, matches[1].dropna()]).sort_index(kind='stable')
+    
+    return pd.unique(references.map(os.path.basename)).tolist()
+
+
+def extract_media_references_from_rows(rows: Iterable[Sequence[str]]) -> List[str]:
+    """
+    Extract the media file names referenced in rows parsed with the csv module.
+    
+    Gives the same result as extract_media_references without pandas, which
+    is faster for small decks. Remote images (http/https) are ignored.
+    
+    Args:
+        rows: Rows of cell strings
+        
+    Returns:
+        Unique referenced file names (basenames), in order of first appearance
+    """
+    references: Dict[str, None] = {}
+    for row in rows:
+        for cell in row:
+            if '<' not in cell and '[' not in cell:
+                continue
+            for image, sound in MEDIA_REFERENCE_REGEX.findall(cell):
+                if image:
+                    if image.startswith(('http://', 'https://')):
+                        continue
+                    references.setdefault(os.path.basename(image), None)
+                else:
+                    references.setdefault(os.path.basename(sound), None)
+    return list(references)
+
+
 def generate_deck_from_csv(
     csv_path: str, 
     output_dir: Path = OUTPUT_DIR, 
     language: str = 'generic',
-    custom_config: Optional[Dict[str, Any]] = None
-) -> Tuple[str, List[str]]:
+    custom_config: Optional[Dict[str, Any]] = None,
+    chunksize: Optional[int] = None,
+    engine: str = DEFAULT_EXPORT_ENGINE
+) -> Tuple[str, List[str], List[str]]:
     """
     Generate an Anki deck from a CSV file.
     
@@ -102,89 +172,126 @@ def generate_deck_from_csv(
         csv_path: Path to the CSV file
         output_dir: Directory to save the generated APKG file
         language: Language tag for the deck
+        custom_config: Optional custom configuration to use
+        chunksize: If set, stream the CSV in chunks of this many rows so memory
+            stays bounded for very large files
+        engine: APKG export engine, 'genanki' or 'sqlite'
         
     Returns:
-        Path to the generated APKG file
+        Tuple of (path to the generated APKG file, media files packaged with
+        the deck, every media name the deck references); the path is empty
+        if the build failed
     """
     try:
-        # Load configuration
-        config = custom_config or load_config()
-        
-        # Create deck generator
-        generator = create_dynamic_deck_generator(csv_path, language, config)
-        
-        # Extract filename without extension
-        filename = os.path.basename(csv_path)
-        base_name = os.path.splitext(filename)[0]
-        
-        # Define output path
-        output_path = str(output_dir / f"{base_name}.apkg")
-        
-        # Print the tags that were applied to the deck
-        print(f"\nApplied tags: {', '.join(generator.tags)}")
-        
-        # Generate deck from CSV
-        columns, field_mapping = generator.model.fields, {field['name']: field['name'] for field in generator.model.fields}
-        generator.generate_from_csv(csv_path, field_mapping)
-        
-        # Process media files if enabled
-        media_files = []
-        if config.get('media_enabled', True):
-            media_files = process_media_files(csv_path, generator)
-            if media_files:
-                print(f"Found {len(media_files)} media files to include in the deck")
-        
-        # Create a package with media files if any were found
-        if media_files:
-            import genanki
-            package = genanki.Package(generator.deck)
-            package.media_files = media_files
-            package.write_to_file(output_path)
-        else:
-            # Export to APKG without media
-            generator.export_to_apkg(output_path)
-        
-        # Record this generation in the history
-        record_generation_history(csv_path, output_path, generator.tags)
-        
-        return output_path, media_files
-        
-    
+        with profiling.deck(os.path.basename(csv_path)) as deck_counters:
+            started = time.perf_counter()
+            timings: Dict[str, float] = {}
+            
+            # Load configuration
+            config = custom_config or get_config()
+            
+            # Parse the CSV once and share it between all build stages. In
+            # streaming mode only the header is read from it.
+            source = DeckSource(csv_path)
+            deck_counters['bytes'] += source.size
+            if not chunksize:
+                with profiling.stage('parse') as counters:
+                    source.load()
+                    counters['rows'] += source.row_count
+                    counters['bytes'] += source.size
+            
+            # Create deck generator
+            generator = create_dynamic_deck_generator(csv_path, language, config, source=source)
+            timings['parse'] = time.perf_counter() - started
+            
+            # Define output path
+            output_path = deck_output_path(csv_path, output_dir)
+            
+            # Print the tags that were applied to the deck
+            print(f"\nApplied tags: {', '.join(generator.tags)}")
+            
+            columns, field_mapping = generator.model.fields, {field['name']: field['name'] for field in generator.model.fields}
+            
+            # Process media files if enabled
+            media_files = []
+            if config.get('media_enabled', True):
+                if chunksize:
+                    media_files = process_media_files(csv_path, generator, chunksize)
+                else:
+                    media_files = process_media_files(csv_path, generator, source=source)
+                if media_files:
+                    print(f"Found {len(media_files)} media files to include in the deck")
+            timings['media'] = time.perf_counter() - started - sum(timings.values())
+            
+            if chunksize:
+                # Stream notes straight into the package
+                note_count = generator.stream_to_apkg(
+                    csv_path, field_mapping, output_path, media_files=media_files, chunksize=chunksize, engine=engine
+                )
+                timings['export'] = time.perf_counter() - started - sum(timings.values())
+                deck_counters['rows'] += note_count
+                record_generation_history(
+                    csv_path, output_path, generator.tags, note_count, time.perf_counter() - started, timings
+                )
+                return output_path, media_files, generator.media_references
+            
+            # Generate deck from CSV
+            generator.generate_from_csv(csv_path, field_mapping, source=source)
+            timings['notes'] = time.perf_counter() - started - sum(timings.values())
+            
+            # Export to APKG, including media files if any were found
+            generator.export_to_apkg(output_path, media_files=media_files, engine=engine)
+            timings['export'] = time.perf_counter() - started - sum(timings.values())
+            deck_counters['rows'] += len(generator.note_rows)
+            
+            # Record this generation in the history
+            record_generation_history(
+                csv_path, output_path, generator.tags, len(generator.note_rows), time.perf_counter() - started, timings
+            )
+            
+            return output_path, media_files, generator.media_references
+
     except Exception as e:
         print(f"Error generating deck from {csv_path}: {e}")
-        return "", []
+        return "", [], []
 
 
-def record_generation_history(csv_path: str, output_path: str, tags: List[str]) -> None:
+def deck_output_path(csv_path: str, output_dir: Path = OUTPUT_DIR) -> str:
+    """Return the path of the APKG file generated for a CSV file."""
+    base_name = os.path.splitext(os.path.basename(csv_path))[0]
+    return str(Path(output_dir) / f"{base_name}.apkg")
+
+
+def record_generation_history(
+    csv_path: str,
+    output_path: str,
+    tags: List[str],
+    note_count: Optional[int] = None,
+    duration: Optional[float] = None,
+    timings: Optional[Dict[str, float]] = None
+) -> None:
     """
-    Record the generation of a deck in the history file.
+    Record the generation of a deck in the history database.
     
     Args:
         csv_path: Path to the CSV file
         output_path: Path to the generated APKG file
         tags: Tags applied to the deck
+        note_count: Number of notes in the deck
+        duration: Total build time in seconds
+        timings: Seconds spent in each build stage
     """
     try:
-        history_file = os.path.join(OUTPUT_DIR, 'generation_history.json')
-        
-        # Load existing history or create new
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
-        
-        # Add new entry
-        history.append({
-            'csv_file': os.path.basename(csv_path),
-            'output_file': os.path.basename(output_path),
-            'tags': tags,
-            'timestamp': datetime.now().isoformat(),
-        })
-        
-        # Save updated history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=4)
+        # A single append; parallel builds are serialized by SQLite
+        with GenerationHistory() as history:
+            history.record(
+                os.path.basename(csv_path),
+                os.path.basename(output_path),
+                tags,
+                note_count=note_count,
+                duration=duration,
+                timings=timings
+            )
     except Exception as e:
         print(f"Error recording generation history: {e}")
 
@@ -202,70 +309,104 @@ def merge_decks(output_files: List[str], output_name: str, output_dir: Path = OU
         Path to the merged deck
     """
     try:
-        import genanki
-        import zipfile
-        import tempfile
-        import sqlite3
-        import shutil
+        merged_path = os.path.join(output_dir, f"{output_name}.apkg")
+        # Keyed apart from the CSV base names, which a merge name may equal
+        deck_id = get_id_registry().ids_for(f"merge:{output_name}")[1]
         
-        # Create a temporary directory for extraction
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Create a new deck for the merged content
-            merged_deck = genanki.Deck(
-                deck_id=abs(hash(output_name)) % (10**10),
-                name=output_name
-            )
-            
-            # Track all media files
-            all_media_files = []
-            
-            # Process each deck file
-            for deck_file in output_files:
-                if not os.path.exists(deck_file):
-                    print(f"Warning: Deck file not found: {deck_file}")
-                    continue
-                    
-                # Extract the deck file
-                deck_extract_dir = os.path.join(temp_dir, os.path.basename(deck_file))
-                os.makedirs(deck_extract_dir, exist_ok=True)
-                
-                with zipfile.ZipFile(deck_file, 'r') as zip_ref:
-                    zip_ref.extractall(deck_extract_dir)
-                
-                # Connect to the database
-                db_path = os.path.join(deck_extract_dir, 'collection.anki2')
-                if not os.path.exists(db_path):
-                    print(f"Warning: No collection found in {deck_file}")
-                    continue
-                    
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                
-                # Extract notes and add to merged deck
-                cursor.execute("SELECT id, flds, tags, mid FROM notes")
-                for note_id, fields, tags, model_id in cursor.fetchall():
-                    # We can't directly add these notes to the merged deck
-                    # Just count them for now
-                    all_media_files.append(note_id)
-                
-                conn.close()
-            
-            # For now, just return a message about the limitation
-            merged_path = os.path.join(output_dir, f"{output_name}.apkg")
-            print(f"Note: Full deck merging requires the AnkiConnect API. Found {len(all_media_files)} notes across {len(output_files)} decks.")
-            print(f"For now, please import each deck individually into Anki.")
-            
-            # Copy the first deck as a placeholder
-            if output_files:
-                shutil.copy(output_files[0], merged_path)
-                return merged_path
-            
-            return ""
+        notes, cards, duplicates = merge_packages(output_files, merged_path, deck_id, output_name)
+        
+        print(f"Merged {notes} notes ({cards} cards) from {len(output_files)} decks into {merged_path}")
+        if duplicates:
+            print(f"Skipped {duplicates} duplicate notes")
+        
+        return merged_path
     except Exception as e:
         print(f"Error merging decks: {e}")
         return ""
 
 
+def _generate_deck_worker(
+    csv_path: str,
+    output_dir: Path,
+    language: str,
+    config: Dict[str, Any],
+    chunksize: Optional[int],
+    engine: str,
+    profile_memory: Optional[bool] = None
+) -> Tuple[str, List[str], List[str], str, List[Dict[str, Any]]]:
+    """
+    Build one deck in a worker process, capturing its console output.
+    
+    Args:
+        profile_memory: If set, profile the build (tracing memory if True)
+    
+    Returns:
+        The result of generate_deck_from_csv plus everything it printed and
+        the profiled deck records (empty unless profiling)
+    """
+    log = io.StringIO()
+    profiler = profiling.BuildProfiler(profile_memory) if profile_memory is not None else None
+    with contextlib.redirect_stdout(log), profiler or contextlib.nullcontext():
+        output_file, media_files, references = generate_deck_from_csv(
+            csv_path, output_dir, language, config, chunksize, engine
+        )
+    return output_file, media_files, references, log.getvalue(), profiler.decks if profiler else []
+
+
+def _build_decks(
+    csv_files: List[str],
+    output_dir: Path,
+    language: str,
+    config: Dict[str, Any],
+    chunksize: Optional[int],
+    engine: str,
+    jobs: int
+) -> Iterator[Tuple[str, str, List[str], List[str]]]:
+    """
+    Build decks sequentially or across a process pool.
+    
+    Results are yielded in the order of csv_files. A deck that fails, even by
+    crashing its worker, yields an empty output path without affecting the others.
+    
+    Yields:
+        Tuples of (csv_file, output_file, media_files, media_references)
+    """
+    if jobs <= 1 or len(csv_files) <= 1:
+        for csv_file in csv_files:
+            print(f"\nProcessing {os.path.basename(csv_file)}...")
+            yield (csv_file, *generate_deck_from_csv(csv_file, output_dir, language, config, chunksize, engine))
+        return
+    
+    # Assign IDs up front so the workers only ever read the ID registry
+    registry = get_id_registry()
+    for csv_file in csv_files:
+        registry.ids_for(os.path.splitext(os.path.basename(csv_file))[0])
+    
+    # Workers profile their own builds and send the records back
+    profiler = profiling.get_profiler()
+    profile_memory = profiler.trace_memory if profiler else None
+    
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            (csv_file, executor.submit(
+                _generate_deck_worker, csv_file, output_dir, language, config, chunksize, engine, profile_memory
+            ))
+            for csv_file in csv_files
+        ]
+        for csv_file, future in futures:
+            print(f"\nProcessing {os.path.basename(csv_file)}...")
+            try:
+                output_file, media_files, references, log, profiled_decks = future.result()
+            except Exception as e:
+                print(f"Error generating deck from {csv_file}: {e}")
+                yield csv_file, "", [], []
+                continue
+            print(log, end='')
+            if profiler:
+                profiler.add_decks(profiled_decks)
+            yield csv_file, output_file, media_files, references
+
+
 def generate_decks_from_directory(
     csv_dir: Path = CSV_DIR, 
     output_dir: Path = OUTPUT_DIR, 
@@ -273,11 +414,19 @@ def generate_decks_from_directory(
     specific_files: Optional[List[str]] = None,
     merge_output: bool = False,
     merge_name: Optional[str] = None,
-    custom_config: Optional[Dict[str, Any]] = None
+    custom_config: Optional[Dict[str, Any]] = None,
+    chunksize: Optional[int] = None,
+    engine: str = DEFAULT_EXPORT_ENGINE,
+    force: bool = False,
+    jobs: int = 1
 ) -> List[str]:
     """
     Generate Anki decks from all CSV files in a directory.
     
+    Decks whose CSV, build-relevant configuration and media are unchanged since
+    the last build (according to the build manifest in output_dir) are skipped
+    unless force is set; their existing APKG files are still returned.
+    
     Args:
         csv_dir: Directory containing CSV files
         output_dir: Directory to save the generated APKG files
@@ -286,11 +435,19 @@ def generate_decks_from_directory(
         merge_output: Whether to merge all generated decks into a single deck
         merge_name: Name for the merged deck (required if merge_output is True)
         custom_config: Optional custom configuration to use
+        chunksize: If set, stream each CSV in chunks of this many rows
+        engine: APKG export engine, 'genanki' or 'sqlite'
+        force: Rebuild every deck even if it is up to date
+        jobs: Number of decks built in parallel worker processes
         
     Returns:
         List of paths to the generated APKG files
     """
+    csv_dir = Path(csv_dir)
+    output_dir = Path(output_dir)
+    
     # Ensure directories exist
+    ensure_data_dirs()
     os.makedirs(output_dir, exist_ok=True)
     
     # Discover CSV files
@@ -304,20 +461,46 @@ def generate_decks_from_directory(
         return []
     
     # Load configuration
-    config = custom_config or load_config()
+    config = custom_config or get_config()
+    
+    # Load the build manifest to skip decks whose inputs are unchanged
+    media_store = get_media_store(MEDIA_DIR)
+    manifest = BuildManifest(output_dir, media_store)
+    config_digest = config_fingerprint(config, language)
+    
+    # Work out which decks need rebuilding, hashing their CSV files before
+    # the build reads them so edits made during it are not recorded as built
+    built_outputs: Dict[str, str] = {}
+    pending = []
+    snapshots: Dict[str, Dict[str, Any]] = {}
+    for csv_file in csv_files:
+        expected_output = deck_output_path(csv_file, output_dir)
+        if not force and manifest.is_up_to_date(csv_file, expected_output, config_digest):
+            built_outputs[csv_file] = expected_output
+        else:
+            pending.append(csv_file)
+            snapshots[csv_file] = snapshot_csv(csv_file)
+    skipped = len(built_outputs)
     
     # Generate decks
-    output_files = []
     all_media_files = []
-    for csv_file in csv_files:
-        print(f"\nProcessing {os.path.basename(csv_file)}...")
-        output_file, media_files = generate_deck_from_csv(csv_file, output_dir, language, config)
+    for csv_file, output_file, media_files, references in _build_decks(
+        pending, output_dir, language, config, chunksize, engine, jobs
+    ):
         if output_file:
-            output_files.append(output_file)
+            manifest.record(csv_file, output_file, config_digest, snapshots[csv_file], media_files, references)
+            built_outputs[csv_file] = output_file
             all_media_files.extend(media_files)
             if media_files:
                 print(f"Added {len(media_files)} media files to the deck.")
     
+    output_files = [built_outputs[csv_file] for csv_file in csv_files if csv_file in built_outputs]
+    
+    manifest.save()
+    media_store.save()
+    if skipped:
+        print(f"\n{skipped} deck(s) up to date, skipped (use --force to rebuild).")
+    
     # Merge decks if requested
     if merge_output and output_files and merge_name:
         print(f"\nMerging {len(output_files)} decks into {merge_name}...")
@@ -357,6 +540,32 @@ def main():
         help='Specific CSV files to process (filenames only, not full paths)'
     )
     
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Stream each CSV in chunks of this many rows to bound memory use'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=EXPORT_ENGINES,
+        default=DEFAULT_EXPORT_ENGINE,
+        help='APKG export engine (sqlite bulk-inserts notes and is much faster for large decks)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild every deck, even those whose inputs are unchanged since the last build'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of decks to build in parallel worker processes'
+    )
+    
     args = parser.parse_args()
     
     # Set directories
@@ -368,7 +577,11 @@ def main():
         csv_dir=csv_directory,
         output_dir=output_directory,
         language=args.language,
-        specific_files=args.files
+        specific_files=args.files,
+        chunksize=args.chunk_size,
+        engine=args.engine,
+        force=args.force,
+        jobs=args.jobs
     )
     
     # Print summary
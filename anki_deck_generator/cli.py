@@ -1,9 +1,10 @@
+import os
 import argparse
 import sys
+import contextlib
 from typing import List, Optional
 
-from anki_deck_generator.auto_generator import generate_decks_from_directory
-from anki_deck_generator.config import CSV_DIR, OUTPUT_DIR, SUPPORTED_LANGUAGES
+from anki_deck_generator.config import CSV_DIR, OUTPUT_DIR, SUPPORTED_LANGUAGES, DEFAULT_EXPORT_ENGINE, EXPORT_ENGINES
 
 
 def main():
@@ -37,8 +38,50 @@ def main():
         help='Specific CSV files to process (filenames only, not full paths)'
     )
     
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Stream each CSV in chunks of this many rows to bound memory use'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=EXPORT_ENGINES,
+        default=DEFAULT_EXPORT_ENGINE,
+        help='APKG export engine (sqlite bulk-inserts notes and is much faster for large decks)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild every deck, even those whose inputs are unchanged since the last build'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of decks to build in parallel worker processes'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record time and peak memory of every build stage and print a summary table'
+    )
+    
+    parser.add_argument(
+        '--profile-report',
+        type=str,
+        help='Path of the JSON profile report (defaults to profile.json in the output directory)'
+    )
+    
     # Parse arguments
     args = parser.parse_args()
+
+    # Imported after parsing so --help does not load genanki and pandas
+    from anki_deck_generator import profiling
+    from anki_deck_generator.auto_generator import generate_decks_from_directory
     
     # Set directories
     csv_directory = args.csv_dir or CSV_DIR
@@ -46,13 +89,19 @@ def main():
     
     print(f"🔍 Scanning for CSV files in {csv_directory}...")
     
-    # Generate decks
-    generated_files = generate_decks_from_directory(
-        csv_dir=csv_directory,
-        output_dir=output_directory,
-        language=args.language,
-        specific_files=args.files
-    )
+    # Generate decks, profiling the build if requested
+    profiler = profiling.BuildProfiler() if args.profile else None
+    with profiler or contextlib.nullcontext():
+        generated_files = generate_decks_from_directory(
+            csv_dir=csv_directory,
+            output_dir=output_directory,
+            language=args.language,
+            specific_files=args.files,
+            chunksize=args.chunk_size,
+            engine=args.engine,
+            force=args.force,
+            jobs=args.jobs
+        )
     
     # Print summary
     if generated_files:
@@ -62,6 +111,10 @@ def main():
     else:
         print("❌ No decks were generated.")
 
+    if profiler:
+        report_path = args.profile_report or os.path.join(output_directory, profiling.DEFAULT_REPORT_NAME)
+        profiling.finish_profile(profiler, report_path)
+
 
 if __name__ == '__main__':
     main()
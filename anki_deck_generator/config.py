@@ -1,7 +1,8 @@
 import os
 import json
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 
 # Project root directory
 ROOT_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,15 +14,15 @@ MEDIA_DIR = ROOT_DIR / 'media'
 TEMPLATES_DIR = ROOT_DIR / 'templates'
 CONFIG_DIR = ROOT_DIR / 'config'
 
-# Ensure directories exist
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(MEDIA_DIR, exist_ok=True)
-os.makedirs(TEMPLATES_DIR, exist_ok=True)
-os.makedirs(CONFIG_DIR, exist_ok=True)
-
 # Default configuration file
 DEFAULT_CONFIG_FILE = CONFIG_DIR / 'config.json'
 
+# Export engines accepted by DeckGenerator.export_to_apkg
+GENANKI_ENGINE = 'genanki'
+SQLITE_ENGINE = 'sqlite'
+EXPORT_ENGINES = (GENANKI_ENGINE, SQLITE_ENGINE)
+DEFAULT_EXPORT_ENGINE = GENANKI_ENGINE
+
 # Supported languages
 SUPPORTED_LANGUAGES = [
     'spanish',
@@ -75,45 +76,212 @@ DEFAULT_CONFIG = {
         'grammar': True,
         'content': True,
         'language_construct': True,
-        'filename': True
+        'filename': True,
+        'note_content': True  # Per-note tags from cell contents
     },
     'templates': {      # Custom templates for different card types
         'basic': DEFAULT_BASIC_TEMPLATE,
         'cloze': DEFAULT_CLOZE_TEMPLATE
     },
     'css': DEFAULT_CSS,  # Custom CSS for cards
-    'media_enabled': True  # Enable/disable media support
+    'media_enabled': True,  # Enable/disable media support
+    'share_models': True  # Decks with the same fields and card types share one note type
 }
 
 
-def load_config() -> Dict[str, Any]:
-    """Load configuration from file or create default if it doesn't exist."""
-    if not os.path.exists(DEFAULT_CONFIG_FILE):
-        # Create default configuration file
-        with open(DEFAULT_CONFIG_FILE, 'w') as f:
-            json.dump(DEFAULT_CONFIG, f, indent=4)
-        return DEFAULT_CONFIG
+def ensure_data_dirs() -> None:
+    """
+    Create the data directories if they do not exist yet.
 
-    try:
-        with open(DEFAULT_CONFIG_FILE, 'r') as f:
-            config = json.load(f)
+    This is done by the commands that write to them rather than on import,
+    so read-only commands never touch the file system.
+    """
+    for directory in (OUTPUT_DIR, MEDIA_DIR, TEMPLATES_DIR, CONFIG_DIR):
+        os.makedirs(directory, exist_ok=True)
 
-        # Ensure all required keys are present
-        for key, value in DEFAULT_CONFIG.items():
-            if key not in config:
-                config[key] = value
 
-        return config
-    except Exception as e:
-        print(f"Error loading configuration: {e}")
-        return DEFAULT_CONFIG
+class FrozenDict(dict):
+    """
+    Read-only dict used for configuration snapshots.
+
+    It is still a dict, so it can be passed to json.dumps and anything else
+    that expects the configuration dictionary, but it cannot be modified.
+    Use thaw() to get a mutable copy.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Configuration snapshots are read-only; use load_config() for a mutable copy')
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self) -> 'FrozenDict':
+        return self
+
+    def __deepcopy__(self, memo) -> 'FrozenDict':
+        return self
+
+    def thaw(self) -> Dict[str, Any]:
+        """Return a mutable deep copy."""
+        return _thaw(self)
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts and lists to their read-only counterparts."""
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Recursively convert a frozen value back to plain dicts and lists."""
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class ConfigCache:
+    """
+    Cache of the parsed configuration file, keyed on its mtime and size.
+
+    get() costs one stat call while the file is unchanged and returns the
+    same immutable snapshot every time. When the file changes on disk it is
+    parsed again, the version number is bumped and registered listeners are
+    called with the new snapshot, so long-running processes pick up edits
+    without a restart.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CONFIG_FILE):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the configuration JSON file
+        """
+        self.path = Path(path)
+        self.version = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self._snapshot: Optional[FrozenDict] = None
+        self._listeners: List[Callable[[FrozenDict], None]] = []
+        self._lock = threading.Lock()
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stats = os.stat(self.path)
+        except OSError:
+            return None
+        return stats.st_mtime_ns, stats.st_size
+
+    def get(self) -> FrozenDict:
+        """Return the current configuration, re-reading the file only if it changed."""
+        signature = self._stat()
+        if signature is not None and signature == self._signature:
+            return self._snapshot
+
+        with self._lock:
+            signature = self._stat()
+            if signature is not None and signature == self._signature:
+                return self._snapshot
+
+            if signature is None:
+                # Create default configuration file
+                os.makedirs(self.path.parent, exist_ok=True)
+                with open(self.path, 'w') as f:
+                    json.dump(DEFAULT_CONFIG, f, indent=4)
+                config = dict(DEFAULT_CONFIG)
+                signature = self._stat()
+            else:
+                try:
+                    with open(self.path, 'r') as f:
+                        config = json.load(f)
+
+                    # Ensure all required keys are present
+                    for key, value in DEFAULT_CONFIG.items():
+                        if key not in config:
+                            config[key] = value
+                except Exception as e:
+                    print(f"Error loading configuration: {e}")
+                    config = dict(DEFAULT_CONFIG)
+
+            changed = self._snapshot is not None
+            self._snapshot = _freeze(config)
+            self._signature = signature
+            self.version += 1
+            snapshot = self._snapshot
+            listeners = list(self._listeners)
+
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    print(f"Error in configuration listener: {e}")
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Forget the cached snapshot so the next get() reads the file again."""
+        with self._lock:
+            self._signature = None
+
+    def subscribe(self, listener: Callable[[FrozenDict], None]) -> Callable[[], None]:
+        """
+        Register a function to call with the new snapshot whenever the configuration changes.
+
+        Args:
+            listener: Function taking the new configuration snapshot
+
+        Returns:
+            A function that removes the listener again
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return unsubscribe
+
+
+_config_cache = ConfigCache()
+
+
+def get_config() -> FrozenDict:
+    """Return an immutable snapshot of the current configuration."""
+    return _config_cache.get()
+
+
+def config_version() -> int:
+    """Return a number that changes every time the configuration is reloaded."""
+    _config_cache.get()
+    return _config_cache.version
+
+
+def on_config_change(listener: Callable[[FrozenDict], None]) -> Callable[[], None]:
+    """Call listener with the new snapshot whenever the configuration file changes."""
+    return _config_cache.subscribe(listener)
+
+
+def load_config() -> Dict[str, Any]:
+    """Load the configuration as a mutable copy (use get_config() for read-only access)."""
+    return get_config().thaw()
 
 
 def save_config(config: Dict[str, Any]) -> bool:
     """Save configuration to file."""
     try:
+        os.makedirs(DEFAULT_CONFIG_FILE.parent, exist_ok=True)
         with open(DEFAULT_CONFIG_FILE, 'w') as f:
             json.dump(config, f, indent=4)
+        _config_cache.invalidate()
         return True
     except Exception as e:
         print(f"Error saving configuration: {e}")
@@ -121,13 +289,10 @@ def save_config(config: Dict[str, Any]) -> bool:
 
 
 def get_custom_tags(filename: str, config: Optional[Dict[str, Any]] = None) -> List[str]:
-    """Get custom tags for a CSV file based on patterns in the configuration."""
-    if config is None:
-        config = load_config()
+    """Get custom tags for a CSV file name based on the glob patterns in the configuration."""
+    from anki_deck_generator.tagging import get_tag_engine
 
-    custom_tags = []
-    for pattern, tags in config.get('custom_tags', {}).items():
-        if pattern in filename:
-            custom_tags.extend(tags)
+    if config is None:
+        config = get_config()
 
-    return custom_tags
+    return get_tag_engine(config).custom_tags(filename)
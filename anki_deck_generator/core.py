@@ -1,12 +1,62 @@
 import genanki
-import pandas as pd
 import os
 import uuid
 import re
-from typing import Dict, List, Optional, Any, Tuple
+import tempfile
+import itertools
+import contextlib
+from typing import TYPE_CHECKING, Dict, List, Optional, Any, Sequence, Tuple, Iterator, Callable, Union
 
 # Import configuration functions
-from anki_deck_generator.config import load_config, get_custom_tags, DEFAULT_CSS
+from anki_deck_generator import profiling
+from anki_deck_generator.config import get_config, DEFAULT_CSS, DEFAULT_EXPORT_ENGINE, EXPORT_ENGINES, SQLITE_ENGINE
+from anki_deck_generator.source import DeckSource
+from anki_deck_generator.ids import get_id_registry
+from anki_deck_generator.tagging import TagEngine, TAGS_COLUMN, get_tag_engine
+from anki_deck_generator.templates import (
+    compile_templates,
+    model_schema_digest,
+    shared_model_id,
+    shared_model_name,
+)
+from anki_deck_generator.apkg_writer import (
+    ApkgWriter,
+    write_genanki_collection,
+    write_package_file,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Number of CSV rows held in memory at once when streaming a deck
+DEFAULT_CHUNK_SIZE = 10000
+
+# Tag settings for generators without a tag engine: only the Tags column is used
+NO_CONTENT_TAGS_CONFIG = {'tag_filters': {'note_content': False}}
+
+
+def iter_csv_chunks(
+    csv_path: str,
+    columns: Optional[Union[List[str], Callable[[str], bool]]] = None,
+    chunksize: int = DEFAULT_CHUNK_SIZE
+) -> Iterator['pd.DataFrame']:
+    """
+    Read a CSV file as a sequence of string DataFrames of bounded size.
+
+    Args:
+        csv_path: Path to the CSV file
+        columns: Optional list of columns, or predicate on column names, to read
+            (defaults to all columns)
+        chunksize: Maximum number of rows per batch
+
+    Yields:
+        DataFrames of at most chunksize rows, with every column read as strings
+    """
+    import pandas as pd
+
+    with pd.read_csv(csv_path, dtype=str, usecols=columns, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
 
 
 class DeckGenerator:
@@ -48,6 +98,17 @@ class DeckGenerator:
         self.model_type = model_type
         self.tags = tags or []
 
+        # Engine that adds per-note tags from cell contents; without one only
+        # the optional Tags column adds per-note tags
+        self.tag_engine: Optional[TagEngine] = None
+
+        # Profiler that times this generator's build stages; without one the
+        # active profiler (if any) is used
+        self.profiler: Optional[profiling.BuildProfiler] = None
+
+        # Every media file name the notes reference, including missing ones
+        self.media_references: List[str] = []
+
         # Create model
         model_kwargs = {
             'model_id': model_id,
@@ -61,14 +122,42 @@ class DeckGenerator:
 
         self.model = genanki.Model(**model_kwargs)
 
-        # Create deck
-        self.deck = genanki.Deck(deck_id, deck_name)
+        # Notes are kept as compact (fields, tags) rows; genanki.Note objects
+        # are only built when the deck is accessed or exported through genanki
+        self.note_rows: List[Tuple[Tuple[str, ...], List[str]]] = []
+        self._deck = genanki.Deck(deck_id, deck_name)
+        self._materialized_rows = 0
+
+    def profile_stage(self, name: str):
+        """
+        Measure a build stage with this generator's profiler, or the active one.
+
+        Args:
+            name: Name of the stage (see profiling.STAGES)
+
+        Returns:
+            A context manager yielding the stage's counters dictionary
+        """
+        return profiling.stage(name, self.profiler)
+
+    @property
+    def deck(self) -> genanki.Deck:
+        """
+        The genanki deck, with a note for every row generated so far.
+
+        Notes added to it directly (deck.add_note) are exported by both engines.
+        """
+        for fields, note_tags in self.note_rows[self._materialized_rows:]:
+            self._deck.add_note(self._make_note(fields, note_tags))
+        self._materialized_rows = len(self.note_rows)
+        return self._deck
 
     def generate_from_csv(
         self,
         csv_path: str,
         field_mapping: Dict[str, str],
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        source: Optional[DeckSource] = None
     ) -> None:
         """
         Generate notes from a CSV file and add them to the deck.
@@ -77,50 +166,303 @@ class DeckGenerator:
             csv_path: Path to the CSV file
             field_mapping: Dictionary mapping model field names to CSV column names
             tags: Additional tags to apply to notes from this CSV
+            source: Optional already-parsed source for csv_path, to avoid re-reading the file
         """
-        if not os.path.exists(csv_path):
-            raise FileNotFoundError(f"CSV file not found: {csv_path}")
-
-        df = pd.read_csv(csv_path)
+        # Only the mapped columns (and the optional Tags column) are used, all
+        # read as strings, so numeric-looking cells keep their original text
+        usecols = _note_columns(field_mapping)
 
         # Combine default tags with specific tags for this CSV
         note_tags = self.tags.copy()
         if tags:
             note_tags.extend(tags)
 
-        for _, row in df.iterrows():
-            # Extract fields from CSV based on mapping
-            fields = []
-            for field_name in [field['name'] for field in self.fields]:
-                if field_name in field_mapping:
-                    csv_column = field_mapping[field_name]
-                    # Handle empty cells, NaN values, and convert all values to strings
-                    value = row[csv_column]
-                    if pd.isna(value):  # Check for NaN/None values
-                        fields.append('')  # Empty string for NaN values
-                    else:
-                        fields.append(str(value))  # Convert all values to strings
-                else:
-                    fields.append('')  # Empty string for unmapped fields
-
-            # Create note
-            note = genanki.Note(
-                model=self.model,
-                fields=fields,
-                tags=note_tags
-            )
-            self.deck.add_note(note)
-
-    def export_to_apkg(self, output_path: str) -> None:
+        if source is not None and source.load().has_rows:
+            # Small deck parsed with the csv module: build the notes without pandas
+            with self.profile_stage('notes') as counters:
+                note_fields = self.build_note_fields_from_rows(source.rows, source.columns, field_mapping)
+                counters['rows'] += len(note_fields)
+            with self.profile_stage('tags') as counters:
+                row_tags = self.build_note_tags_from_rows(source.rows, source.columns, field_mapping, note_tags)
+                counters['rows'] += len(row_tags)
+            self.note_rows.extend(zip(note_fields, row_tags))
+            return
+
+        with self.profile_stage('parse') as counters:
+            if source is not None:
+                df = source.frame[[col for col in source.columns if col in usecols]]
+            else:
+                if not os.path.exists(csv_path):
+                    raise FileNotFoundError(f"CSV file not found: {csv_path}")
+                import pandas as pd
+
+                df = pd.read_csv(csv_path, dtype=str, usecols=lambda col: col in usecols)
+                counters['bytes'] += os.path.getsize(csv_path)
+            counters['rows'] += len(df)
+
+        with self.profile_stage('notes') as counters:
+            note_fields = self.build_note_fields(df, field_mapping)
+            counters['rows'] += len(note_fields)
+        with self.profile_stage('tags') as counters:
+            row_tags = self.build_note_tags(df, field_mapping, note_tags)
+            counters['rows'] += len(row_tags)
+        self.note_rows.extend(zip(note_fields, row_tags))
+
+    def iter_note_batches(
+        self,
+        csv_path: str,
+        field_mapping: Dict[str, str],
+        chunksize: int = DEFAULT_CHUNK_SIZE,
+        tags: Optional[List[str]] = None
+    ) -> Iterator[List[Tuple[Tuple[str, ...], List[str]]]]:
+        """
+        Stream the notes of a CSV file in batches.
+
+        Args:
+            csv_path: Path to the CSV file
+            field_mapping: Dictionary mapping model field names to CSV column names
+            chunksize: Maximum number of rows per batch
+            tags: Tags applied to every note
+
+        Yields:
+            Lists of (fields, tags) rows, one list per chunk of the CSV
+        """
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+        usecols = _note_columns(field_mapping)
+        chunks = iter_csv_chunks(csv_path, lambda col: col in usecols, chunksize)
+        while True:
+            with self.profile_stage('parse') as counters:
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    counters['rows'] += len(chunk)
+            if chunk is None:
+                break
+
+            with self.profile_stage('notes') as counters:
+                note_fields = self.build_note_fields(chunk, field_mapping)
+                counters['rows'] += len(note_fields)
+            with self.profile_stage('tags') as counters:
+                row_tags = self.build_note_tags(chunk, field_mapping, tags or [])
+                counters['rows'] += len(row_tags)
+            yield list(zip(note_fields, row_tags))
+
+    def _make_note(self, fields: Tuple[str, ...], tags: List[str]) -> genanki.Note:
+        """Create a genanki note for this generator's model."""
+        return genanki.Note(
+            model=self.model,
+            fields=list(fields),
+            tags=tags
+        )
+
+    def build_note_fields(self, df: 'pd.DataFrame', field_mapping: Dict[str, str]) -> List[Tuple[str, ...]]:
+        """
+        Build the field values of every note in a single columnar pass.
+
+        Args:
+            df: DataFrame holding the CSV rows (ideally read with dtype=str)
+            field_mapping: Dictionary mapping model field names to CSV column names
+
+        Returns:
+            One tuple of field strings per row, ordered like the model fields
+        """
+        # Handle empty cells and NaN values for the whole frame at once
+        df = df.fillna('')
+
+        columns = []
+        empty_column = [''] * len(df)
+        for field in self.fields:
+            csv_column = field_mapping.get(field['name'])
+            if csv_column is None:
+                columns.append(empty_column)  # Empty string for unmapped fields
+            else:
+                columns.append(df[csv_column].astype(str).tolist())
+
+        return list(zip(*columns))
+
+    def build_note_tags(self, df: 'pd.DataFrame', field_mapping: Dict[str, str], tags: List[str]) -> List[List[str]]:
+        """
+        Build the tags of every note in a single vectorized pass.
+
+        Args:
+            df: DataFrame holding the CSV rows
+            field_mapping: Dictionary mapping model field names to CSV column names
+            tags: Tags applied to every note
+
+        Returns:
+            One list of tags per row
+        """
+        engine = self.tag_engine or get_tag_engine(NO_CONTENT_TAGS_CONFIG)
+        text_columns = [col for col in dict.fromkeys(field_mapping.values()) if col in df.columns]
+        return engine.note_tags(df, tags, text_columns)
+
+    def build_note_fields_from_rows(
+        self,
+        rows: Sequence[Tuple[str, ...]],
+        columns: Sequence[str],
+        field_mapping: Dict[str, str]
+    ) -> List[Tuple[str, ...]]:
+        """
+        Build the field values of every note from rows parsed with the csv module.
+
+        Args:
+            rows: Rows of cell strings, with missing values as empty strings
+            columns: Column names of the rows
+            field_mapping: Dictionary mapping model field names to CSV column names
+
+        Returns:
+            One tuple of field strings per row, ordered like the model fields
+        """
+        index = {col: position for position, col in enumerate(columns)}
+        positions = []
+        for field in self.fields:
+            csv_column = field_mapping.get(field['name'])
+            positions.append(None if csv_column is None else index[csv_column])
+
+        if None not in positions:
+            return [tuple(row[position] for position in positions) for row in rows]
+        return [tuple('' if position is None else row[position] for position in positions) for row in rows]
+
+    def build_note_tags_from_rows(
+        self,
+        rows: Sequence[Tuple[str, ...]],
+        columns: Sequence[str],
+        field_mapping: Dict[str, str],
+        tags: List[str]
+    ) -> List[List[str]]:
+        """
+        Build the tags of every note from rows parsed with the csv module.
+
+        Args:
+            rows: Rows of cell strings, with missing values as empty strings
+            columns: Column names of the rows
+            field_mapping: Dictionary mapping model field names to CSV column names
+            tags: Tags applied to every note
+
+        Returns:
+            One list of tags per row
+        """
+        engine = self.tag_engine or get_tag_engine(NO_CONTENT_TAGS_CONFIG)
+        text_columns = [col for col in dict.fromkeys(field_mapping.values()) if col in columns]
+        return engine.row_tags(rows, columns, tags, text_columns)
+
+    def export_to_apkg(
+        self,
+        output_path: str,
+        media_files: Optional[List[str]] = None,
+        engine: str = DEFAULT_EXPORT_ENGINE
+    ) -> None:
         """
         Export the deck to an APKG file.
 
         Args:
             output_path: Path where the APKG file will be saved
+            media_files: Optional list of media file paths to include in the package
+            engine: 'genanki' to write through genanki.Package, or 'sqlite' to
+                bulk-insert the note rows directly (much faster for large decks).
+                A deck with notes added through deck.add_note is always
+                written through genanki, so both engines export the same notes.
+        """
+        if engine not in EXPORT_ENGINES:
+            raise ValueError(f"Unknown export engine: {engine} (expected one of {', '.join(EXPORT_ENGINES)})")
+
+        if engine == SQLITE_ENGINE and not self._has_added_notes():
+            with _temporary_collection() as db_path:
+                with self.profile_stage('sqlite') as counters:
+                    with ApkgWriter(db_path, self.model, self.deck_id, self.deck_name) as writer:
+                        for note_tags, rows in itertools.groupby(self.note_rows, key=lambda row: row[1]):
+                            writer.add_notes((fields for fields, _ in rows), note_tags)
+                    counters['rows'] += writer.note_count
+                    counters['bytes'] += os.path.getsize(db_path)
+                self._write_package(db_path, output_path, media_files or [])
+        else:
+            with self.profile_stage('notes'):
+                deck = self.deck
+            with self.profile_stage('export') as counters, _temporary_collection() as db_path:
+                write_genanki_collection(db_path, genanki.Package(deck))
+                write_package_file(db_path, output_path, media_files or [])
+                counters['rows'] += len(self.note_rows)
+                counters['bytes'] += os.path.getsize(output_path)
+        print(f"✅ Deck exported as {output_path}")
+
+    def _has_added_notes(self) -> bool:
+        """Return True if notes were added to the genanki deck other than those built from note_rows."""
+        return len(self._deck.notes) > self._materialized_rows
+
+    def stream_to_apkg(
+        self,
+        csv_path: str,
+        field_mapping: Dict[str, str],
+        output_path: str,
+        tags: Optional[List[str]] = None,
+        media_files: Optional[List[str]] = None,
+        chunksize: int = DEFAULT_CHUNK_SIZE,
+        engine: str = DEFAULT_EXPORT_ENGINE
+    ) -> int:
+        """
+        Build an APKG file straight from a CSV file without holding the whole deck in memory.
+
+        Notes are written to the collection database one chunk at a time, so
+        peak memory is bounded by the chunk size rather than the file size.
+        Notes already added to the deck are not included.
+
+        Args:
+            csv_path: Path to the CSV file
+            field_mapping: Dictionary mapping model field names to CSV column names
+            output_path: Path where the APKG file will be saved
+            tags: Additional tags to apply to notes from this CSV
+            media_files: Optional list of media file paths to include in the package
+            chunksize: Maximum number of CSV rows held in memory at once
+            engine: 'genanki' or 'sqlite', see export_to_apkg
+
+        Returns:
+            Number of notes written
         """
-        package = genanki.Package(self.deck)
-        package.write_to_file(output_path)
+        if engine not in EXPORT_ENGINES:
+            raise ValueError(f"Unknown export engine: {engine} (expected one of {', '.join(EXPORT_ENGINES)})")
+
+        note_tags = self.tags.copy()
+        if tags:
+            note_tags.extend(tags)
+
+        with _temporary_collection() as db_path:
+            with ApkgWriter(db_path, self.model, self.deck_id, self.deck_name) as writer:
+                for batch in self.iter_note_batches(csv_path, field_mapping, chunksize, note_tags):
+                    with self.profile_stage('sqlite') as counters:
+                        if engine == SQLITE_ENGINE:
+                            for row_tags, rows in itertools.groupby(batch, key=lambda row: row[1]):
+                                writer.add_notes((fields for fields, _ in rows), row_tags)
+                        else:
+                            writer.add_genanki_notes(self._make_note(fields, row_tags) for fields, row_tags in batch)
+                        counters['rows'] += len(batch)
+                note_count = writer.note_count
+            self._write_package(db_path, output_path, media_files or [])
+
         print(f"✅ Deck exported as {output_path}")
+        return note_count
+
+    def _write_package(self, db_path: str, output_path: str, media_files: List[str]) -> None:
+        """Zip the collection database and media into the APKG file, as the 'zip' stage."""
+        with self.profile_stage('zip') as counters:
+            write_package_file(db_path, output_path, media_files)
+            counters['bytes'] += os.path.getsize(output_path)
+
+
+def _note_columns(field_mapping: Dict[str, str]) -> set:
+    """Return the CSV columns read to build notes: the mapped ones and the optional Tags column."""
+    return set(field_mapping.values()) | {TAGS_COLUMN}
+
+
+@contextlib.contextmanager
+def _temporary_collection() -> Iterator[str]:
+    """Yield the path of a scratch collection database that is removed afterwards."""
+    dbfile, db_path = tempfile.mkstemp(suffix='.anki2')
+    os.close(dbfile)
+    try:
+        yield db_path
+    finally:
+        os.remove(db_path)
 
 
 def create_cloze_deck_generator(
@@ -179,24 +521,23 @@ def create_cloze_deck_generator(
     )
 
 
-def analyze_csv_structure(csv_path: str) -> Tuple[List[str], Dict[str, str]]:
+def analyze_csv_structure(csv_path: str, source: Optional[DeckSource] = None) -> Tuple[List[str], Dict[str, str]]:
     """
     Analyze the structure of a CSV file to determine its fields.
 
     Args:
         csv_path: Path to the CSV file
+        source: Optional already-parsed source for csv_path, to avoid re-reading the file
 
     Returns:
         A tuple containing (list of field names, field mapping dictionary)
     """
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"CSV file not found: {csv_path}")
-
-    # Read the CSV file
-    df = pd.read_csv(csv_path)
+    if source is None:
+        source = DeckSource(csv_path)
 
-    # Get column names
-    columns = list(df.columns)
+    # Only the header row is needed here; the optional Tags column holds
+    # per-note tags rather than a field
+    columns = [col for col in source.columns if col != TAGS_COLUMN]
 
     # Create field list
     fields = [{'name': col} for col in columns]
@@ -207,146 +548,53 @@ def analyze_csv_structure(csv_path: str) -> Tuple[List[str], Dict[str, str]]:
     return columns, field_mapping
 
 
-def create_dynamic_deck_generator(csv_path: str, language: str = 'generic', custom_config: Optional[Dict[str, Any]] = None) -> DeckGenerator:
+def _is_cloze_deck(columns: List[str]) -> bool:
+    """Return whether a deck with these columns is likely a cloze deletion deck."""
+    return any('cloze' in col.lower() for col in columns) or \
+           any('text' in col.lower() for col in columns)
+
+
+def infer_deck_tags(
+    csv_path: str,
+    language: str = 'generic',
+    custom_config: Optional[Dict[str, Any]] = None,
+    source: Optional[DeckSource] = None,
+    columns: Optional[List[str]] = None,
+    is_cloze: Optional[bool] = None
+) -> List[str]:
     """
-    Create a deck generator dynamically based on the CSV file structure.
+    Infer the tags for a deck without building it.
 
     Args:
         csv_path: Path to the CSV file
         language: Language tag for the deck (default: 'generic')
+        custom_config: Optional custom configuration to use
+        source: Optional already-parsed source for csv_path, to avoid re-reading the file
+        columns: Column names, if already known
+        is_cloze: Whether the deck has cloze cards, if already known
 
     Returns:
-        A configured DeckGenerator instance
+        List of tags, without duplicates
     """
-    # Extract filename without extension
-    filename = os.path.basename(csv_path)
-    base_name = os.path.splitext(filename)[0]
-
-    # Create a readable deck name from the filename
-    deck_name = ' '.join(word.capitalize() for word in re.split(r'[_\-]', base_name))
-    if language != 'generic':
-        deck_name = f"{language.capitalize()} {deck_name}"
-
-    # Generate unique IDs based on the filename
-    # Using hash of filename to create deterministic IDs
-    filename_hash = hash(base_name)
-    model_id = abs(filename_hash) % (10**10)  # Ensure it's positive and 10 digits
-    deck_id = abs(filename_hash + 1) % (10**10)  # Different from model_id but related
-
-    # Analyze CSV structure
-    columns, field_mapping = analyze_csv_structure(csv_path)
-
-    # Create fields list for the model
-    fields = [{'name': col} for col in columns]
-
-    # Determine if this is likely a cloze deletion deck
-    is_cloze = any('cloze' in col.lower() for col in columns) or \
-               any('text' in col.lower() for col in columns)
-
-    # Load configuration
-    config = custom_config or load_config()
-    tag_filters = config.get('tag_filters', {})
+    if source is None:
+        source = DeckSource(csv_path)
+    if columns is None:
+        columns = source.columns
+    if is_cloze is None:
+        is_cloze = _is_cloze_deck(columns)
 
-    # Generate tags
-    tags = []
-
-    # Add language tag
-    if tag_filters.get('language', True):
-        tags.append(language.lower())
-
-    # Add source tag
-    if tag_filters.get('source', True):
-        tags.append('auto-generated')
-
-    # Add card type tag
-    if tag_filters.get('card_type', True):
-        if is_cloze:
-            tags.append('cloze')
-        else:
-            tags.append('basic')
-
-    # Extract meaningful tags from filename (skip common words)
-    if tag_filters.get('filename', True):
-        common_words = {'deck', 'card', 'cards', 'anki', 'full', 'new', 'updated', 'final', 'draft', 'test'}
-        for word in re.split(r'[_\-\s]', base_name):
-            if word and word.lower() not in common_words and len(word) > 1:  # Skip single letters and common words
-                tags.append(word.lower())
-
-    # Add custom tags from configuration
-    custom_tags = get_custom_tags(base_name, config)
-    tags.extend(custom_tags)
-
-    # Define language learning tags to detect
-    language_learning_tags = {
-        # Basic categories
-        'vocabulary': ['vocab', 'word', 'dictionary', 'lexicon', 'term'],
-        'grammar': ['grammar', 'structure', 'syntax', 'rule'],
-        'verb': ['verb', 'conjugation', 'tense', 'infinitive'],
-        'noun': ['noun', 'substantive', 'object', 'thing'],
-        'adjective': ['adjective', 'adj', 'descriptor'],
-        'adverb': ['adverb', 'adv'],
-        'preposition': ['preposition', 'prep'],
-        'pronoun': ['pronoun', 'subject', 'object'],
-
-        # Tenses and moods
-        'present': ['present', 'presents', 'currently'],
-        'past': ['past', 'preterite', 'imperfect', 'historical'],
-        'future': ['future', 'will', 'going to'],
-        'conditional': ['conditional', 'would'],
-        'subjunctive': ['subjunctive', 'subjuntivo'],
-        'imperative': ['imperative', 'command', 'order'],
-
-        # Common constructs
-        'ir-a': ['ir a', 'going to', 'future'],
-        'ser-estar': ['ser estar', 'being', 'to be'],
-        'por-para': ['por para', 'for']
-    }
-
-    # Only add grammar and content tags if enabled in config
-    if tag_filters.get('grammar', True) or tag_filters.get('content', True) or tag_filters.get('language_construct', True):
-        # Check filename for language learning category indicators
-        lower_filename = base_name.lower()
-
-        # Check for language learning tags in the filename
-        for tag, indicators in language_learning_tags.items():
-            category = 'grammar' if tag in ['verb', 'noun', 'adjective', 'adverb', 'preposition', 'pronoun'] else \
-                      'language_construct' if tag in ['ir-a', 'ser-estar', 'por-para'] else 'content'
-
-            # Skip if this category is disabled in config
-            if not tag_filters.get(category, True):
-                continue
-
-            for indicator in indicators:
-                if indicator in lower_filename:
-                    if tag not in tags:  # Avoid duplicates
-                        tags.append(tag)
-
-        # Special checks for common constructs if language_construct tags are enabled
-        if tag_filters.get('language_construct', True):
-            if 'ir' in lower_filename and 'a' in lower_filename and ('infinitive' in lower_filename or 'future' in lower_filename):
-                if 'ir-a' not in tags:
-                    tags.append('ir-a')
-                if 'future' not in tags and tag_filters.get('grammar', True):
-                    tags.append('future')
-
-        # Check column names for basic indicators
-        lower_columns = [col.lower() for col in columns]
-        if 'english' in lower_columns and any(lang in lower_columns for lang in ['spanish', 'french', 'german', 'italian']):
-            tags.append('translation')
-
-        # Add person tag if there's a Person column
-        if 'person' in lower_columns and tag_filters.get('grammar', True):
-            tags.append('person')
+    config = custom_config or get_config()
+    tags = get_tag_engine(config).tags_for(os.path.basename(csv_path), columns, language, is_cloze)
 
     # Scan for media references if media is enabled
-    if config.get('media_enabled', True):
+    if config.get('media_enabled', True) and 'media' not in tags:
         try:
-            df = pd.read_csv(csv_path, nrows=5)  # Read just a few rows to check for media
+            rows = source.head_rows(5)  # Check just a few rows for media
             has_media = False
 
-            for col in df.columns:
+            for row in rows:
                 # Check for image or audio file references
-                for cell in df[col].astype(str):
+                for cell in row:
                     if '<img src=' in cell.lower() or '[sound:' in cell.lower():
                         has_media = True
                         break
@@ -357,155 +605,91 @@ def create_dynamic_deck_generator(csv_path: str, language: str = 'generic', cust
             # If there's any error reading the CSV, just continue without media check
             pass
 
-    # Remove duplicate tags while preserving order
-    seen = set()
-    unique_tags = []
-    for tag in tags:
-        if tag not in seen:
-            seen.add(tag)
-            unique_tags.append(tag)
-    tags = unique_tags
+    # Decks with a reversed card template are tagged as such
+    if compile_templates(config, columns, is_cloze).reversed_cards and 'reversed' not in tags:
+        tags.append('reversed')
 
-    # Get custom templates and options from config
-    custom_templates = config.get('templates', {})
-    custom_css = config.get('css', DEFAULT_CSS)
+    return tags
 
-    # Check if we should create a reversed deck
-    create_reversed = config.get('create_reversed', False)
 
-    # Helper function to substitute placeholder field names with actual column names
-    def substitute_field_placeholders(template_str: str, columns: List[str], add_extra_cols: bool = False) -> str:
-        """Replace {{Front}}, {{Back}}, {{Text}}, etc. with actual column names.
+def create_dynamic_deck_generator(
+    csv_path: str,
+    language: str = 'generic',
+    custom_config: Optional[Dict[str, Any]] = None,
+    source: Optional[DeckSource] = None
+) -> DeckGenerator:
+    """
+    Create a deck generator dynamically based on the CSV file structure.
 
-        Args:
-            template_str: The template string with placeholders
-            columns: List of actual column names from CSV
-            add_extra_cols: If True, append extra columns (3rd, 4th, etc.) to the template
-        """
-        result = template_str
-        # Map common placeholder names to column indices
-        placeholders = {
-            '{{Front}}': columns[0] if len(columns) > 0 else 'Front',
-            '{{Back}}': columns[1] if len(columns) > 1 else 'Back',
-            '{{Text}}': columns[0] if len(columns) > 0 else 'Text',
-            '{{Translation}}': columns[1] if len(columns) > 1 else 'Translation',
-            '{{Explanation}}': columns[2] if len(columns) > 2 else 'Explanation',
-            '{{Hint}}': columns[3] if len(columns) > 3 else 'Hint',
-            '{{Notes}}': columns[-1] if len(columns) > 2 else 'Notes',
-        }
-        for placeholder, actual in placeholders.items():
-            result = result.replace(placeholder, '{{' + actual + '}}')
-        # Also handle cloze format
-        result = result.replace('{{cloze:Text}}', '{{cloze:' + (columns[0] if len(columns) > 0 else 'Text') + '}}')
-
-        # Append extra columns (beyond the first 2) to the answer template
-        if add_extra_cols and len(columns) > 2:
-            extra_fields = ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}' for col in columns[2:]])
-            result += extra_fields
-
-        return result
-
-    # Create appropriate templates based on CSV structure
-    if is_cloze:
-        # For cloze deletion cards
-        if 'cloze' in custom_templates:
-            # Use custom template from config
-            template = custom_templates['cloze']
-            templates = [{
-                'name': template.get('name', 'Cloze Card'),
-                'qfmt': substitute_field_placeholders(template.get('qfmt', '{{cloze:' + columns[0] + '}}'), columns),
-                'afmt': substitute_field_placeholders(template.get('afmt', '{{cloze:' + columns[0] + '}}<hr>' + \
-                       ''.join([f'<b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[1:]])), columns)
-            }]
-        else:
-            # Use default cloze template
-            templates = [{
-                'name': 'Cloze Card',
-                'qfmt': '{{cloze:' + columns[0] + '}}',
-                'afmt': '{{cloze:' + columns[0] + '}}<hr>' + \
-                       ''.join([f'<b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[1:]])
-            }]
-        model_type = genanki.Model.CLOZE
-    else:
-        # For basic cards (front/back)
-        if 'basic' in custom_templates:
-            # Use custom template from config, substituting actual column names
-            template = custom_templates['basic']
-            if len(columns) >= 2:
-                # Create the standard template with substituted field names
-                # add_extra_cols=True appends Example, Notes, etc. to the answer
-                standard_template = {
-                    'name': template.get('name', 'Basic Card'),
-                    'qfmt': substitute_field_placeholders(template.get('qfmt', '{{' + columns[0] + '}}'), columns),
-                    'afmt': substitute_field_placeholders(template.get('afmt', '{{FrontSide}}<hr><b>' + columns[1] + ':</b> {{' + columns[1] + '}}'), columns, add_extra_cols=True)
-                }
-
-                # Initialize templates with the standard template
-                templates = [standard_template]
-
-                # Add reversed template if enabled
-                if create_reversed:
-                    # For reversed, swap Front/Back meaning
-                    reversed_template = {
-                        'name': template.get('name', 'Basic Card') + ' (Reversed)',
-                        'qfmt': '{{' + columns[1] + '}}',
-                        'afmt': '{{FrontSide}}<hr><b>' + columns[0] + ':</b> {{' + columns[0] + '}}' + \
-                               ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[2:] if col != columns[1]])
-                    }
-                    templates.append(reversed_template)
-                    # Add a tag to indicate this deck has reversed cards
-                    tags.append('reversed')
-            else:
-                templates = [{
-                    'name': template.get('name', 'Basic Card'),
-                    'qfmt': substitute_field_placeholders(template.get('qfmt', '{{' + columns[0] + '}}'), columns),
-                    'afmt': substitute_field_placeholders(template.get('afmt', '{{FrontSide}}'), columns, add_extra_cols=True)
-                }]
-        else:
-            # Use default basic template
-            if len(columns) >= 2:
-                # Create the standard template
-                standard_template = {
-                    'name': 'Basic Card',
-                    'qfmt': '{{' + columns[0] + '}}',
-                    'afmt': '{{FrontSide}}<hr><b>' + columns[1] + ':</b> {{' + columns[1] + '}}' + \
-                           ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[2:]])
-                }
-
-                # Initialize templates with the standard template
-                templates = [standard_template]
-
-                # Add reversed template if enabled
-                if create_reversed:
-                    reversed_template = {
-                        'name': 'Basic Card (Reversed)',
-                        'qfmt': '{{' + columns[1] + '}}',
-                        'afmt': '{{FrontSide}}<hr><b>' + columns[0] + ':</b> {{' + columns[0] + '}}' + \
-                               ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[2:] if col != columns[1]])
-                    }
-                    templates.append(reversed_template)
-                    # Add a tag to indicate this deck has reversed cards
-                    tags.append('reversed')
-            else:
-                templates = [{
-                    'name': 'Basic Card',
-                    'qfmt': '{{' + columns[0] + '}}',
-                    'afmt': '{{FrontSide}}'
-                }]
-        model_type = 0  # Standard model
+    Args:
+        csv_path: Path to the CSV file
+        language: Language tag for the deck (default: 'generic')
+        custom_config: Optional custom configuration to use
+        source: Optional already-parsed source for csv_path, to avoid re-reading the file
 
-    # Use custom CSS from config
-    css = custom_css
+    Returns:
+        A configured DeckGenerator instance
+    """
+    if source is None:
+        source = DeckSource(csv_path)
+
+    # Extract filename without extension
+    filename = os.path.basename(csv_path)
+    base_name = os.path.splitext(filename)[0]
+
+    # Create a readable deck name from the filename
+    deck_name = ' '.join(word.capitalize() for word in re.split(r'[_\-]', base_name))
+    if language != 'generic':
+        deck_name = f"{language.capitalize()} {deck_name}"
+
+    # Look up the IDs for this deck; they are derived from a stable digest of
+    # the filename and persisted, so re-imports update the deck in place
+    model_id, deck_id = get_id_registry().ids_for(base_name)
+
+    # Analyze CSV structure
+    columns, field_mapping = analyze_csv_structure(csv_path, source)
+
+    # Create fields list for the model
+    fields = [{'name': col} for col in columns]
+
+    # Determine if this is likely a cloze deletion deck
+    is_cloze = _is_cloze_deck(columns)
+
+    # Load configuration
+    config = custom_config or get_config()
+
+    # Build (or reuse) the card templates for this column layout
+    with profiling.stage('templates'):
+        compiled = compile_templates(config, columns, is_cloze)
+
+    # Generate tags
+    with profiling.stage('tags'):
+        tags = infer_deck_tags(csv_path, language, config, source, columns, is_cloze)
+    templates = compiled.templates()
+    css = config.get('css', DEFAULT_CSS)
+
+    # Decks with the same fields and card types share one note model; its
+    # CSS and template HTML are updated in place when the configuration changes
+    model_name = f"{deck_name} Model"
+    if config.get('share_models', True):
+        template_names = [template['name'] for template in templates]
+        model_id = shared_model_id(model_schema_digest(columns, template_names, compiled.model_type))
+        model_name = shared_model_name(columns, compiled.model_type, compiled.reversed_cards)
 
     # Create the deck generator
-    return DeckGenerator(
+    generator = DeckGenerator(
         model_id=model_id,
-        model_name=f"{deck_name} Model",
+        model_name=model_name,
         deck_id=deck_id,
         deck_name=deck_name,
         fields=fields,
         templates=templates,
         css=css,
-        model_type=model_type,
+        model_type=compiled.model_type,
         tags=tags
     )
+
+    # Tag each note from its contents with the same rules as the deck
+    generator.tag_engine = get_tag_engine(config)
+
+    return generator
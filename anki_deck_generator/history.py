@@ -0,0 +1,199 @@
+import os
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from anki_deck_generator.config import OUTPUT_DIR
+
+# SQLite database that holds the generation history
+HISTORY_DB = OUTPUT_DIR / 'generation_history.db'
+
+# JSON history written by earlier versions, imported once on first use
+LEGACY_HISTORY_FILE = OUTPUT_DIR / 'generation_history.json'
+
+# Seconds a writer waits for another process's append to finish
+BUSY_TIMEOUT = 30.0
+
+HISTORY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    csv_file TEXT NOT NULL,
+    output_file TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    note_count INTEGER,
+    duration REAL,
+    timings TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_history_csv_file ON history (csv_file, timestamp);
+CREATE INDEX IF NOT EXISTS ix_history_timestamp ON history (timestamp);
+CREATE INDEX IF NOT EXISTS ix_history_duration ON history (duration);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+
+class GenerationHistory:
+    """
+    Append-only record of deck builds, stored in SQLite.
+
+    Each build is a single INSERT, so recording costs the same no matter how
+    long the history is. The database runs in WAL mode, which lets parallel
+    builds append from several processes while others read. Entries are
+    indexed by deck, time and duration for the queries below.
+    """
+
+    def __init__(self, path: Path = HISTORY_DB, legacy_path: Optional[Path] = LEGACY_HISTORY_FILE):
+        """
+        Open (and create if needed) the history database.
+
+        Args:
+            path: Path to the SQLite database
+            legacy_path: JSON history file to import the first time the
+                database is created, if it exists
+        """
+        self.path = Path(path)
+        os.makedirs(self.path.parent, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.executescript(HISTORY_SCHEMA)
+        if legacy_path is not None:
+            self._import_legacy(Path(legacy_path))
+
+    def _import_legacy(self, legacy_path: Path) -> None:
+        """Copy the entries of a JSON history file into the database once."""
+        if not legacy_path.exists():
+            return
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            imported = self.conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone()
+            if imported:
+                return
+            try:
+                with open(legacy_path, 'r') as f:
+                    entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading legacy history: {e}")
+                entries = []
+            self.conn.executemany(
+                'INSERT INTO history (timestamp, csv_file, output_file, tags) VALUES (?, ?, ?, ?)',
+                [
+                    (entry['timestamp'], entry['csv_file'], entry['output_file'], json.dumps(entry.get('tags', [])))
+                    for entry in entries
+                ]
+            )
+            self.conn.execute("INSERT INTO meta VALUES ('legacy_imported', ?)", (str(legacy_path),))
+
+    def record(
+        self,
+        csv_file: str,
+        output_file: str,
+        tags: List[str],
+        note_count: Optional[int] = None,
+        duration: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None,
+        timestamp: Optional[datetime] = None
+    ) -> None:
+        """
+        Append one build to the history.
+
+        Args:
+            csv_file: Name of the CSV file
+            output_file: Name of the generated APKG file
+            tags: Tags applied to the deck
+            note_count: Number of notes in the deck
+            duration: Total build time in seconds
+            timings: Seconds spent in each build stage
+            timestamp: Time of the build (defaults to now)
+        """
+        self.conn.execute(
+            'INSERT INTO history (timestamp, csv_file, output_file, tags, note_count, duration, timings) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                (timestamp or datetime.now()).isoformat(),
+                csv_file,
+                output_file,
+                json.dumps(tags),
+                note_count,
+                duration,
+                json.dumps(timings) if timings is not None else None,
+            )
+        )
+
+    def query(
+        self,
+        deck: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        limit: Optional[int] = None,
+        newest_first: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Look up builds matching all of the given filters.
+
+        Args:
+            deck: CSV file name (with or without the .csv extension)
+            since: Only builds at or after this time
+            until: Only builds before this time
+            min_duration: Only builds that took at least this many seconds
+            max_duration: Only builds that took at most this many seconds
+            limit: Maximum number of entries to return
+            newest_first: Return the most recent builds first
+
+        Returns:
+            List of history entries, oldest first unless newest_first is set
+        """
+        clauses = []
+        params: List[Any] = []
+        if deck:
+            clauses.append('csv_file = ?')
+            params.append(deck if deck.endswith('.csv') else f"{deck}.csv")
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since.isoformat())
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until.isoformat())
+        if min_duration is not None:
+            clauses.append('duration >= ?')
+            params.append(min_duration)
+        if max_duration is not None:
+            clauses.append('duration <= ?')
+            params.append(max_duration)
+
+        sql = 'SELECT * FROM history'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY timestamp DESC, id DESC' if newest_first else ' ORDER BY timestamp, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        return [self._to_entry(row) for row in self.conn.execute(sql, params)]
+
+    def count(self) -> int:
+        """Return the number of recorded builds."""
+        return self.conn.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    @staticmethod
+    def _to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a database row to the entry format of the old JSON history."""
+        entry = dict(row)
+        entry['tags'] = json.loads(entry['tags'])
+        entry['timings'] = json.loads(entry['timings']) if entry['timings'] else None
+        return entry
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.conn.close()
+
+    def __enter__(self) -> 'GenerationHistory':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,109 @@
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from anki_deck_generator.config import CONFIG_DIR
+
+# File that records the IDs assigned to every deck that has been built
+ID_REGISTRY_FILE = CONFIG_DIR / 'id_registry.json'
+
+# IDs are kept in the same 10-digit range the generator has always used
+ID_MIN = 10**9
+ID_SPAN = 9 * 10**9
+
+
+def stable_id(*parts: str) -> int:
+    """
+    Derive a deterministic Anki ID from a stable digest of the given parts.
+
+    Unlike the built-in hash(), the result is the same in every process and
+    on every machine, so rebuilt decks and models keep their identity.
+
+    Args:
+        parts: Strings identifying the object (e.g. 'deck', base name)
+
+    Returns:
+        A positive 10-digit integer ID
+    """
+    digest = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).digest()
+    return ID_MIN + int.from_bytes(digest[:8], 'big') % ID_SPAN
+
+
+class IdRegistry:
+    """
+    Persisted mapping from deck keys to the model and deck IDs assigned to them.
+
+    IDs are derived with stable_id the first time a key is seen and then read
+    back from the registry, so a deck keeps its IDs even if the derivation
+    inputs change later.
+    """
+
+    def __init__(self, path: Path = ID_REGISTRY_FILE):
+        """
+        Initialize the registry.
+
+        Args:
+            path: Path to the registry JSON file
+        """
+        self.path = Path(path)
+        self._entries: Optional[Dict[str, Dict[str, int]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        """Write the registry atomically so concurrent builds never see a partial file."""
+        os.makedirs(self.path.parent, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.id_registry.')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._entries, f, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def ids_for(self, key: str) -> Tuple[int, int]:
+        """
+        Get the (model_id, deck_id) pair for a deck, assigning it on first use.
+
+        Args:
+            key: Stable key of the deck (the CSV base name, or merge:<name>
+                for a merged deck)
+
+        Returns:
+            A tuple of (model_id, deck_id)
+        """
+        entries = self._load()
+        entry = entries.get(key)
+        if entry is None:
+            entry = {
+                'model_id': stable_id('model', key),
+                'deck_id': stable_id('deck', key),
+            }
+            entries[key] = entry
+            try:
+                self._save()
+            except OSError as e:
+                print(f"Error saving ID registry: {e}")
+        return entry['model_id'], entry['deck_id']
+
+
+_default_registry: Optional[IdRegistry] = None
+
+
+def get_id_registry() -> IdRegistry:
+    """Return the process-wide registry backed by ID_REGISTRY_FILE."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = IdRegistry()
+    return _default_registry
@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from anki_deck_generator.media_store import MediaStore, get_media_store, hash_file
+
+# Name of the manifest file kept next to the generated APKG files
+BUILD_MANIFEST_FILE = 'build_manifest.json'
+
+# Bump when the generator changes in a way that should rebuild every deck
+MANIFEST_VERSION = 5
+
+# Configuration keys that influence the content of a generated deck
+BUILD_CONFIG_KEYS = ('custom_tags', 'tag_filters', 'templates', 'css', 'create_reversed', 'media_enabled',
+                    'share_models')
+
+
+def config_fingerprint(config: Dict[str, Any], language: str) -> str:
+    """
+    Hash the part of the configuration that affects a deck's output.
+
+    Args:
+        config: The effective configuration
+        language: Language tag used for the build
+
+    Returns:
+        Hex digest of the build-relevant settings
+    """
+    subset = {key: config.get(key) for key in BUILD_CONFIG_KEYS}
+    subset['language'] = language
+    subset['manifest_version'] = MANIFEST_VERSION
+    payload = json.dumps(subset, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _file_signature(path: str) -> Optional[List[int]]:
+    """Return [size, mtime_ns] for a file, or None if it does not exist."""
+    try:
+        stats = os.stat(path)
+    except OSError:
+        return None
+    return [stats.st_size, stats.st_mtime_ns]
+
+
+def snapshot_csv(csv_path: str) -> Dict[str, Any]:
+    """
+    Capture the state of a CSV file before a deck is built from it.
+
+    The stats are taken before the bytes are hashed, so an edit made while
+    hashing or building leaves a signature that no longer matches and the
+    file is hashed again by the next check.
+
+    Args:
+        csv_path: Path to the CSV file
+
+    Returns:
+        The manifest fields describing the CSV file; both are None if it
+        does not exist
+    """
+    signature = _file_signature(csv_path)
+    if signature is None:
+        return {'csv_sha256': None, 'csv_signature': None}
+    return {'csv_sha256': hash_file(csv_path), 'csv_signature': signature}
+
+
+class BuildManifest:
+    """
+    Record of the inputs each generated deck was built from.
+
+    For every deck the manifest stores a hash of the CSV bytes, a fingerprint
+    of the relevant configuration and the content digest of each referenced
+    media file, as cached by the media store. Referenced files that did not
+    exist are stored with a None digest, so adding one later rebuilds the
+    deck. A deck only needs rebuilding when one of those inputs changed or its
+    APKG file is missing. CSV files whose size and mtime are unchanged are not
+    re-hashed, so checking an unchanged deck costs a few stat calls.
+    """
+
+    def __init__(self, output_dir: Path, media_store: Optional[MediaStore] = None):
+        """
+        Load the manifest stored in an output directory.
+
+        Args:
+            output_dir: Directory holding the generated APKG files
+            media_store: Store used to digest media files (defaults to the MEDIA_DIR store)
+        """
+        self.path = Path(output_dir) / BUILD_MANIFEST_FILE
+        self.media_store = media_store or get_media_store()
+        try:
+            with open(self.path, 'r') as f:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+        self._dirty = False
+
+    def is_up_to_date(self, csv_path: str, output_path: str, config_digest: str) -> bool:
+        """
+        Check whether a deck's APKG file still matches its inputs.
+
+        Args:
+            csv_path: Path to the CSV file
+            output_path: Path to the APKG file the deck is built into
+            config_digest: Fingerprint of the effective configuration
+
+        Returns:
+            True if the deck can be skipped
+        """
+        entry = self.entries.get(os.path.basename(csv_path))
+        if not entry or entry.get('config') != config_digest:
+            return False
+        if entry.get('output') != os.path.basename(output_path) or not os.path.exists(output_path):
+            return False
+
+        signature = _file_signature(csv_path)
+        if signature is None:
+            return False
+        if signature != entry.get('csv_signature'):
+            # The file was touched; only its content decides
+            if hash_file(csv_path) != entry.get('csv_sha256'):
+                return False
+            entry['csv_signature'] = signature
+            self._dirty = True
+
+        # A None digest means the file was missing and must still be
+        for media_path, media_digest in entry.get('media', {}).items():
+            if self.media_store.digest(media_path) != media_digest:
+                return False
+
+        return True
+
+    def decks_using_media(self, media_names: Iterable[str]) -> List[str]:
+        """
+        Find the decks whose last build referenced any of the given media files.
+
+        Missing references are recorded too, so a deck is found even when the
+        file did not exist when it was built.
+
+        Args:
+            media_names: Media file names (basenames)
+
+        Returns:
+            Names of the CSV files of those decks, sorted
+        """
+        names = set(media_names)
+        return sorted(
+            csv_name for csv_name, entry in self.entries.items()
+            if any(os.path.basename(path) in names for path in entry.get('media', {}))
+        )
+
+    def record(self, csv_path: str, output_path: str, config_digest: str, csv_snapshot: Dict[str, Any],
+               media_files: List[str], media_references: Iterable[str] = ()) -> None:
+        """
+        Store the inputs a deck was just built from.
+
+        Args:
+            csv_path: Path to the CSV file
+            output_path: Path to the generated APKG file
+            config_digest: Fingerprint of the effective configuration
+            csv_snapshot: State of the CSV file taken by snapshot_csv before
+                the build read it
+            media_files: Media files packaged with the deck
+            media_references: Every media file name the deck references,
+                including names with no file in the media directory
+        """
+        media_paths = [str(path) for path in media_files]
+        media_paths.extend(str(self.media_store.media_dir / name) for name in media_references)
+        self.entries[os.path.basename(csv_path)] = {
+            'output': os.path.basename(output_path),
+            'csv_sha256': csv_snapshot['csv_sha256'],
+            'csv_signature': csv_snapshot['csv_signature'],
+            'config': config_digest,
+            'media': {path: self.media_store.digest(path) for path in media_paths},
+        }
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest atomically if anything changed."""
+        if not self._dirty:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.build_manifest.')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f, indent=4, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            print(f"Error saving build manifest: {e}")
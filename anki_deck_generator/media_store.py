@@ -0,0 +1,299 @@
+import os
+import json
+import stat
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from anki_deck_generator.config import MEDIA_DIR
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Hidden directory inside the media directory that holds the store
+STORE_DIR_NAME = '.store'
+
+# Linux ioctl that makes a file share another file's blocks copy-on-write
+FICLONE = 0x40049409
+
+
+def clone_file(src: str, dst: str) -> bool:
+    """
+    Create dst as a copy-on-write clone (reflink) of src.
+
+    Only some filesystems (Btrfs, XFS, APFS via cp -c, ...) support this; the
+    clone shares src's blocks until either file is written to.
+
+    Args:
+        src: Path to the existing file
+        dst: Path of the clone, which must not exist
+
+    Returns:
+        True if dst was created as a clone
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'xb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                cloned = False
+            else:
+                cloned = True
+        if not cloned:
+            os.remove(dst)
+        else:
+            shutil.copystat(src, dst)
+        return cloned
+    except OSError:
+        return False
+
+
+class MediaStore:
+    """
+    Content-addressed store for the files in the media directory.
+
+    Every media file is identified by the SHA-256 digest of its bytes. Digests
+    are cached by (path, size, mtime), so a file is only read again after it
+    changes. Packaging only uses this index; nothing is copied into the store
+    unless deduplicate() is run, which keeps each distinct content once under
+    objects/<digest> as a read-only copy that never shares an inode with the
+    editable files in the media directory, and replaces byte-identical media
+    files with copy-on-write clones of their object where the filesystem
+    supports it.
+    """
+
+    def __init__(self, media_dir: Path = MEDIA_DIR, store_dir: Optional[Path] = None):
+        """
+        Initialize the store.
+
+        Args:
+            media_dir: Directory holding the media files referenced by decks
+            store_dir: Directory for the store's objects and hash index
+                (defaults to a hidden directory inside media_dir)
+        """
+        self.media_dir = Path(media_dir)
+        self.store_dir = Path(store_dir) if store_dir else self.media_dir / STORE_DIR_NAME
+        self.objects_dir = self.store_dir / 'objects'
+        self.index_path = self.store_dir / 'index.json'
+        self._index: Optional[Dict[str, List]] = None
+        self._dirty = False
+
+    def _load_index(self) -> Dict[str, List]:
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._index = {}
+        return self._index
+
+    def digest(self, path: str) -> Optional[str]:
+        """
+        Return the SHA-256 digest of a file, using the cache when it is unchanged.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            Hex digest, or None if the file does not exist
+        """
+        try:
+            stats = os.stat(path)
+        except OSError:
+            return None
+
+        index = self._load_index()
+        key = os.path.abspath(path)
+        cached = index.get(key)
+        if cached and cached[0] == stats.st_size and cached[1] == stats.st_mtime_ns:
+            return cached[2]
+
+        digest = hash_file(path)
+
+        index[key] = [stats.st_size, stats.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def object_path(self, digest: str) -> Path:
+        """Return the path where the content with this digest is stored."""
+        return self.objects_dir / digest[:2] / digest
+
+    def resolve(self, names: Iterable[str]) -> List[str]:
+        """
+        Resolve referenced media file names against the media directory.
+
+        The directory is listed once per call rather than checked per name.
+
+        Args:
+            names: Referenced file names (basenames)
+
+        Returns:
+            Paths of the referenced files that exist, without duplicates
+        """
+        if not self.media_dir.is_dir():
+            return []
+        available = {entry.name for entry in os.scandir(self.media_dir) if entry.is_file()}
+        return [str(self.media_dir / name) for name in dict.fromkeys(names) if name in available]
+
+    def put(self, path: str) -> Optional[str]:
+        """
+        Add a file's content to the store.
+
+        The object is a clone or copy of the file, never a hard link, and is
+        only kept if the copy hashes to the file's digest, so a file changing
+        while it is stored cannot leave a wrong object behind.
+
+        Args:
+            path: Path to the file
+
+        Returns:
+            The file's digest, or None if it does not exist or changed while
+            being stored
+        """
+        digest = self.digest(path)
+        if digest is None:
+            return None
+
+        target = self.object_path(digest)
+        if target.exists() and not os.path.samefile(path, target):
+            return digest
+
+        os.makedirs(target.parent, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix='.object.')
+        os.close(fd)
+        os.remove(tmp_path)
+        try:
+            if not clone_file(path, tmp_path):
+                shutil.copy2(path, tmp_path)
+            if hash_file(tmp_path) != digest:
+                os.remove(tmp_path)
+                return None
+            os.chmod(tmp_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp_path, target)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
+
+    def deduplicate(self) -> Tuple[int, int]:
+        """
+        Replace byte-identical media files with copy-on-write clones of one object.
+
+        Each clone is still a separate file: writing to one copies the blocks
+        it changes instead of altering the others. On filesystems without
+        clone support duplicates are left as they are. Media files that are
+        hard links to each other are split into separate files either way.
+
+        Returns:
+            A tuple of (number of files replaced by clones, bytes saved)
+        """
+        cloned = 0
+        saved = 0
+        if not self.media_dir.is_dir():
+            return cloned, saved
+
+        seen: set = set()
+        for entry in sorted(os.scandir(self.media_dir), key=lambda e: e.name):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+
+            shared = entry.stat().st_nlink > 1
+            digest = self.put(entry.path)
+            if digest is None:
+                continue
+            first = digest not in seen
+            seen.add(digest)
+            if first and not shared:
+                continue
+
+            # Build the replacement next to the file, then swap it in
+            size = entry.stat().st_size
+            fd, tmp_path = tempfile.mkstemp(dir=self.media_dir, prefix='.dedupe.')
+            os.close(fd)
+            os.remove(tmp_path)
+            source = str(self.object_path(digest))
+            if clone_file(source, tmp_path):
+                shutil.copystat(entry.path, tmp_path)
+                if not first:
+                    cloned += 1
+                    saved += size
+            elif shared:
+                shutil.copy2(entry.path, tmp_path)
+            else:
+                continue
+            os.replace(tmp_path, entry.path)
+            self.digest(entry.path)
+
+        return cloned, saved
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Summarize the media directory.
+
+        Returns:
+            Counts of files and distinct contents, their total size, the bytes
+            used on disk (hard links counted once; clones cannot be told apart
+            from copies and count in full) and the bytes duplicates take up
+        """
+        files = 0
+        total_bytes = 0
+        unique: Dict[str, int] = {}
+        inodes: Dict[Tuple[int, int], int] = {}
+        if self.media_dir.is_dir():
+            for entry in os.scandir(self.media_dir):
+                if not entry.is_file() or entry.name.startswith('.'):
+                    continue
+                stats = entry.stat()
+                files += 1
+                total_bytes += stats.st_size
+                inodes[(stats.st_dev, stats.st_ino)] = stats.st_size
+                unique.setdefault(self.digest(entry.path), stats.st_size)
+        disk_bytes = sum(inodes.values())
+        return {
+            'files': files,
+            'unique': len(unique),
+            'bytes': total_bytes,
+            'disk_bytes': disk_bytes,
+            'reclaimable_bytes': disk_bytes - sum(unique.values()),
+        }
+
+    def save(self) -> None:
+        """Persist the hash index if it changed."""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, prefix='.index.')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"Error saving media index: {e}")
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+_stores: Dict[str, MediaStore] = {}
+
+
+def get_media_store(media_dir: Path = MEDIA_DIR) -> MediaStore:
+    """Return the process-wide store for a media directory."""
+    key = os.path.abspath(media_dir)
+    if key not in _stores:
+        _stores[key] = MediaStore(media_dir)
+    return _stores[key]
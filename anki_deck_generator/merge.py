@@ -0,0 +1,367 @@
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import zipfile
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import genanki
+from genanki.apkg_col import APKG_COL
+from genanki.apkg_schema import APKG_SCHEMA
+
+from anki_deck_generator.apkg_writer import BULK_PRAGMAS
+from anki_deck_generator.ids import stable_id
+from anki_deck_generator.templates import shared_model_name
+
+# Collection database names, newest first, looked up inside each package
+COLLECTION_NAMES = ('collection.anki21', 'collection.anki2')
+
+NOTE_COLUMNS = 'id, guid, mid, mod, usn, tags, flds, sfld, csum, flags, data'
+CARD_COLUMNS = (
+    'id, nid, did, ord, mod, usn, type, queue, due, ivl, factor, reps, lapses, left, odue, odid, flags, data'
+)
+
+# Model JSON keys that do not affect how a model renders its notes
+VOLATILE_MODEL_KEYS = ('id', 'did', 'mod', 'usn', 'name', 'tags', 'vers')
+
+# Anki's built-in default deck, present in every collection
+DEFAULT_DECK_ID = '1'
+
+
+def _model_signature(model: Dict) -> str:
+    """Return a digest of the parts of a model JSON that define its notes and cards."""
+    stable = {key: value for key, value in model.items() if key not in VOLATILE_MODEL_KEYS}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _member_digest(package: zipfile.ZipFile, member: str) -> str:
+    """Hash a zip member by streaming it."""
+    sha = hashlib.sha256()
+    with package.open(member) as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _comment_digest(info: zipfile.ZipInfo) -> Optional[str]:
+    """Return the SHA-256 digest stored as a member's comment by write_package_file, if any."""
+    comment = info.comment.decode('ascii', 'replace')
+    return comment if len(comment) == 64 and all(c in '0123456789abcdef' for c in comment) else None
+
+
+def _renamed_media(name: str, digest: str) -> str:
+    """Name for a media file whose name is already taken by different content."""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}_{digest[:8]}{ext}"
+
+
+class PackageMerger:
+    """
+    Merge APKG packages into one package at the SQLite level.
+
+    Each source collection is streamed out of its zip and ATTACHed to the
+    merged collection, and its notes and cards are copied with INSERT ...
+    SELECT. Note and card IDs are shifted into a fresh range per package,
+    model and deck IDs are remapped through small temporary tables, and
+    media files are streamed from zip to zip. No notes are loaded into
+    Python, so memory use does not grow with the size of the decks.
+
+    Every source deck becomes a subdeck of the merged deck, and decks whose
+    note models have the same fields, templates and CSS share one model.
+    Notes whose GUID was already added by an earlier package are skipped, as
+    Anki would skip them on import. Media files with the same name and content are stored
+    once, compared by the digests the packages record in their member
+    comments (hashing only members without one); a name reused for different
+    content is renamed and the references in that package's notes are
+    rewritten.
+    """
+
+    def __init__(self, output_path: str, deck_id: int, deck_name: str, timestamp: Optional[float] = None):
+        """
+        Start a merged package.
+
+        Args:
+            output_path: Path where the merged APKG file will be saved
+            deck_id: Unique identifier for the merged deck
+            deck_name: Name of the merged deck
+            timestamp: Start of the note and card ID range (defaults to now)
+        """
+        self.output_path = output_path
+        self.deck_id = deck_id
+        self.deck_name = deck_name
+        self.next_id = int((time.time() if timestamp is None else timestamp) * 1000)
+
+        self.note_count = 0
+        self.card_count = 0
+        self.duplicate_count = 0
+        self.package_count = 0
+
+        self._temp_dir = tempfile.mkdtemp(prefix='anki_merge_')
+        self.db_path = os.path.join(self._temp_dir, 'collection.anki2')
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        for pragma in BULK_PRAGMAS:
+            self.conn.execute(pragma)
+        self.conn.executescript(APKG_SCHEMA)
+        self.conn.executescript(APKG_COL)
+        self.conn.execute('CREATE INDEX ix_merge_guid ON notes (guid)')
+        self.conn.execute('CREATE TEMP TABLE model_map (old INTEGER PRIMARY KEY, new INTEGER)')
+        self.conn.execute('CREATE TEMP TABLE deck_map (old INTEGER PRIMARY KEY, new INTEGER)')
+
+        self.models: Dict[str, Dict] = {}
+        self._model_ids_by_signature: Dict[str, str] = {}
+        self.decks = json.loads(self.conn.execute('SELECT decks FROM col').fetchone()[0])
+        self.decks[str(deck_id)] = genanki.Deck(deck_id, deck_name).to_json()
+        self.dconf = json.loads(self.conn.execute('SELECT dconf FROM col').fetchone()[0])
+
+        self.media: Dict[str, str] = {}
+        self._id_range = (0, -1)
+        self.zip = zipfile.ZipFile(output_path, 'w')
+
+    def add_package(self, package_path: str) -> int:
+        """
+        Merge one APKG package.
+
+        Args:
+            package_path: Path to the APKG file
+
+        Returns:
+            Number of notes added from the package
+        """
+        with zipfile.ZipFile(package_path, 'r') as package:
+            names = set(package.namelist())
+            collection = next((name for name in COLLECTION_NAMES if name in names), None)
+            if collection is None:
+                print(f"Warning: No collection found in {package_path}")
+                return 0
+
+            # Only the collection is written to disk; SQLite cannot ATTACH a zip member
+            src_path = os.path.join(self._temp_dir, f'source_{self.package_count}.db')
+            with package.open(collection) as src, open(src_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+
+            try:
+                self.conn.execute('ATTACH DATABASE ? AS src', (src_path,))
+                try:
+                    added = self._merge_collection(os.path.basename(package_path))
+                    renames = self._merge_media(package, names)
+                    if renames:
+                        self._rewrite_media_references(renames)
+                finally:
+                    self.conn.execute('DETACH DATABASE src')
+            finally:
+                os.remove(src_path)
+
+        self.package_count += 1
+        return added
+
+    def _merge_collection(self, package_name: str) -> int:
+        """Copy the models, decks, notes and cards of the attached collection."""
+        cursor = self.conn.cursor()
+        src_models_json, src_decks_json, src_dconf_json = cursor.execute(
+            'SELECT models, decks, dconf FROM src.col'
+        ).fetchone()
+        src_models = json.loads(src_models_json)
+        src_decks = json.loads(src_decks_json)
+
+        for conf_id, conf in json.loads(src_dconf_json).items():
+            self.dconf.setdefault(conf_id, conf)
+
+        cursor.execute('BEGIN')
+        cursor.execute('DELETE FROM temp.deck_map')
+        cursor.execute('DELETE FROM temp.model_map')
+
+        # Every source deck becomes a subdeck of the merged deck
+        deck_map: Dict[int, int] = {}
+        for src_deck_id, deck in src_decks.items():
+            if src_deck_id == DEFAULT_DECK_ID:
+                deck_map[int(src_deck_id)] = self.deck_id
+                continue
+            name = f"{self.deck_name}::{deck['name']}"
+            new_id = stable_id('deck', name)
+            deck_map[int(src_deck_id)] = new_id
+            self.decks[str(new_id)] = dict(deck, id=new_id, name=name)
+        cursor.executemany('INSERT INTO temp.deck_map VALUES (?, ?)', deck_map.items())
+
+        # Models with the same schema are shared, whatever their name; a
+        # clashing ID gets a new one
+        model_map: Dict[int, int] = {}
+        for src_model_id, model in src_models.items():
+            signature = _model_signature(model)
+            new_id = self._model_ids_by_signature.get(signature)
+            if new_id is not None and self.models[new_id].get('name') != model.get('name'):
+                # Named after one deck, the model now serves several
+                shared = self.models[new_id]
+                shared['name'] = shared_model_name(
+                    [field['name'] for field in shared.get('flds', [])],
+                    shared.get('type', 0),
+                    len(shared.get('tmpls', [])) > 1
+                )
+            if new_id is None:
+                new_id = src_model_id
+                if new_id in self.models:
+                    new_id = str(stable_id('model', package_name, src_model_id))
+                did = deck_map.get(model.get('did'), self.deck_id)
+                self.models[new_id] = dict(model, id=int(new_id), did=did)
+                self._model_ids_by_signature[signature] = new_id
+            model_map[int(src_model_id)] = int(new_id)
+        cursor.executemany('INSERT INTO temp.model_map VALUES (?, ?)', model_map.items())
+
+        # Shift note and card IDs into a range no earlier package used
+        low, high = cursor.execute(
+            'SELECT MIN(low), MAX(high) FROM ('
+            ' SELECT MIN(id) AS low, MAX(id) AS high FROM src.notes'
+            ' UNION ALL SELECT MIN(id), MAX(id) FROM src.cards)'
+        ).fetchone()
+        if low is None:
+            self._id_range = (0, -1)
+            cursor.execute('COMMIT')
+            return 0
+        offset = self.next_id - low
+        self._id_range = (low + offset, high + offset)
+        self.next_id = high + offset + 1
+
+        before_notes = self.note_count
+        cursor.execute(
+            f'INSERT INTO main.notes ({NOTE_COLUMNS}) '
+            f'SELECT n.id + :offset, n.guid, COALESCE(m.new, n.mid), n.mod, n.usn, n.tags, n.flds, '
+            f'n.sfld, n.csum, n.flags, n.data '
+            f'FROM src.notes AS n LEFT JOIN temp.model_map AS m ON m.old = n.mid '
+            f'WHERE n.guid NOT IN (SELECT guid FROM main.notes) '
+            f'ORDER BY n.id',
+            {'offset': offset}
+        )
+        added = cursor.rowcount
+        self.note_count += added
+        self.duplicate_count += cursor.execute('SELECT COUNT(*) FROM src.notes').fetchone()[0] - added
+
+        cursor.execute(
+            f'INSERT INTO main.cards ({CARD_COLUMNS}) '
+            f'SELECT c.id + :offset, c.nid + :offset, COALESCE(d.new, :deck_id), c.ord, c.mod, c.usn, '
+            f'c.type, c.queue, c.due, c.ivl, c.factor, c.reps, c.lapses, c.left, c.odue, c.odid, '
+            f'c.flags, c.data '
+            f'FROM src.cards AS c LEFT JOIN temp.deck_map AS d ON d.old = c.did '
+            f'WHERE EXISTS (SELECT 1 FROM main.notes WHERE id = c.nid + :offset) '
+            f'ORDER BY c.id',
+            {'offset': offset, 'deck_id': self.deck_id}
+        )
+        self.card_count += cursor.rowcount
+        cursor.execute('COMMIT')
+
+        return self.note_count - before_notes
+
+    def _merge_media(self, package: zipfile.ZipFile, names: set) -> Dict[str, str]:
+        """
+        Stream a package's media files into the merged package.
+
+        Returns:
+            Media names that had to be renamed, mapped to their new names
+        """
+        if 'media' not in names:
+            return {}
+        with package.open('media') as f:
+            media_map = json.load(f)
+
+        renames: Dict[str, str] = {}
+        for member, name in media_map.items():
+            if member not in names:
+                continue
+            # Packages written by this generator carry each member's digest
+            digest = _comment_digest(package.getinfo(member)) or _member_digest(package, member)
+
+            existing = self.media.get(name)
+            if existing == digest:
+                continue
+            if existing is not None:
+                new_name = _renamed_media(name, digest)
+                renames[name] = new_name
+                name = new_name
+                if self.media.get(name) == digest:
+                    continue
+
+            info = zipfile.ZipInfo(str(len(self.media)), package.getinfo(member).date_time)
+            info.comment = digest.encode('ascii')
+            with package.open(member) as src, self.zip.open(info, 'w') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            self.media[name] = digest
+
+        return renames
+
+    def _rewrite_media_references(self, renames: Dict[str, str]) -> None:
+        """Point the notes added from the current package at renamed media files."""
+        low, high = self._id_range
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN')
+        for old, new in renames.items():
+            for template in ('src="{}"', "src='{}'", '[sound:{}]'):
+                cursor.execute(
+                    'UPDATE main.notes SET flds = REPLACE(flds, ?, ?) WHERE id BETWEEN ? AND ?',
+                    (template.format(old), template.format(new), low, high)
+                )
+        cursor.execute('COMMIT')
+
+    def close(self) -> None:
+        """Write the merged collection and media map and finish the package."""
+        try:
+            self.conn.execute('DROP INDEX ix_merge_guid')
+            self.conn.execute(
+                'UPDATE col SET models = ?, decks = ?, dconf = ?',
+                (json.dumps(self.models), json.dumps(self.decks), json.dumps(self.dconf))
+            )
+            self.conn.close()
+
+            self.zip.write(self.db_path, 'collection.anki2')
+            media_json = {str(idx): name for idx, name in enumerate(self.media)}
+            self.zip.writestr('media', json.dumps(media_json))
+            self.zip.close()
+        finally:
+            self.conn.close()
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+
+    def abort(self) -> None:
+        """Discard the partially merged package."""
+        self.conn.close()
+        self.zip.close()
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def __enter__(self) -> 'PackageMerger':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def merge_packages(
+    package_paths: List[str],
+    output_path: str,
+    deck_id: int,
+    deck_name: str,
+    timestamp: Optional[float] = None
+) -> Tuple[int, int, int]:
+    """
+    Merge APKG packages into a single package.
+
+    Args:
+        package_paths: Paths to the APKG files to merge, in order
+        output_path: Path where the merged APKG file will be saved
+        deck_id: Unique identifier for the merged deck
+        deck_name: Name of the merged deck
+        timestamp: Start of the note and card ID range (defaults to now)
+
+    Returns:
+        A tuple of (notes, cards, duplicate notes skipped)
+    """
+    with PackageMerger(output_path, deck_id, deck_name, timestamp) as merger:
+        for package_path in package_paths:
+            if not os.path.exists(package_path):
+                print(f"Warning: Deck file not found: {package_path}")
+                continue
+            merger.add_package(package_path)
+    return merger.note_count, merger.card_count, merger.duplicate_count
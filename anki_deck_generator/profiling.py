@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import contextlib
+import contextvars
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# Bump when the layout of the JSON report changes
+PROFILE_REPORT_VERSION = 1
+
+# Build stages, in pipeline order. 'export' is the genanki engine's package
+# write, which fills the collection database and zips it in one call.
+STAGES = ('parse', 'tags', 'templates', 'notes', 'media', 'sqlite', 'zip', 'export')
+
+# Default file name of the JSON report, written to the output directory
+DEFAULT_REPORT_NAME = 'profile.json'
+
+
+def _new_record() -> Dict[str, Any]:
+    return {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'peak': 0, 'rows': 0, 'bytes': 0}
+
+
+def _merge_record(target: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Add the measurements of record to target; peaks are combined with max."""
+    for key in ('calls', 'wall', 'cpu', 'rows', 'bytes'):
+        target[key] += record[key]
+    target['peak'] = max(target['peak'], record['peak'])
+
+
+def _record_report(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the JSON form of a record, with throughput derived from wall time."""
+    wall = record['wall']
+    return {
+        'calls': record['calls'],
+        'wall_seconds': round(wall, 6),
+        'cpu_seconds': round(record['cpu'], 6),
+        'peak_memory_bytes': record['peak'],
+        'rows': record['rows'],
+        'bytes': record['bytes'],
+        'rows_per_second': round(record['rows'] / wall, 1) if wall > 0 and record['rows'] else None,
+        'bytes_per_second': round(record['bytes'] / wall, 1) if wall > 0 and record['bytes'] else None,
+    }
+
+
+def _stage_order(name: str) -> int:
+    return STAGES.index(name) if name in STAGES else len(STAGES)
+
+
+class BuildProfiler:
+    """
+    Record wall time, CPU time and peak traced memory of each build stage and deck.
+
+    Stages are entered with stage(); measurements of a stage that runs several
+    times (such as once per chunk when streaming) are added up. Peak memory is
+    the largest amount allocated above the level at which a stage or deck
+    started, measured with tracemalloc, which slows the build down noticeably
+    while it traces.
+
+    Use the profiler as a context manager to make it the active profiler that
+    the build stages report to.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        """
+        Initialize the profiler.
+
+        Args:
+            trace_memory: Whether to measure peak memory with tracemalloc
+        """
+        self.trace_memory = trace_memory
+        self.created = datetime.now().isoformat()
+        self.decks: List[Dict[str, Any]] = []
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._deck: Optional[Dict[str, Any]] = None
+        self._scopes: List[Dict[str, int]] = []
+        self._started_tracing = False
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> 'BuildProfiler':
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _active_profiler.reset(self._token)
+        self._token = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _fold_peak(self) -> None:
+        """Credit the traced peak so far to every open scope, before it is reset."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for scope in self._scopes:
+            scope['peak'] = max(scope['peak'], peak)
+
+    @contextlib.contextmanager
+    def _measure(self, record: Dict[str, Any]) -> Iterator[None]:
+        """Add the wall time, CPU time and memory peak of the enclosed block to record."""
+        scope = None
+        if tracemalloc.is_tracing():
+            self._fold_peak()
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            scope = {'base': current, 'peak': current}
+            self._scopes.append(scope)
+
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        try:
+            yield
+        finally:
+            record['wall'] += time.perf_counter() - wall_started
+            record['cpu'] += time.process_time() - cpu_started
+            record['calls'] += 1
+            if scope is not None:
+                self._fold_peak()
+                self._scopes.remove(scope)
+                record['peak'] = max(record['peak'], scope['peak'] - scope['base'])
+
+    @contextlib.contextmanager
+    def deck(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Measure the build of one deck; stages entered meanwhile are attributed to it.
+
+        Args:
+            name: Name of the deck, usually its CSV file name
+
+        Yields:
+            The deck's counters; set 'rows' and 'bytes' to report its throughput
+        """
+        deck = {'name': name, 'stages': {}, **_new_record()}
+        outer, self._deck = self._deck, deck
+        try:
+            with self._measure(deck):
+                yield deck
+        finally:
+            self._deck = outer
+            self.decks.append(deck)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Measure one run of a build stage.
+
+        Args:
+            name: Name of the stage (see STAGES)
+
+        Yields:
+            The counters of this run; add to 'rows' and 'bytes' to report its throughput
+        """
+        record = _new_record()
+        try:
+            with self._measure(record):
+                yield record
+        finally:
+            _merge_record(self.stages.setdefault(name, _new_record()), record)
+            if self._deck is not None:
+                _merge_record(self._deck['stages'].setdefault(name, _new_record()), record)
+
+    def add_decks(self, decks: List[Dict[str, Any]]) -> None:
+        """
+        Add deck records measured by another profiler, e.g. in a worker process.
+
+        Args:
+            decks: Records from that profiler's decks attribute
+        """
+        for deck in decks:
+            self.decks.append(deck)
+            for name, record in deck['stages'].items():
+                _merge_record(self.stages.setdefault(name, _new_record()), record)
+
+    def totals(self) -> Dict[str, Any]:
+        """Return the combined measurements of all decks."""
+        total = _new_record()
+        for deck in self.decks:
+            _merge_record(total, deck)
+        return total
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the machine-readable report.
+
+        Returns:
+            A JSON-serializable dictionary with totals, per-stage totals and per-deck measurements
+        """
+        return {
+            'version': PROFILE_REPORT_VERSION,
+            'created': self.created,
+            'trace_memory': self.trace_memory,
+            'totals': _record_report(self.totals()),
+            'stages': {
+                name: _record_report(self.stages[name])
+                for name in sorted(self.stages, key=_stage_order)
+            },
+            'decks': [
+                {
+                    'name': deck['name'],
+                    **_record_report(deck),
+                    'stages': {
+                        name: _record_report(deck['stages'][name])
+                        for name in sorted(deck['stages'], key=_stage_order)
+                    },
+                }
+                for deck in self.decks
+            ],
+        }
+
+    def write_report(self, path: str) -> bool:
+        """
+        Write the JSON report to a file.
+
+        Args:
+            path: Path of the report file
+
+        Returns:
+            True if the report was written
+        """
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=4)
+            return True
+        except Exception as e:
+            print(f"Error writing profile report: {e}")
+            return False
+
+    def format_summary(self) -> str:
+        """Return the summary table of every deck and its stages, followed by the stage totals."""
+        header = f"{'Deck / stage':<32} {'Wall s':>9} {'CPU s':>9} {'Peak MiB':>9} {'Rows':>10} {'Rows/s':>11} {'MiB/s':>8}"
+        lines = [header, '-' * len(header)]
+
+        def line(label: str, record: Dict[str, Any]) -> str:
+            report = _record_report(record)
+            peak = f"{record['peak'] / (1 << 20):.1f}" if self.trace_memory else '-'
+            rows_per_second = f"{report['rows_per_second']:,.0f}" if report['rows_per_second'] else '-'
+            mib_per_second = f"{report['bytes_per_second'] / (1 << 20):.2f}" if report['bytes_per_second'] else '-'
+            return (
+                f"{label[:32]:<32} {record['wall']:>9.3f} {record['cpu']:>9.3f} {peak:>9} "
+                f"{record['rows']:>10,} {rows_per_second:>11} {mib_per_second:>8}"
+            )
+
+        for deck in self.decks:
+            lines.append(line(deck['name'], deck))
+            for name in sorted(deck['stages'], key=_stage_order):
+                lines.append(line(f"  {name}", deck['stages'][name]))
+
+        if len(self.decks) > 1:
+            lines.append('-' * len(header))
+            for name in sorted(self.stages, key=_stage_order):
+                lines.append(line(f"  {name}", self.stages[name]))
+        lines.append(line('Total', self.totals()))
+        return '\n'.join(lines)
+
+    def print_summary(self) -> None:
+        """Print the summary table."""
+        print(self.format_summary())
+
+
+_active_profiler: contextvars.ContextVar[Optional[BuildProfiler]] = contextvars.ContextVar('active_profiler', default=None)
+
+
+def get_profiler() -> Optional[BuildProfiler]:
+    """Return the active profiler, or None if the build is not being profiled."""
+    return _active_profiler.get()
+
+
+def stage(name: str, profiler: Optional[BuildProfiler] = None):
+    """
+    Measure a build stage with the given or the active profiler, if any.
+
+    Without a profiler this is a no-op context manager, so the stages cost
+    next to nothing in normal builds.
+
+    Args:
+        name: Name of the stage (see STAGES)
+        profiler: Profiler to report to (defaults to the active one)
+
+    Returns:
+        A context manager yielding the stage's counters dictionary
+    """
+    profiler = profiler or _active_profiler.get()
+    if profiler is None:
+        return contextlib.nullcontext(_new_record())
+    return profiler.stage(name)
+
+
+def deck(name: str, profiler: Optional[BuildProfiler] = None):
+    """
+    Measure the build of a deck with the given or the active profiler, if any.
+
+    Args:
+        name: Name of the deck
+        profiler: Profiler to report to (defaults to the active one)
+
+    Returns:
+        A context manager yielding the deck's counters dictionary
+    """
+    profiler = profiler or _active_profiler.get()
+    if profiler is None:
+        return contextlib.nullcontext(_new_record())
+    return profiler.deck(name)
+
+
+def finish_profile(profiler: BuildProfiler, report_path: str) -> None:
+    """
+    Print the summary table of a profiled build and write its JSON report.
+
+    Args:
+        profiler: Profiler of the finished build
+        report_path: Path of the JSON report
+    """
+    if not profiler.decks:
+        print("\nNo decks were built, so there is nothing to profile (use --force to rebuild up-to-date decks).")
+        return
+
+    print("\n📊 Build profile:")
+    profiler.print_summary()
+    if profiler.write_report(report_path):
+        print(f"\nProfile report written to {report_path}")
@@ -0,0 +1,230 @@
+import os
+import csv
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Files up to this size are parsed with the csv module; pandas is only
+# imported for larger files, where its C parser is faster
+SMALL_DECK_BYTES = 1 << 20
+
+# Cells pandas.read_csv reads as missing by default. Both parsers turn them
+# into empty strings, so a deck builds the same notes whichever one is used.
+NA_VALUES = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+class IrregularCsvError(ValueError):
+    """Raised when a CSV file needs pandas' handling of odd headers or rows."""
+
+
+def _open_csv(csv_path: str):
+    """Open a CSV file for the csv module, skipping a UTF-8 byte order mark like pandas does."""
+    return open(csv_path, 'r', encoding='utf-8-sig', newline='')
+
+
+def _read_header(reader) -> List[str]:
+    """Read the header row, rejecting headers pandas would rename."""
+    header = next(reader, None)
+    if not header or len(header) < 2 or '' in header or len(set(header)) != len(header):
+        # Missing, single-column, unnamed or duplicate columns
+        raise IrregularCsvError('header needs pandas')
+    return header
+
+
+def _read_rows(reader, width: int, limit: Optional[int] = None) -> List[Tuple[str, ...]]:
+    """
+    Read data rows the way pandas.read_csv(dtype=str).fillna('') would.
+
+    Blank lines are skipped (and do not count towards limit), short rows are
+    padded and missing values become empty strings.
+    """
+    rows = []
+    for record in reader:
+        if limit is not None and len(rows) >= limit:
+            break
+        if len(record) <= 1 and not (record and record[0].strip()):
+            continue  # Blank line
+        if len(record) > width:
+            raise IrregularCsvError('row wider than the header')
+        if len(record) < width:
+            record.extend([''] * (width - len(record)))
+        rows.append(tuple('' if cell in NA_VALUES else cell for cell in record))
+    return rows
+
+
+class DeckSource:
+    """
+    A CSV deck file that is parsed at most once and shared by every build stage.
+
+    The header, the rows and the file stats are loaded lazily and cached, so
+    analysing the structure, probing for media, building notes and scanning
+    media references all reuse the same parse. Small files are parsed with
+    the csv module into tuples of strings; larger files (and files with
+    headers or rows only pandas handles) are read into a string DataFrame.
+    """
+
+    def __init__(self, csv_path: str):
+        """
+        Initialize the source for a CSV file.
+
+        Args:
+            csv_path: Path to the CSV file
+        """
+        self.csv_path = str(csv_path)
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"CSV file not found: {self.csv_path}")
+
+        stats = os.stat(self.csv_path)
+        self.size = stats.st_size
+        self.mtime = stats.st_mtime
+        self.ctime = stats.st_ctime
+
+        self._columns: Optional[List[str]] = None
+        self._rows: Optional[List[Tuple[str, ...]]] = None
+        self._frame: Optional['pd.DataFrame'] = None
+        self._needs_pandas = self.size > SMALL_DECK_BYTES
+
+    @property
+    def filename(self) -> str:
+        """File name of the CSV, including the extension."""
+        return os.path.basename(self.csv_path)
+
+    @property
+    def base_name(self) -> str:
+        """File name of the CSV without the extension."""
+        return os.path.splitext(self.filename)[0]
+
+    def load(self) -> 'DeckSource':
+        """Parse the rows now, so later stages (including small probes) all reuse them."""
+        if self._rows is None and self._frame is None:
+            if not self._parse_rows():
+                self.frame
+        return self
+
+    def _parse_rows(self) -> bool:
+        """Parse a small file with the csv module; return False if it needs pandas."""
+        if self._needs_pandas:
+            return False
+        try:
+            with _open_csv(self.csv_path) as f:
+                reader = csv.reader(f)
+                columns = _read_header(reader)
+                self._rows = _read_rows(reader, len(columns))
+            self._columns = columns
+            return True
+        except (IrregularCsvError, csv.Error, UnicodeDecodeError):
+            self._needs_pandas = True
+            return False
+
+    @property
+    def has_rows(self) -> bool:
+        """Whether the rows were parsed with the csv module, without pandas."""
+        return self._rows is not None
+
+    @property
+    def rows(self) -> List[Tuple[str, ...]]:
+        """All rows of the CSV as tuples of strings, with missing values as empty strings."""
+        if self._rows is None and not self._parse_rows():
+            frame = self.frame.fillna('')
+            return list(zip(*(frame[col].astype(str).tolist() for col in frame.columns)))
+        return self._rows
+
+    @property
+    def frame(self) -> 'pd.DataFrame':
+        """All rows of the CSV, every column read as strings."""
+        if self._frame is None:
+            import pandas as pd
+
+            self._frame = pd.read_csv(self.csv_path, dtype=str)
+            self._columns = list(self._frame.columns)
+        return self._frame
+
+    @property
+    def columns(self) -> List[str]:
+        """Column names from the header row, read without parsing the rows."""
+        if self._columns is None:
+            try:
+                with _open_csv(self.csv_path) as f:
+                    self._columns = _read_header(csv.reader(f))
+            except (IrregularCsvError, csv.Error, UnicodeDecodeError):
+                import pandas as pd
+
+                self._needs_pandas = True
+                self._columns = list(pd.read_csv(self.csv_path, nrows=0).columns)
+        return self._columns
+
+    @property
+    def row_count(self) -> int:
+        """Number of data rows."""
+        if self._frame is None and (self._rows is not None or self._parse_rows()):
+            return len(self._rows)
+        return len(self.frame)
+
+    def count_rows(self) -> int:
+        """
+        Count the data rows without parsing them, unless they are already parsed.
+
+        Lines are counted in binary mode; only files with quoted cells, which
+        may span lines, or with bare carriage return line endings are run
+        through the csv module, and no rows are kept in memory either way.
+        Blank lines are not counted, like in row_count.
+
+        Returns:
+            Number of data rows
+        """
+        if self.is_loaded:
+            return self.row_count
+        try:
+            with open(self.csv_path, 'rb') as f:
+                irregular = any(
+                    b'"' in block or b'\r' in block.replace(b'\r\n', b'')
+                    for block in iter(lambda: f.read(1 << 20), b'')
+                )
+                if not irregular:
+                    f.seek(0)
+                    return max(sum(1 for line in f if line.strip()) - 1, 0)
+            with _open_csv(self.csv_path) as f:
+                reader = csv.reader(f)
+                _read_header(reader)
+                return sum(1 for record in reader if len(record) > 1 or (record and record[0].strip()))
+        except (IrregularCsvError, csv.Error, UnicodeDecodeError):
+            return self.row_count
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the rows have already been parsed."""
+        return self._rows is not None or self._frame is not None
+
+    def head(self, n: int = 5) -> 'pd.DataFrame':
+        """Return the first n rows, reusing the full parse if it already happened."""
+        if self._frame is not None:
+            return self._frame.head(n)
+        import pandas as pd
+
+        return pd.read_csv(self.csv_path, dtype=str, nrows=n)
+
+    def head_rows(self, n: int = 5) -> List[Tuple[str, ...]]:
+        """
+        Return the first n rows as tuples of strings, reusing the full parse if it already happened.
+
+        Args:
+            n: Number of rows
+
+        Returns:
+            Rows with missing values as empty strings
+        """
+        if self._rows is not None:
+            return self._rows[:n]
+        if self._frame is None and not self._needs_pandas:
+            try:
+                with _open_csv(self.csv_path) as f:
+                    reader = csv.reader(f)
+                    return _read_rows(reader, len(_read_header(reader)), n)
+            except (IrregularCsvError, csv.Error, UnicodeDecodeError):
+                self._needs_pandas = True
+        frame = self.head(n).fillna('')
+        return list(zip(*(frame[col].astype(str).tolist() for col in frame.columns)))
@@ -0,0 +1,457 @@
+import re
+import json
+import fnmatch
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from anki_deck_generator.config import FrozenDict
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# Language learning tags detected from indicator words in the filename
+LANGUAGE_LEARNING_TAGS = {
+    # Basic categories
+    'vocabulary': ['vocab', 'word', 'dictionary', 'lexicon', 'term'],
+    'grammar': ['grammar', 'structure', 'syntax', 'rule'],
+    'verb': ['verb', 'conjugation', 'tense', 'infinitive'],
+    'noun': ['noun', 'substantive', 'object', 'thing'],
+    'adjective': ['adjective', 'adj', 'descriptor'],
+    'adverb': ['adverb', 'adv'],
+    'preposition': ['preposition', 'prep'],
+    'pronoun': ['pronoun', 'subject', 'object'],
+
+    # Tenses and moods
+    'present': ['present', 'presents', 'currently'],
+    'past': ['past', 'preterite', 'imperfect', 'historical'],
+    'future': ['future', 'will', 'going to'],
+    'conditional': ['conditional', 'would'],
+    'subjunctive': ['subjunctive', 'subjuntivo'],
+    'imperative': ['imperative', 'command', 'order'],
+
+    # Common constructs
+    'ir-a': ['ir a', 'going to', 'future'],
+    'ser-estar': ['ser estar', 'being', 'to be'],
+    'por-para': ['por para', 'for']
+}
+
+# Tag filter category of the language learning tags not listed under 'content'
+GRAMMAR_TAGS = {'verb', 'noun', 'adjective', 'adverb', 'preposition', 'pronoun'}
+CONSTRUCT_TAGS = {'ir-a', 'ser-estar', 'por-para'}
+
+# Filename words that never become tags
+COMMON_WORDS = {'deck', 'card', 'cards', 'anki', 'full', 'new', 'updated', 'final', 'draft', 'test'}
+
+# Languages whose column next to an 'English' column marks a translation deck
+TRANSLATION_LANGUAGES = ('spanish', 'french', 'german', 'italian')
+
+# Per-note tags detected from whole-word keywords in the lowercased cell contents
+CONTENT_TAG_KEYWORDS = {
+    # Tenses and moods
+    'present': ['present', 'presente'],
+    'past': ['past', 'preterite', 'pretérito', 'preterito', 'indefinido', 'imperfect', 'imperfecto'],
+    'future': ['future', 'futuro'],
+    'conditional': ['conditional', 'condicional'],
+    'subjunctive': ['subjunctive', 'subjuntivo'],
+    'imperative': ['imperative', 'imperativo'],
+
+    # Common constructs
+    'ir-a': ['voy a', 'vas a', 'va a', 'vamos a', 'vais a', 'van a'],
+}
+
+# Per-note tags for contrasted pairs of common words, detected only when a
+# note contains both words (as in "ser vs estar"); one of them alone is not enough
+CONTENT_TAG_CONTRASTS = {
+    'ser-estar': ('ser', 'estar'),
+    'por-para': ('por', 'para'),
+}
+
+# Per-note tag for notes that reference images or audio
+MEDIA_TAG = 'media'
+MEDIA_MARKERS = ('<img', '[sound:')
+MEDIA_MARKER_PATTERN = r'<img\s+src=|\[sound:'
+
+# Optional CSV column with extra tags for each row (separated by spaces or commas)
+TAGS_COLUMN = 'Tags'
+
+FILENAME_WORD_SPLIT = re.compile(r'[_\-\s]')
+GLOB_CHARACTERS = re.compile(r'[*?\[]')
+
+
+def _tag_category(tag: str) -> str:
+    """Return the tag filter that controls a language learning tag."""
+    if tag in GRAMMAR_TAGS:
+        return 'grammar'
+    if tag in CONSTRUCT_TAGS:
+        return 'language_construct'
+    return 'content'
+
+
+def _content_category(tag: str) -> str:
+    """Return the tag filter that controls a per-note content tag."""
+    if tag == MEDIA_TAG:
+        return 'note_content'
+    return _tag_category(tag)
+
+
+def _pattern_regex(pattern: str) -> str:
+    """
+    Translate a custom tag pattern to a regular expression over the file name.
+
+    Patterns containing glob characters (*, ?, [) must match the whole file
+    name, e.g. '*_verb_*.csv'. Plain patterns keep their old meaning and
+    match anywhere in the name.
+    """
+    if GLOB_CHARACTERS.search(pattern):
+        return fnmatch.translate(pattern)
+    return f"(?s:.*{re.escape(pattern)})"
+
+
+class TagEngine:
+    """
+    Precompiled tag inference rules for one configuration.
+
+    All language learning indicators are compiled into one regular
+    expression, and all custom tag patterns into another, so tagging a file
+    costs a couple of regex scans however many rules the configuration has.
+    """
+
+    def __init__(self, tag_filters: Mapping[str, bool], custom_tags: Mapping[str, Sequence[str]]):
+        """
+        Compile the rules.
+
+        Args:
+            tag_filters: Enabled tag categories from the configuration
+            custom_tags: Map of filename patterns to additional tags
+        """
+        self.tag_filters = {key: bool(value) for key, value in tag_filters.items()}
+
+        # Custom tags: every pattern is an optional lookahead anchored at the
+        # start of the name, so one match reports every pattern that applies
+        self._custom_tags = [list(tags) for tags in custom_tags.values()]
+        self._custom_pattern = re.compile(''.join(
+            f"(?:(?=(?P<p{index}>{_pattern_regex(pattern)})))?" for index, pattern in enumerate(custom_tags)
+        ))
+
+        # Language learning tags of the enabled categories, in output order
+        self._learning_tags = [
+            tag for tag in LANGUAGE_LEARNING_TAGS if self.tag_filters.get(_tag_category(tag), True)
+        ]
+        indicator_tags: Dict[str, set] = {}
+        for tag in self._learning_tags:
+            for indicator in LANGUAGE_LEARNING_TAGS[tag]:
+                indicator_tags.setdefault(indicator, set()).add(tag)
+
+        # Longest indicators first, so a match at any position is the longest
+        # indicator found there; every indicator that is a prefix of it
+        # matches there too, so its tags are folded in up front
+        indicators = sorted(indicator_tags, key=len, reverse=True)
+        self._tags_by_indicator = {
+            indicator: frozenset().union(*(
+                tags for other, tags in indicator_tags.items() if indicator.startswith(other)
+            ))
+            for indicator in indicators
+        }
+        self._indicator_pattern = (
+            re.compile('(?=(' + '|'.join(re.escape(indicator) for indicator in indicators) + '))')
+            if indicators else None
+        )
+
+        # Per-note content tags: one alternation with a group per keyword
+        # list, and per word of a contrast, so a single scan finds every tag
+        # of every row. Each tag needs all of its groups' bits in a row's
+        # mask. The leading lookahead lets the regex engine skip positions
+        # no keyword can start at.
+        content_tags = []
+        if self.tag_filters.get('note_content', True):
+            content_tags = [
+                tag for tag in list(CONTENT_TAG_KEYWORDS) + list(CONTENT_TAG_CONTRASTS) + [MEDIA_TAG]
+                if self.tag_filters.get(_content_category(tag), True)
+            ]
+        self._content_rules: List[Tuple[str, int]] = []
+        alternatives = []
+        first_chars = set()
+        for tag in content_tags:
+            if tag == MEDIA_TAG:
+                groups = [f"({MEDIA_MARKER_PATTERN})"]
+                first_chars.update(marker[0] for marker in MEDIA_MARKERS)
+            else:
+                if tag in CONTENT_TAG_CONTRASTS:
+                    word_lists = [[word] for word in CONTENT_TAG_CONTRASTS[tag]]
+                else:
+                    word_lists = [CONTENT_TAG_KEYWORDS[tag]]
+                groups = [r'(\b(?:' + '|'.join(re.escape(word) for word in words) + r')\b)' for words in word_lists]
+                first_chars.update(word[0] for words in word_lists for word in words)
+            required = 0
+            for group in groups:
+                required |= 1 << len(alternatives)
+                alternatives.append(group)
+            self._content_rules.append((tag, required))
+        self._content_pattern = (
+            re.compile('(?=[' + re.escape(''.join(sorted(first_chars))) + '])(?:' + '|'.join(alternatives) + ')')
+            if alternatives else None
+        )
+
+    def custom_tags(self, filename: str) -> List[str]:
+        """
+        Get the custom tags configured for a file name.
+
+        Args:
+            filename: CSV file name
+
+        Returns:
+            Tags of every matching pattern, in configuration order
+        """
+        if not self._custom_tags:
+            return []
+        match = self._custom_pattern.match(filename)
+        tags: List[str] = []
+        for index, pattern_tags in enumerate(self._custom_tags):
+            if match.group(f"p{index}") is not None:
+                tags.extend(pattern_tags)
+        return tags
+
+    def learning_tags(self, name: str) -> List[str]:
+        """
+        Detect language learning tags from indicator words in a name.
+
+        Args:
+            name: Lowercase deck name
+
+        Returns:
+            Detected tags, in the order of LANGUAGE_LEARNING_TAGS
+        """
+        if self._indicator_pattern is None:
+            return []
+        found = set()
+        for match in self._indicator_pattern.finditer(name):
+            found |= self._tags_by_indicator[match.group(1)]
+        return [tag for tag in self._learning_tags if tag in found]
+
+    def tags_for(self, filename: str, columns: Sequence[str], language: str, is_cloze: bool) -> List[str]:
+        """
+        Infer the tags for a deck.
+
+        Args:
+            filename: CSV file name
+            columns: Column names of the CSV
+            language: Language tag for the deck
+            is_cloze: Whether the deck has cloze cards
+
+        Returns:
+            Tags without duplicates, in the order they were inferred
+        """
+        enabled = self.tag_filters.get
+        base_name = filename[:-4] if filename.lower().endswith('.csv') else filename
+        tags: List[str] = []
+
+        if enabled('language', True):
+            tags.append(language.lower())
+        if enabled('source', True):
+            tags.append('auto-generated')
+        if enabled('card_type', True):
+            tags.append('cloze' if is_cloze else 'basic')
+
+        # Meaningful words from the filename (skip single letters and common words)
+        if enabled('filename', True):
+            for word in FILENAME_WORD_SPLIT.split(base_name):
+                if len(word) > 1 and word.lower() not in COMMON_WORDS:
+                    tags.append(word.lower())
+
+        tags.extend(self.custom_tags(filename))
+
+        if enabled('grammar', True) or enabled('content', True) or enabled('language_construct', True):
+            lower_name = base_name.lower()
+            tags.extend(self.learning_tags(lower_name))
+
+            # Special check for 'ir a + infinitive' decks
+            if enabled('language_construct', True):
+                if 'ir' in lower_name and 'a' in lower_name and ('infinitive' in lower_name or 'future' in lower_name):
+                    tags.append('ir-a')
+                    if enabled('grammar', True):
+                        tags.append('future')
+
+            lower_columns = [col.lower() for col in columns]
+            if 'english' in lower_columns and any(lang in lower_columns for lang in TRANSLATION_LANGUAGES):
+                tags.append('translation')
+            if 'person' in lower_columns and enabled('grammar', True):
+                tags.append('person')
+
+        return list(dict.fromkeys(tags))
+
+    def note_tags(
+        self,
+        df: 'pd.DataFrame',
+        base_tags: List[str],
+        text_columns: Optional[Sequence[str]] = None
+    ) -> List[List[str]]:
+        """
+        Work out the tags of every note in a batch of rows.
+
+        Each note gets the deck-level tags, then the content tags whose
+        keywords appear in its cells, then the tags listed in its Tags
+        column. Rows with the same tags share one list.
+
+        Args:
+            df: DataFrame holding the CSV rows
+            base_tags: Tags applied to every note
+            text_columns: Columns to scan for content keywords (defaults to
+                every column except the Tags column)
+
+        Returns:
+            One list of tags per row, in row order
+        """
+        import numpy as np
+        import pandas as pd
+
+        if text_columns is None:
+            text_columns = [col for col in df.columns if col != TAGS_COLUMN]
+
+        has_content = self._content_pattern is not None and len(text_columns) > 0
+        has_row_tags = TAGS_COLUMN in df.columns
+        if not len(df) or not (has_content or has_row_tags):
+            return [base_tags] * len(df)
+
+        masks = self._content_masks(df, text_columns) if has_content else np.zeros(len(df), dtype=np.int64)
+        if has_row_tags:
+            row_tags = df[TAGS_COLUMN].fillna('').astype(str).str.replace(',', ' ', regex=False)
+            row_tags = row_tags.str.split().str.join(' ').to_numpy(dtype=object)
+            keys = masks.astype(str).astype(object) + '\x1f' + row_tags
+        else:
+            keys = masks
+
+        # Build each distinct tag list once, then spread them over the rows
+        codes, uniques = pd.factorize(keys)
+        tag_lists = np.empty(len(uniques), dtype=object)
+        for index, key in enumerate(uniques):
+            if has_row_tags:
+                mask, extra = key.split('\x1f')
+                mask = int(mask)
+            else:
+                mask, extra = int(key), ''
+            tag_lists[index] = self._tag_list(base_tags, mask, extra.split())
+        return tag_lists[codes].tolist()
+
+    def row_tags(
+        self,
+        rows: Sequence[Sequence[str]],
+        columns: Sequence[str],
+        base_tags: List[str],
+        text_columns: Optional[Sequence[str]] = None
+    ) -> List[List[str]]:
+        """
+        Work out the tags of every note from rows parsed with the csv module.
+
+        Gives the same tags as note_tags, scanning each row on its own
+        instead of going through pandas, which is faster for small decks.
+
+        Args:
+            rows: Rows of cell strings, with missing values as empty strings
+            columns: Column names of the rows
+            base_tags: Tags applied to every note
+            text_columns: Columns to scan for content keywords (defaults to
+                every column except the Tags column)
+
+        Returns:
+            One list of tags per row, in row order
+        """
+        if text_columns is None:
+            text_columns = [col for col in columns if col != TAGS_COLUMN]
+
+        index = {col: position for position, col in enumerate(columns)}
+        text_positions = [index[col] for col in text_columns]
+        tags_position = index.get(TAGS_COLUMN)
+        has_content = self._content_pattern is not None and len(text_positions) > 0
+        if not rows or not (has_content or tags_position is not None):
+            return [base_tags] * len(rows)
+
+        tag_lists: Dict[Tuple[int, Tuple[str, ...]], List[str]] = {}
+        result = []
+        for row in rows:
+            mask = 0
+            if has_content:
+                text = '\x1f'.join([row[position] for position in text_positions]).lower()
+                for match in self._content_pattern.finditer(text):
+                    mask |= 1 << (match.lastindex - 1)
+            extra = tuple(row[tags_position].replace(',', ' ').split()) if tags_position is not None else ()
+
+            # Rows with the same tags share one list
+            key = (mask, extra)
+            tags = tag_lists.get(key)
+            if tags is None:
+                tags = tag_lists[key] = self._tag_list(base_tags, mask, extra)
+            result.append(tags)
+        return result
+
+    def _tag_list(self, base_tags: List[str], mask: int, extra: Sequence[str]) -> List[str]:
+        """Return the base tags followed by the content tags in mask and the extra tags, without duplicates."""
+        tags = [tag for tag, required in self._content_rules if mask & required == required]
+        tags.extend(extra)
+        return list(dict.fromkeys(base_tags + tags)) if tags else base_tags
+
+    def _content_masks(self, df: 'pd.DataFrame', text_columns: Sequence[str]) -> 'np.ndarray':
+        """
+        Return, per row, a bit mask of the content tags found in its cells.
+
+        The rows are joined into one string and scanned with a single regex
+        pass; match positions are mapped back to rows with a binary search.
+        """
+        import numpy as np
+
+        cells = [df[col].fillna('').astype(str) for col in text_columns]
+        text = cells[0].str.cat(cells[1:], sep='\x1f') if len(cells) > 1 else cells[0]
+        text = text.str.lower()
+
+        # Rows are separated by NUL, which no pattern can match across
+        starts = np.zeros(len(text), dtype=np.int64)
+        np.cumsum(text.str.len().to_numpy()[:-1] + 1, out=starts[1:])
+        blob = '\x00'.join(text.tolist())
+
+        positions = []
+        bits = []
+        for match in self._content_pattern.finditer(blob):
+            positions.append(match.start())
+            bits.append(1 << (match.lastindex - 1))
+
+        masks = np.zeros(len(text), dtype=np.int64)
+        if positions:
+            rows = np.searchsorted(starts, positions, side='right') - 1
+            np.bitwise_or.at(masks, rows, np.array(bits, dtype=np.int64))
+        return masks
+
+
+_engine_lock = threading.Lock()
+_snapshot_engine: Tuple[Optional[FrozenDict], Optional[TagEngine]] = (None, None)
+_engines: Dict[str, TagEngine] = {}
+
+
+def get_tag_engine(config: Mapping[str, Any]) -> TagEngine:
+    """
+    Return the compiled tag engine for a configuration.
+
+    Engines are built once per configuration snapshot (that is, once per
+    config version); other configuration dicts are keyed by their tagging
+    settings.
+
+    Args:
+        config: The effective configuration
+
+    Returns:
+        The TagEngine for the configuration's tag filters and custom tags
+    """
+    global _snapshot_engine
+    snapshot, engine = _snapshot_engine
+    if config is snapshot:
+        return engine
+
+    tag_filters = config.get('tag_filters', {}) or {}
+    custom_tags = config.get('custom_tags', {}) or {}
+    key = json.dumps([sorted(tag_filters.items()), list(custom_tags.items())])
+    with _engine_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = TagEngine(tag_filters, custom_tags)
+        if isinstance(config, FrozenDict):
+            _snapshot_engine = (config, engine)
+    return engine
@@ -0,0 +1,273 @@
+import json
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import genanki
+
+from anki_deck_generator.config import FrozenDict
+from anki_deck_generator.ids import stable_id
+
+# Number of distinct (templates, columns, reversed, cloze) combinations kept
+TEMPLATE_CACHE_SIZE = 256
+
+
+class CompiledTemplates:
+    """
+    Card templates built for one column signature.
+
+    Instances are cached and shared, so templates() hands out fresh copies
+    for genanki to own.
+    """
+
+    def __init__(self, templates: List[Dict[str, str]], model_type: int, reversed_cards: bool):
+        """
+        Initialize the compiled template set.
+
+        Args:
+            templates: Template dictionaries with name, qfmt and afmt
+            model_type: genanki model type (genanki.Model.CLOZE or 0 for standard)
+            reversed_cards: Whether a reversed card template was added
+        """
+        self._templates = tuple(dict(template) for template in templates)
+        self.model_type = model_type
+        self.reversed_cards = reversed_cards
+
+    def templates(self) -> List[Dict[str, str]]:
+        """Return a copy of the template dictionaries."""
+        return [dict(template) for template in self._templates]
+
+
+def substitute_field_placeholders(template_str: str, columns: Sequence[str], add_extra_cols: bool = False) -> str:
+    """Replace {{Front}}, {{Back}}, {{Text}}, etc. with actual column names.
+
+    Args:
+        template_str: The template string with placeholders
+        columns: List of actual column names from CSV
+        add_extra_cols: If True, append extra columns (3rd, 4th, etc.) to the template
+    """
+    result = template_str
+    # Map common placeholder names to column indices
+    placeholders = {
+        '{{Front}}': columns[0] if len(columns) > 0 else 'Front',
+        '{{Back}}': columns[1] if len(columns) > 1 else 'Back',
+        '{{Text}}': columns[0] if len(columns) > 0 else 'Text',
+        '{{Translation}}': columns[1] if len(columns) > 1 else 'Translation',
+        '{{Explanation}}': columns[2] if len(columns) > 2 else 'Explanation',
+        '{{Hint}}': columns[3] if len(columns) > 3 else 'Hint',
+        '{{Notes}}': columns[-1] if len(columns) > 2 else 'Notes',
+    }
+    for placeholder, actual in placeholders.items():
+        result = result.replace(placeholder, '{{' + actual + '}}')
+    # Also handle cloze format
+    result = result.replace('{{cloze:Text}}', '{{cloze:' + (columns[0] if len(columns) > 0 else 'Text') + '}}')
+
+    # Append extra columns (beyond the first 2) to the answer template
+    if add_extra_cols and len(columns) > 2:
+        extra_fields = ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}' for col in columns[2:]])
+        result += extra_fields
+
+    return result
+
+
+def build_templates(
+    custom_templates: Mapping[str, Mapping[str, str]],
+    columns: Sequence[str],
+    create_reversed: bool,
+    is_cloze: bool
+) -> CompiledTemplates:
+    """
+    Build the card templates for a deck with the given columns.
+
+    Args:
+        custom_templates: Templates from the configuration, by card type
+        columns: Column names of the CSV
+        create_reversed: Whether to add a reversed card for basic decks
+        is_cloze: Whether the deck has cloze cards
+
+    Returns:
+        The compiled template set
+    """
+    reversed_cards = False
+
+    if is_cloze:
+        # For cloze deletion cards
+        if 'cloze' in custom_templates:
+            # Use custom template from config
+            template = custom_templates['cloze']
+            templates = [{
+                'name': template.get('name', 'Cloze Card'),
+                'qfmt': substitute_field_placeholders(template.get('qfmt', '{{cloze:' + columns[0] + '}}'), columns),
+                'afmt': substitute_field_placeholders(template.get('afmt', '{{cloze:' + columns[0] + '}}<hr>' + \
+                       ''.join([f'<b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[1:]])), columns)
+            }]
+        else:
+            # Use default cloze template
+            templates = [{
+                'name': 'Cloze Card',
+                'qfmt': '{{cloze:' + columns[0] + '}}',
+                'afmt': '{{cloze:' + columns[0] + '}}<hr>' + \
+                       ''.join([f'<b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[1:]])
+            }]
+        return CompiledTemplates(templates, genanki.Model.CLOZE, reversed_cards)
+
+    # For basic cards (front/back)
+    if 'basic' in custom_templates:
+        # Use custom template from config, substituting actual column names
+        template = custom_templates['basic']
+        name = template.get('name', 'Basic Card')
+        if len(columns) >= 2:
+            # add_extra_cols=True appends Example, Notes, etc. to the answer
+            templates = [{
+                'name': name,
+                'qfmt': substitute_field_placeholders(template.get('qfmt', '{{' + columns[0] + '}}'), columns),
+                'afmt': substitute_field_placeholders(template.get('afmt', '{{FrontSide}}<hr><b>' + columns[1] + ':</b> {{' + columns[1] + '}}'), columns, add_extra_cols=True)
+            }]
+        else:
+            templates = [{
+                'name': name,
+                'qfmt': substitute_field_placeholders(template.get('qfmt', '{{' + columns[0] + '}}'), columns),
+                'afmt': substitute_field_placeholders(template.get('afmt', '{{FrontSide}}'), columns, add_extra_cols=True)
+            }]
+    else:
+        # Use default basic template
+        name = 'Basic Card'
+        if len(columns) >= 2:
+            templates = [{
+                'name': name,
+                'qfmt': '{{' + columns[0] + '}}',
+                'afmt': '{{FrontSide}}<hr><b>' + columns[1] + ':</b> {{' + columns[1] + '}}' + \
+                       ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[2:]])
+            }]
+        else:
+            templates = [{
+                'name': name,
+                'qfmt': '{{' + columns[0] + '}}',
+                'afmt': '{{FrontSide}}'
+            }]
+
+    # Add reversed template if enabled; for reversed, swap Front/Back meaning
+    if create_reversed and len(columns) >= 2:
+        templates.append({
+            'name': name + ' (Reversed)',
+            'qfmt': '{{' + columns[1] + '}}',
+            'afmt': '{{FrontSide}}<hr><b>' + columns[0] + ':</b> {{' + columns[0] + '}}' + \
+                   ''.join([f'<br><b>{col}:</b> {{{{{col}}}}}<br>' for col in columns[2:] if col != columns[1]])
+        })
+        reversed_cards = True
+
+    return CompiledTemplates(templates, 0, reversed_cards)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _compile_cached(
+    templates_key: str,
+    columns: Tuple[str, ...],
+    create_reversed: bool,
+    is_cloze: bool
+) -> CompiledTemplates:
+    return build_templates(json.loads(templates_key), columns, create_reversed, is_cloze)
+
+
+_key_lock = threading.Lock()
+_snapshot_key: Tuple[Optional[Any], Optional[str]] = (None, None)
+
+
+def _templates_key(custom_templates: Mapping[str, Any]) -> str:
+    """Return the cache key of a templates configuration, computed once per config snapshot."""
+    global _snapshot_key
+    snapshot, key = _snapshot_key
+    if custom_templates is snapshot:
+        return key
+
+    key = json.dumps(custom_templates, sort_keys=True)
+    if isinstance(custom_templates, FrozenDict):
+        with _key_lock:
+            _snapshot_key = (custom_templates, key)
+    return key
+
+
+def clear_template_cache() -> None:
+    """Drop every compiled template set, so the next build compiles them again."""
+    global _snapshot_key
+    _compile_cached.cache_clear()
+    with _key_lock:
+        _snapshot_key = (None, None)
+
+
+def compile_templates(
+    config: Mapping[str, Any],
+    columns: Sequence[str],
+    is_cloze: bool
+) -> CompiledTemplates:
+    """
+    Return the compiled card templates for a configuration and column signature.
+
+    Results are cached by (templates configuration, columns, reversed flag,
+    cloze flag), so decks sharing a column layout build their templates once.
+
+    Args:
+        config: The effective configuration
+        columns: Column names of the CSV
+        is_cloze: Whether the deck has cloze cards
+
+    Returns:
+        The compiled template set
+    """
+    return _compile_cached(
+        _templates_key(config.get('templates', {}) or {}),
+        tuple(columns),
+        bool(config.get('create_reversed', False)),
+        bool(is_cloze)
+    )
+
+
+def model_schema_digest(
+    columns: Sequence[str],
+    template_names: Sequence[str],
+    model_type: int
+) -> str:
+    """
+    Hash the structure of a note model: its fields, card types and model type.
+
+    The CSS and template HTML are left out, so restyling a deck keeps its
+    model ID and Anki updates the existing note type on import instead of
+    creating a new one.
+
+    Args:
+        columns: Field names of the model
+        template_names: Names of the model's card templates
+        model_type: genanki model type
+
+    Returns:
+        Hex digest of the model structure
+    """
+    payload = json.dumps([list(columns), list(template_names), model_type])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def shared_model_id(schema_digest: str) -> int:
+    """Return the model ID shared by every deck with the given model structure digest."""
+    return stable_id('model', 'schema', schema_digest)
+
+
+def shared_model_name(columns: Sequence[str], model_type: int, reversed_cards: bool) -> str:
+    """
+    Name a model shared by several decks after its card type and fields.
+
+    Args:
+        columns: Field names of the model
+        model_type: genanki model type
+        reversed_cards: Whether the model has a reversed card template
+
+    Returns:
+        A model name such as "Basic (and reversed card): Spanish, English"
+    """
+    if model_type == genanki.Model.CLOZE:
+        kind = 'Cloze'
+    elif reversed_cards:
+        kind = 'Basic (and reversed card)'
+    else:
+        kind = 'Basic'
+    return f"{kind}: {', '.join(columns)}"
@@ -0,0 +1,450 @@
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from anki_deck_generator.config import (
+    CSV_DIR,
+    OUTPUT_DIR,
+    MEDIA_DIR,
+    CONFIG_DIR,
+    TEMPLATES_DIR,
+    DEFAULT_CONFIG_FILE,
+    DEFAULT_EXPORT_ENGINE,
+    config_version,
+    ensure_data_dirs,
+    get_config,
+)
+
+# Seconds without further changes before a burst of saves is rebuilt
+DEFAULT_DEBOUNCE = 0.2
+
+# Longest a burst of changes can postpone a rebuild, in seconds
+MAX_DEBOUNCE_DELAY = 2.0
+
+# Seconds between two scans of the watched directories when polling
+DEFAULT_POLL_INTERVAL = 0.5
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+# Header of each inotify event: wd, mask, cookie and name length
+INOTIFY_EVENT = struct.Struct('iIII')
+
+# Size of the buffer inotify events are read into
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+
+class InotifyWatcher:
+    """
+    Report changed files in a set of directories using Linux inotify.
+
+    inotify is called through ctypes, so no extra dependency is needed.
+    Directories are watched non-recursively.
+    """
+
+    def __init__(self, directories: Sequence[Union[str, Path]]):
+        """
+        Start watching directories.
+
+        Args:
+            directories: Directories to watch; they must exist
+
+        Raises:
+            OSError: If inotify is not available or a directory cannot be watched
+        """
+        libc_name = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self.directories = [str(directory) for directory in directories]
+        self._watches: Dict[int, str] = {}
+        try:
+            for directory in self.directories:
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"Cannot watch {directory}")
+                self._watches[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def read_changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Wait for changes and return the paths that changed.
+
+        Args:
+            timeout: Seconds to wait for a first change (None waits forever)
+
+        Returns:
+            Paths of changed files; a watched directory itself is returned when
+            events were lost, meaning anything in it may have changed
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, INOTIFY_BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.directories)
+                elif wd in self._watches and name:
+                    changed.add(os.path.join(self._watches[wd], name))
+        return changed
+
+    def close(self) -> None:
+        """Stop watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """
+    Report changed files in a set of directories by comparing periodic scans.
+
+    Used where inotify is not available. A file counts as changed when its
+    size or modification time changes, or when it appears or disappears.
+    """
+
+    def __init__(self, directories: Sequence[Union[str, Path]], interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Take the first snapshot of the directories.
+
+        Args:
+            directories: Directories to watch
+            interval: Seconds between two scans
+        """
+        self.directories = [str(directory) for directory in directories]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stats = entry.stat()
+                        snapshot[entry.path] = (stats.st_size, stats.st_mtime_ns)
+                except OSError:
+                    continue
+        return snapshot
+
+    def read_changes(self, timeout: Optional[float] = None) -> Set[str]:
+        """
+        Wait for changes and return the paths that changed.
+
+        Args:
+            timeout: Seconds to wait for a first change (None waits forever)
+
+        Returns:
+            Paths of changed, created and deleted files
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(self.interval, remaining))
+            else:
+                time.sleep(self.interval)
+
+    def close(self) -> None:
+        """Stop watching."""
+
+
+def create_watcher(directories: Sequence[Union[str, Path]], polling: bool = False, interval: float = DEFAULT_POLL_INTERVAL):
+    """
+    Create an inotify watcher, falling back to polling where inotify is unavailable.
+
+    Args:
+        directories: Directories to watch
+        polling: Always poll, e.g. for network file systems where inotify misses changes
+        interval: Seconds between two scans when polling
+
+    Returns:
+        An InotifyWatcher or PollingWatcher
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling for changes every {interval}s")
+    return PollingWatcher(directories, interval)
+
+
+def collect_changes(watcher, debounce: float = DEFAULT_DEBOUNCE, max_delay: float = MAX_DEBOUNCE_DELAY) -> Set[str]:
+    """
+    Wait for a burst of changes and return it once things have settled.
+
+    Editors often write a file several times per save, and authors save
+    several files in a row, so changes are collected until none arrived for
+    debounce seconds (but no longer than max_delay).
+
+    Args:
+        watcher: Watcher to read changes from
+        debounce: Quiet period that ends a burst, in seconds
+        max_delay: Longest a burst may last, in seconds
+
+    Returns:
+        Paths changed during the burst
+    """
+    changed = watcher.read_changes(None)
+    deadline = time.monotonic() + max_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return changed
+        more = watcher.read_changes(min(debounce, remaining))
+        if not more:
+            return changed
+        changed |= more
+
+
+def _is_ignored(name: str) -> bool:
+    """Whether a file name belongs to hidden, temporary or editor backup files."""
+    return name.startswith(('.', '#')) or name.endswith(('~', '.swp', '.swx', '.tmp'))
+
+
+def plan_rebuild(
+    changed: Set[str],
+    csv_dir: Path = CSV_DIR,
+    media_dir: Path = MEDIA_DIR,
+    config_dir: Path = CONFIG_DIR,
+    templates_dir: Path = TEMPLATES_DIR
+) -> Dict[str, Any]:
+    """
+    Work out what a set of changed paths means for the decks.
+
+    Args:
+        changed: Changed paths, as returned by a watcher
+        csv_dir: Directory containing CSV files
+        media_dir: Directory containing media files
+        config_dir: Directory containing the configuration file
+        templates_dir: Directory containing template files
+
+    Returns:
+        Dictionary with 'csv_files' (changed CSV file names), 'removed' (deleted
+        CSV file names), 'media' (changed media file names), 'config' (whether
+        the configuration may have changed) and 'templates' (changed template files)
+    """
+    directories = {
+        os.path.abspath(csv_dir): 'csv',
+        os.path.abspath(media_dir): 'media',
+        os.path.abspath(config_dir): 'config',
+        os.path.abspath(templates_dir): 'templates',
+    }
+    plan: Dict[str, Any] = {'csv_files': set(), 'removed': set(), 'media': set(), 'config': False, 'templates': set()}
+
+    for path in changed:
+        path = os.path.abspath(path)
+        if path in directories:
+            # Events were lost; rescan everything the directory affects
+            kind = directories[path]
+            if kind == 'csv':
+                plan['csv_files'].update(f for f in os.listdir(path) if f.lower().endswith('.csv'))
+            elif kind == 'media':
+                plan['media'].update(f for f in os.listdir(path) if not _is_ignored(f))
+            elif kind == 'config':
+                plan['config'] = True
+            else:
+                plan['templates'].update(os.path.join(path, f) for f in os.listdir(path) if not _is_ignored(f))
+            continue
+
+        kind = directories.get(os.path.dirname(path))
+        name = os.path.basename(path)
+        if kind is None or _is_ignored(name):
+            continue
+        if kind == 'csv' and name.lower().endswith('.csv'):
+            if os.path.exists(path):
+                plan['csv_files'].add(name)
+            else:
+                plan['removed'].add(name)
+        elif kind == 'media':
+            plan['media'].add(name)
+        elif kind == 'config' and name == DEFAULT_CONFIG_FILE.name:
+            plan['config'] = True
+        elif kind == 'templates':
+            plan['templates'].add(path)
+
+    return plan
+
+
+def _effective_config(overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the current configuration with the command-line overrides applied."""
+    config = get_config()
+    if not overrides:
+        return config
+    config = config.thaw()
+    config.update(overrides)
+    return config
+
+
+def watch_decks(
+    csv_dir: Path = CSV_DIR,
+    output_dir: Path = OUTPUT_DIR,
+    language: str = 'generic',
+    config_overrides: Optional[Dict[str, Any]] = None,
+    chunksize: Optional[int] = None,
+    engine: str = DEFAULT_EXPORT_ENGINE,
+    polling: bool = False,
+    debounce: float = DEFAULT_DEBOUNCE,
+    interval: float = DEFAULT_POLL_INTERVAL,
+    max_rebuilds: Optional[int] = None
+) -> int:
+    """
+    Build the decks, then rebuild the affected ones whenever their inputs change.
+
+    The process stays alive between rebuilds, so modules, the parsed
+    configuration, compiled templates, tag rules and media digests stay
+    cached and a rebuild only costs the work for the decks that changed:
+
+    - a changed CSV file rebuilds its deck
+    - a changed media file rebuilds the decks the build manifest records as
+      referencing it
+    - a changed configuration rebuilds the decks it affects (per the build manifest)
+    - a changed file in templates/ drops the compiled templates and rebuilds
+      every deck
+
+    Args:
+        csv_dir: Directory containing CSV files
+        output_dir: Directory to save the generated APKG files
+        language: Language tag for the decks
+        config_overrides: Settings applied on top of the configuration file
+            (e.g. create_reversed from the command line)
+        chunksize: If set, stream each CSV in chunks of this many rows
+        engine: APKG export engine, 'genanki' or 'sqlite'
+        polling: Poll for changes instead of using inotify
+        debounce: Quiet period that ends a burst of changes, in seconds
+        interval: Seconds between two scans when polling
+        max_rebuilds: Stop after this many rebuilds (watch forever if None)
+
+    Returns:
+        Number of rebuilds done
+    """
+    from anki_deck_generator.auto_generator import generate_decks_from_directory
+    from anki_deck_generator.manifest import BuildManifest
+    from anki_deck_generator.templates import clear_template_cache
+
+    csv_dir = Path(csv_dir)
+    output_dir = Path(output_dir)
+    overrides = dict(config_overrides or {})
+
+    ensure_data_dirs()
+    os.makedirs(csv_dir, exist_ok=True)
+
+    def build(specific_files: Optional[List[str]] = None, force: bool = False) -> None:
+        generate_decks_from_directory(
+            csv_dir=csv_dir,
+            output_dir=output_dir,
+            language=language,
+            specific_files=specific_files,
+            custom_config=_effective_config(overrides),
+            chunksize=chunksize,
+            engine=engine,
+            force=force
+        )
+
+    # Start watching before the first build so no save in between is missed
+    directories = [csv_dir, MEDIA_DIR, CONFIG_DIR, TEMPLATES_DIR]
+    watcher = create_watcher(directories, polling, interval)
+    rebuilds = 0
+    try:
+        print(f"🔍 Building decks in {csv_dir}...")
+        build()
+        version = config_version()
+        print(f"\n👀 Watching {', '.join(str(directory) for directory in directories)} (Ctrl+C to stop)")
+
+        while max_rebuilds is None or rebuilds < max_rebuilds:
+            changed = collect_changes(watcher, debounce)
+            started = time.perf_counter()
+            plan = plan_rebuild(changed, csv_dir, MEDIA_DIR, CONFIG_DIR, TEMPLATES_DIR)
+
+            # Saves that leave the configuration as it was do not trigger a rebuild
+            if plan['config']:
+                plan['config'] = config_version() != version
+                version = config_version()
+
+            for name in sorted(plan['removed']):
+                print(f"\n{name} was removed; its deck is left in {output_dir}")
+
+            rebuilt = False
+            if plan['templates']:
+                # The manifest does not track templates/, so every deck is rebuilt
+                clear_template_cache()
+                print(f"\nTemplates changed: {', '.join(sorted(os.path.basename(path) for path in plan['templates']))}")
+                build(force=True)
+                rebuilt = True
+            elif plan['config']:
+                # The manifest only rebuilds the decks the new settings affect
+                print("\nConfiguration changed, checking all decks...")
+                build()
+                rebuilt = True
+            elif plan['csv_files']:
+                files = sorted(plan['csv_files'])
+                print(f"\nChanged: {', '.join(files)}")
+                build(files)
+                rebuilt = True
+
+            if plan['media'] and not plan['templates']:
+                # The manifest tracks missing media too, so only affected decks rebuild
+                files = [
+                    f for f in BuildManifest(output_dir).decks_using_media(plan['media'])
+                    if (csv_dir / f).exists()
+                ]
+                if not plan['config']:
+                    files = [f for f in files if f not in plan['csv_files']]
+                if files:
+                    print(f"\nMedia changed: {', '.join(sorted(plan['media']))}; rebuilding {', '.join(files)}")
+                    build(files)
+                    rebuilt = True
+
+            if rebuilt:
+                rebuilds += 1
+                print(f"\n⏱️  Rebuilt in {time.perf_counter() - started:.2f}s; watching for changes...")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+    return rebuilds
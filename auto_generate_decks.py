@@ -4,30 +4,34 @@ Auto-generate Anki decks from CSV files.
 This script automatically processes CSV files in the csv/ directory and generates Anki decks.
 """
 
-from anki_deck_generator.auto_generator import generate_decks_from_directory, merge_decks
-from anki_deck_generator.core import create_dynamic_deck_generator
-from anki_deck_generator.config import CSV_DIR, OUTPUT_DIR, MEDIA_DIR, CONFIG_DIR, load_config, save_config
+# Only lightweight modules are imported here so that commands like history,
+# tags --add and --help start quickly; the deck builder (and with it genanki
+# and pandas) is imported by the commands that need it
+from anki_deck_generator.config import (
+    CSV_DIR, OUTPUT_DIR, MEDIA_DIR, CONFIG_DIR, DEFAULT_EXPORT_ENGINE, EXPORT_ENGINES, load_config, save_config
+)
+from anki_deck_generator.media_store import get_media_store
+from anki_deck_generator.history import GenerationHistory
 import sys
 import os
 import json
 import argparse
+import contextlib
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
 
 def show_tags(csv_path, language='spanish', config=None):
     """Show the tags that would be applied to a CSV file."""
-    try:
-        # Load configuration if not provided
-        if config is None:
-            config = load_config()
+    from anki_deck_generator.core import infer_deck_tags
 
-        # Create a deck generator for the CSV file
-        generator = create_dynamic_deck_generator(csv_path, language, config)
+    try:
+        # Infer the tags without building the deck
+        tags = infer_deck_tags(csv_path, language, config)
 
         # Print the tags
         print(f"\nTags for {os.path.basename(csv_path)}:")
-        print(f"  {', '.join(generator.tags)}")
+        print(f"  {', '.join(tags)}")
 
         return True
     except Exception as e:
@@ -115,34 +119,66 @@ def configure_css(css_file):
         return False
 
 
-def show_history():
-    """Show the history of generated decks."""
+def show_history(deck=None, since=None, until=None, min_duration=None, max_duration=None, limit=None):
+    """Show the history of generated decks, optionally filtered."""
     try:
-        history_file = os.path.join(OUTPUT_DIR, 'generation_history.json')
-
-        if not os.path.exists(history_file):
+        with GenerationHistory() as history:
+            entries = history.query(
+                deck=deck,
+                since=datetime.fromisoformat(since) if since else None,
+                until=datetime.fromisoformat(until) if until else None,
+                min_duration=min_duration,
+                max_duration=max_duration,
+                limit=limit,
+                newest_first=limit is not None
+            )
+
+        if not entries:
             print("No generation history found.")
             return False
 
-        with open(history_file, 'r') as f:
-            history = json.load(f)
-
-        if not history:
-            print("No generation history found.")
-            return False
+        if limit is not None:
+            entries.reverse()
 
-        print(f"\nGeneration History ({len(history)} entries):")
-        for i, entry in enumerate(history, 1):
+        print(f"\nGeneration History ({len(entries)} entries):")
+        for i, entry in enumerate(entries, 1):
             timestamp = datetime.fromisoformat(entry['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
             print(f"\n{i}. {entry['csv_file']} → {entry['output_file']}")
             print(f"   Generated: {timestamp}")
             print(f"   Tags: {', '.join(entry['tags'])}")
+            if entry['duration'] is not None:
+                print(f"   Notes: {entry['note_count']}, built in {entry['duration']:.2f}s")
+            if entry['timings']:
+                stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in entry['timings'].items())
+                print(f"   Stages: {stages}")
 
         return True
     except Exception as e:
         print(f"Error showing history: {e}")
         return False
 
+def manage_media(dedupe=False):
+    """Show media store statistics, optionally deduplicating identical files first."""
+    try:
+        store = get_media_store(MEDIA_DIR)
+
+        if dedupe:
+            cloned, saved = store.deduplicate()
+            print(f"Cloned {cloned} duplicate media file(s), saving {saved} bytes")
+
+        stats = store.stats()
+        store.save()
+
+        print(f"\nMedia in {MEDIA_DIR}:")
+        print(f"  Files: {stats['files']} ({stats['unique']} unique)")
+        print(f"  Size: {stats['bytes']} bytes ({stats['disk_bytes']} on disk)")
+        print(f"  Reclaimable: {stats['reclaimable_bytes']} bytes")
+
+        return True
+    except Exception as e:
+        print(f"Error managing media: {e}")
+        return False
+
 def main():
     parser = argparse.ArgumentParser(description='Auto-generate Anki decks from CSV files')
 
@@ -181,14 +217,91 @@ def main():
         action='store_true',
         help='Create reversed cards (e.g., both English→Spanish and Spanish→English)'
     )
+    generate_parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Stream each CSV in chunks of this many rows to bound memory use'
+    )
+    generate_parser.add_argument(
+        '--engine',
+        choices=EXPORT_ENGINES,
+        default=DEFAULT_EXPORT_ENGINE,
+        help='APKG export engine (sqlite bulk-inserts notes and is much faster for large decks)'
+    )
+    generate_parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Rebuild every deck, even those whose inputs are unchanged since the last build'
+    )
+    generate_parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of decks to build in parallel worker processes'
+    )
+    generate_parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Record time and peak memory of every build stage and print a summary table'
+    )
+    generate_parser.add_argument(
+        '--profile-report',
+        type=str,
+        help='Path of the JSON profile report (defaults to profile.json in the output directory)'
+    )
+
+    # Watch command
+    watch_parser = subparsers.add_parser('watch', help='Rebuild decks whenever their CSV, media or configuration changes')
+    watch_parser.add_argument(
+        '--language',
+        default='spanish',
+        choices=[
+            'spanish', 'english', 'french', 'german', 'italian',
+            'portuguese', 'japanese', 'chinese', 'korean', 'generic'
+        ],
+        help='Language tag for the decks'
+    )
+    watch_parser.add_argument(
+        '--reversed',
+        action='store_true',
+        help='Create reversed cards (e.g., both English→Spanish and Spanish→English)'
+    )
+    watch_parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Stream each CSV in chunks of this many rows to bound memory use'
+    )
+    watch_parser.add_argument(
+        '--engine',
+        choices=EXPORT_ENGINES,
+        default=DEFAULT_EXPORT_ENGINE,
+        help='APKG export engine (sqlite bulk-inserts notes and is much faster for large decks)'
+    )
+    watch_parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='Poll for changes instead of using inotify (e.g. on network file systems)'
+    )
+    watch_parser.add_argument(
+        '--interval',
+        type=float,
+        default=0.5,
+        help='Seconds between two scans when polling'
+    )
+    watch_parser.add_argument(
+        '--debounce',
+        type=float,
+        default=0.2,
+        help='Seconds without further changes before a burst of saves is rebuilt'
+    )
 
     # Tags command
     tags_parser = subparsers.add_parser('tags', help='Manage tags for Anki decks')
     tags_parser.add_argument(
         '--show',
-        nargs='+',
+        nargs='*',
         metavar='FILE',
-        help='Show tags that would be applied to specified CSV files'
+        help='Show tags that would be applied to specified CSV files (all CSV files if none are given)'
     )
     tags_parser.add_argument(
         '--add',
@@ -232,6 +345,44 @@ def main():
 
     # History command
     history_parser = subparsers.add_parser('history', help='Show generation history')
+    history_parser.add_argument(
+        '--deck',
+        type=str,
+        help='Only show builds of this CSV file'
+    )
+    history_parser.add_argument(
+        '--since',
+        type=str,
+        help='Only show builds at or after this ISO date/time (e.g. 2025-05-01)'
+    )
+    history_parser.add_argument(
+        '--until',
+        type=str,
+        help='Only show builds before this ISO date/time'
+    )
+    history_parser.add_argument(
+        '--min-duration',
+        type=float,
+        help='Only show builds that took at least this many seconds'
+    )
+    history_parser.add_argument(
+        '--max-duration',
+        type=float,
+        help='Only show builds that took at most this many seconds'
+    )
+    history_parser.add_argument(
+        '--limit',
+        type=int,
+        help='Only show the most recent N matching builds'
+    )
+
+    # Media command
+    media_parser = subparsers.add_parser('media', help='Inspect and deduplicate media files')
+    media_parser.add_argument(
+        '--dedupe',
+        action='store_true',
+        help='Replace byte-identical media files with copy-on-write clones of one stored copy'
+    )
 
     # Parse arguments
     args = parser.parse_args()
@@ -244,25 +395,40 @@ def main():
         args.merge = False
         args.merge_name = None
         args.reversed = False
+        args.chunk_size = None
+        args.engine = DEFAULT_EXPORT_ENGINE
+        args.force = False
+        args.jobs = 1
+        args.profile = False
+        args.profile_report = None
 
     # Handle commands
     if args.command == 'generate':
+        from anki_deck_generator import profiling
+        from anki_deck_generator.auto_generator import generate_decks_from_directory
+
         print(f"🔍 Scanning for CSV files in {CSV_DIR}...")
 
         # Load configuration and set reversed option
         config = load_config()
         config['create_reversed'] = args.reversed
 
-        # Generate decks
-        generated_files = generate_decks_from_directory(
-            csv_dir=CSV_DIR,
-            output_dir=OUTPUT_DIR,
-            language=args.language,
-            specific_files=args.files,
-            merge_output=args.merge,
-            merge_name=args.merge_name,
-            custom_config=config
-        )
+        # Generate decks, profiling the build if requested
+        profiler = profiling.BuildProfiler() if args.profile else None
+        with profiler or contextlib.nullcontext():
+            generated_files = generate_decks_from_directory(
+                csv_dir=CSV_DIR,
+                output_dir=OUTPUT_DIR,
+                language=args.language,
+                specific_files=args.files,
+                merge_output=args.merge,
+                merge_name=args.merge_name,
+                custom_config=config,
+                chunksize=args.chunk_size,
+                engine=args.engine,
+                force=args.force,
+                jobs=args.jobs
+            )
 
         # Print reversed cards message if enabled
         if args.reversed:
@@ -276,10 +442,31 @@ def main():
         else:
             print("❌ No decks were generated.")
 
+        if profiler:
+            report_path = args.profile_report or os.path.join(OUTPUT_DIR, profiling.DEFAULT_REPORT_NAME)
+            profiling.finish_profile(profiler, report_path)
+
+    elif args.command == 'watch':
+        from anki_deck_generator.watch import watch_decks
+
+        # Build once, then rebuild the affected decks on every change
+        watch_decks(
+            csv_dir=CSV_DIR,
+            output_dir=OUTPUT_DIR,
+            language=args.language,
+            config_overrides={'create_reversed': args.reversed},
+            chunksize=args.chunk_size,
+            engine=args.engine,
+            polling=args.poll,
+            debounce=args.debounce,
+            interval=args.interval
+        )
+
     elif args.command == 'tags':
-        if args.show:
-            # Show tags for specified files
-            for filename in args.show:
+        if args.show is not None:
+            # Show tags for specified files, or for every CSV file
+            filenames = args.show or sorted(f for f in os.listdir(CSV_DIR) if f.lower().endswith('.csv'))
+            for filename in filenames:
                 csv_path = os.path.join(CSV_DIR, filename)
                 if os.path.exists(csv_path):
                     show_tags(csv_path, args.language)
@@ -303,7 +490,18 @@ def main():
 
     elif args.command == 'history':
         # Show generation history
-        show_history()
+        show_history(
+            deck=args.deck,
+            since=args.since,
+            until=args.until,
+            min_duration=args.min_duration,
+            max_duration=args.max_duration,
+            limit=args.limit
+        )
+
+    elif args.command == 'media':
+        # Show media statistics
+        manage_media(args.dedupe)
 
 
 if __name__ == '__main__':
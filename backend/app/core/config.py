@@ -29,6 +29,18 @@ class Settings(BaseSettings):
     CONFIG_DIR: Path = BASE_DIR / "config"
     TEMPLATES_DIR: Path = BASE_DIR / "templates"
 
+    # Card storage: "csv" rewrites the deck files on every edit, "journal"
+    # appends edits to them and a journal, folded in CARD_EXPORT_DELAY
+    # seconds after the last edit, and "sqlite" keeps cards in CARDS_DB_PATH
+    # and exports them to the deck files CARD_EXPORT_DELAY seconds after the
+    # last edit
+    CARD_STORAGE: str = "csv"
+    CARDS_DB_PATH: Path = CONFIG_DIR / "cards.db"
+    CARD_EXPORT_DELAY: float = 1.0
+
+    # Memory budget of the process-wide cache of parsed deck files
+    CARD_CACHE_BYTES: int = 256 * 1024 * 1024
+
     # Ensure directories exist
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
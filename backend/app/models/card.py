@@ -23,7 +23,7 @@ class CardUpdate(BaseModel):
 
 class Card(CardBase):
     """Complete card model with metadata"""
-    id: int = Field(..., description="Card index in deck")
+    id: int = Field(..., description="Card ID, unchanged when other cards are deleted")
     deck_id: str = Field(..., description="Parent deck ID")
 
     class Config:
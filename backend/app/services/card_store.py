@@ -0,0 +1,841 @@
+"""Card storage - Pluggable backends holding the cards of each deck"""
+
+import io
+import os
+import csv
+import json
+import atexit
+import sqlite3
+import tempfile
+import threading
+import contextlib
+import weakref
+import pandas as pd
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.frame_cache import STRING_DTYPE, FrameCache, get_frame_cache, read_deck_frame
+
+# A card as (card ID, fields)
+CardRow = Tuple[int, Dict[str, str]]
+
+# Seconds a deck file may lag behind the SQLite store, or carry a journal, after an edit
+DEFAULT_EXPORT_DELAY = 1.0
+
+# Size past which a journal is folded into its CSV file right away
+MAX_JOURNAL_BYTES = 1 << 20
+
+CARD_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS decks (
+    deck_id TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    next_id INTEGER NOT NULL,
+    csv_signature TEXT,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cards (
+    deck_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (deck_id, card_id)
+) WITHOUT ROWID;
+'''
+
+
+def _csv_signature(csv_path: Path) -> Optional[str]:
+    """Return the size and mtime of a CSV file as a string, or None if it does not exist"""
+    try:
+        stats = os.stat(csv_path)
+    except OSError:
+        return None
+    return f"{stats.st_size}:{stats.st_mtime_ns}"
+
+
+def write_csv_atomic(csv_path: Path, columns: List[str], rows: List[Dict[str, str]]) -> None:
+    """Write rows to a CSV file through a temporary file, so readers never see half a deck"""
+    fd, tmp_path = tempfile.mkstemp(dir=Path(csv_path).parent, prefix=f".{Path(csv_path).stem}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(columns)
+            writer.writerows([row.get(col, '') for col in columns] for row in rows)
+        os.replace(tmp_path, csv_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_frame_atomic(csv_path: Path, df: pd.DataFrame) -> None:
+    """Write the cards of a frame to a CSV file with write_csv_atomic"""
+    write_csv_atomic(csv_path, list(df.columns), df.fillna('').to_dict('records'))
+
+
+def card_ids_path(csv_path: Path) -> Path:
+    """Return the file holding the card IDs of a CSV file"""
+    return csv_path.with_name(f".{csv_path.stem}.ids")
+
+
+def read_card_ids(csv_path: Path, row_count: int) -> Tuple[List[int], int]:
+    """
+    Return the IDs of the cards in a CSV file, in file order, and the next free ID.
+
+    Files without stored IDs number their cards from 0. Rows beyond the
+    stored IDs (appended since they were written) get new IDs in order; if
+    the file lost rows behind the store's back, every card gets a new ID,
+    so IDs are never reused.
+
+    Args:
+        csv_path: Path to the CSV file
+        row_count: Number of cards in the file
+
+    Returns:
+        Card IDs and next free ID
+    """
+    try:
+        with open(card_ids_path(csv_path), 'r') as f:
+            data = json.load(f)
+        next_id = int(data['next_id'])
+        ids = [card_id for start, length in data['runs'] for card_id in range(start, start + length)]
+    except (OSError, ValueError, KeyError, TypeError):
+        return list(range(row_count)), row_count
+
+    if len(ids) > row_count:
+        ids = []
+    extra = row_count - len(ids)
+    return ids + list(range(next_id, next_id + extra)), next_id + extra
+
+
+def write_card_ids(csv_path: Path, ids: List[int], next_id: int) -> None:
+    """Store the card IDs of a CSV file, as runs of consecutive IDs"""
+    path = card_ids_path(csv_path)
+    if ids == list(range(len(ids))) and next_id == len(ids):
+        # The default numbering needs no file
+        path.unlink(missing_ok=True)
+        return
+
+    runs = []
+    for card_id in ids:
+        if runs and runs[-1][0] + runs[-1][1] == card_id:
+            runs[-1][1] += 1
+        else:
+            runs.append([card_id, 1])
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'next_id': next_id, 'runs': runs}, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def deck_sidecar_paths(csv_path: Path) -> List[Path]:
+    """Return the files kept next to a deck's CSV file by the card stores"""
+    return [card_ids_path(csv_path), JournaledCsvCardStore.journal_path(csv_path)]
+
+
+def _frame_with_ids(df: pd.DataFrame, ids: List[int], next_id: int) -> pd.DataFrame:
+    """Index a deck's frame by card ID"""
+    df.index = pd.Index(ids, dtype='int64')
+    df.attrs['next_id'] = next_id
+    return df
+
+
+class DelayedTasks:
+    """
+    Runs a callback for a deck some time after it was last requested for it.
+
+    Requests made while one is pending restart the wait, so a burst of edits
+    leads to one run. A delay of 0 runs the callback at once; None never
+    schedules it, leaving it to explicit calls.
+    """
+
+    def __init__(self, delay: Optional[float], callback: Callable[[str], None]):
+        self.delay = delay
+        self.callback = callback
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, deck_id: str) -> None:
+        """Run the callback for a deck after the delay"""
+        if self.delay is None:
+            return
+        if self.delay <= 0:
+            self.callback(deck_id)
+            return
+        timer = threading.Timer(self.delay, self.callback, (deck_id,))
+        timer.daemon = True
+        with self._lock:
+            previous = self._timers.pop(deck_id, None)
+            self._timers[deck_id] = timer
+        if previous is not None:
+            previous.cancel()
+        timer.start()
+
+    def cancel(self, deck_id: str) -> None:
+        """Drop the pending run for a deck, e.g. because the work is being done now"""
+        with self._lock:
+            timer = self._timers.pop(deck_id, None)
+        if timer is not None:
+            timer.cancel()
+
+
+class CardStore(ABC):
+    """
+    Interface of a card storage backend.
+
+    Card IDs identify a card within its deck: they are assigned once, never
+    reused, and do not change when other cards are deleted. Every operation runs in its own
+    transaction unless it is made inside transaction(), which groups several
+    operations on one deck into a single all-or-nothing change.
+    """
+
+    @abstractmethod
+    def columns(self, deck_id: str) -> List[str]:
+        """Return the field names of a deck"""
+
+    @abstractmethod
+    def list_cards(self, deck_id: str) -> List[CardRow]:
+        """Return every card of a deck, in deck order"""
+
+    @abstractmethod
+    def get_card(self, deck_id: str, card_id: int) -> Optional[Dict[str, str]]:
+        """Return the fields of a card, or None if it does not exist"""
+
+    @abstractmethod
+    def create_cards(self, deck_id: str, rows: List[Dict[str, str]]) -> List[CardRow]:
+        """Append cards to a deck; missing fields are filled with empty strings"""
+
+    @abstractmethod
+    def update_card(self, deck_id: str, card_id: int, fields: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Change some fields of a card; return its new fields, or None if it does not exist"""
+
+    @abstractmethod
+    def delete_card(self, deck_id: str, card_id: int) -> bool:
+        """Delete a card; return False if it does not exist"""
+
+    @abstractmethod
+    def transaction(self, deck_id: str):
+        """Context manager grouping the enclosed operations on a deck into one change"""
+
+    def flush(self, deck_id: Optional[str] = None) -> None:
+        """Write pending changes of a deck (or of all decks) to their CSV files"""
+
+
+class CsvCardStore(CardStore):
+    """
+    Cards kept in the deck's CSV file, rewritten as a whole on every change.
+
+    Card IDs are assigned once and stored next to the file (see
+    read_card_ids), so deleting a card does not renumber the others. Parsed
+    files are kept in the process-wide frame cache, indexed by card ID, so
+    reads after the first one skip the parse and cards are looked up by
+    hash. Changes to a file are serialized across the process, and a
+    transaction writes the file once.
+    """
+
+    def __init__(self, csv_path: Callable[[str], Path], cache: Optional[FrameCache] = None):
+        """
+        Initialize the store.
+
+        Args:
+            csv_path: Function returning the CSV path of a deck ID
+            cache: Frame cache, the process-wide one by default
+        """
+        self.csv_path = csv_path
+        self.cache = cache if cache is not None else get_frame_cache()
+        self._local = threading.local()
+
+    def _open_frames(self) -> Dict[str, dict]:
+        if not hasattr(self._local, 'frames'):
+            self._local.frames = {}
+        return self._local.frames
+
+    def _sidecar_paths(self, csv_path: Path) -> List[Path]:
+        """Files besides the CSV file that a deck's cards are read from"""
+        return [card_ids_path(csv_path)]
+
+    def _read(self, deck_id: str, csv_path: Path) -> pd.DataFrame:
+        """Load CSV file for a deck"""
+        if not csv_path.exists():
+            raise ValueError(f"Deck '{deck_id}' not found")
+        return self.cache.get(csv_path, self._parse, self._sidecar_paths(csv_path))
+
+    def _parse(self, csv_path: Path) -> pd.DataFrame:
+        """Parse a CSV file, indexed by card ID"""
+        df = read_deck_frame(csv_path)
+        return _frame_with_ids(df, *read_card_ids(csv_path, len(df)))
+
+    def _write(self, csv_path: Path, df: pd.DataFrame) -> None:
+        """Save CSV file and card IDs for a deck, keeping the saved frame cached"""
+        _write_frame_atomic(csv_path, df)
+        write_card_ids(csv_path, df.index.tolist(), df.attrs['next_id'])
+        self.cache.put(csv_path, df, self._sidecar_paths(csv_path))
+
+    @contextlib.contextmanager
+    def transaction(self, deck_id: str) -> Iterator[None]:
+        csv_path = self.csv_path(deck_id)
+        with self.cache.lock(csv_path):
+            frames = self._open_frames()
+            if deck_id in frames:
+                yield
+                return
+            df = self._read(deck_id, csv_path)
+            state = {'df': df, 'columns': list(df.columns), 'changes': []}
+            frames[deck_id] = state
+            try:
+                yield
+                if state['changes']:
+                    self._commit(deck_id, csv_path, state)
+            except BaseException:
+                # The cached frame may have been changed in place
+                self.cache.discard(csv_path)
+                raise
+            finally:
+                del frames[deck_id]
+
+    def _load(self, deck_id: str) -> pd.DataFrame:
+        return self._open_frames()[deck_id]['df']
+
+    def _save(self, deck_id: str, df: pd.DataFrame, change: tuple) -> None:
+        """Keep the changed frame, and the change itself, until the transaction ends"""
+        state = self._open_frames()[deck_id]
+        state['df'] = df
+        state['changes'].append(change)
+
+    def _commit(self, deck_id: str, csv_path: Path, state: dict) -> None:
+        """Write the changes of a transaction to disk"""
+        self._write(csv_path, state['df'])
+
+    @staticmethod
+    def _fields(row: pd.Series) -> Dict[str, str]:
+        # Convert NaN to empty string
+        return {k: (v if pd.notna(v) else "") for k, v in row.to_dict().items()}
+
+    def columns(self, deck_id: str) -> List[str]:
+        with self.transaction(deck_id):
+            return list(self._load(deck_id).columns)
+
+    def list_cards(self, deck_id: str) -> List[CardRow]:
+        with self.transaction(deck_id):
+            # Convert NaN to empty string
+            df = self._load(deck_id)
+            return list(zip(df.index.tolist(), df.fillna('').to_dict('records')))
+
+    def get_card(self, deck_id: str, card_id: int) -> Optional[Dict[str, str]]:
+        with self.transaction(deck_id):
+            df = self._load(deck_id)
+            if card_id not in df.index:
+                return None
+            return self._fields(df.loc[card_id])
+
+    def create_cards(self, deck_id: str, rows: List[Dict[str, str]]) -> List[CardRow]:
+        with self.transaction(deck_id):
+            df = self._load(deck_id)
+
+            # Fill missing columns with empty string
+            rows = [{**{col: "" for col in df.columns}, **row} for row in rows]
+
+            # Add all new rows, numbered from the next free ID
+            next_id = df.attrs['next_id']
+            ids = list(range(next_id, next_id + len(rows)))
+            df = pd.concat([df, pd.DataFrame(rows, index=ids, dtype=STRING_DTYPE)])
+            df.attrs['next_id'] = next_id + len(rows)
+            self._save(deck_id, df, ('append', rows))
+
+            return list(zip(ids, rows))
+
+    def update_card(self, deck_id: str, card_id: int, fields: Dict[str, str]) -> Optional[Dict[str, str]]:
+        with self.transaction(deck_id):
+            df = self._load(deck_id)
+            if card_id not in df.index:
+                return None
+
+            fields = {col: value for col, value in fields.items() if col in df.columns}
+            for col, value in fields.items():
+                df.at[card_id, col] = value
+            self._save(deck_id, df, ('update', card_id, fields))
+
+            return self._fields(df.loc[card_id])
+
+    def delete_card(self, deck_id: str, card_id: int) -> bool:
+        with self.transaction(deck_id):
+            df = self._load(deck_id)
+            if card_id not in df.index:
+                return False
+
+            # Drop the row; the other cards keep their IDs
+            next_id = df.attrs['next_id']
+            df = df.drop(card_id)
+            df.attrs['next_id'] = next_id
+            self._save(deck_id, df, ('delete', card_id))
+            return True
+
+
+class JournaledCsvCardStore(CsvCardStore):
+    """
+    Cards kept in the deck's CSV file, writing only what changed.
+
+    New cards are appended to the end of the CSV file, taking the IDs after
+    the stored ones (see read_card_ids). Updates and deletes are appended as
+    patch and tombstone records, by card ID, to a journal next to it
+    (".<deck>.journal", one JSON record per line), which is replayed in
+    order on top of the file when the deck is read. A journal is folded
+    back into a clean CSV file, storing the card IDs with it, compact_delay
+    seconds after the last edit, as soon as it grows past
+    MAX_JOURNAL_BYTES, and on flush().
+
+    The first journal record holds the inode of the CSV file it patches.
+    Compaction replaces the file, so a journal left behind by an interrupted
+    compaction, or by a deleted deck, is recognized and ignored.
+    """
+
+    def __init__(self, csv_path: Callable[[str], Path], cache: Optional[FrameCache] = None,
+                 compact_delay: Optional[float] = DEFAULT_EXPORT_DELAY):
+        """
+        Initialize the store.
+
+        Args:
+            csv_path: Function returning the CSV path of a deck ID
+            cache: Frame cache, the process-wide one by default
+            compact_delay: Seconds to wait before folding a journal into its CSV file
+                (0 folds it on every commit, None only on flush())
+        """
+        super().__init__(csv_path, cache)
+        self._compactions = DelayedTasks(compact_delay, self._compact_quietly)
+        self._pending = set()
+        _live_stores.add(self)
+
+    @staticmethod
+    def journal_path(csv_path: Path) -> Path:
+        """Return the journal of a CSV file"""
+        return csv_path.with_name(f".{csv_path.stem}.journal")
+
+    def _sidecar_paths(self, csv_path: Path) -> List[Path]:
+        return [card_ids_path(csv_path), self.journal_path(csv_path)]
+
+    def _journal_records(self, csv_path: Path, header_only: bool = False) -> Optional[List[dict]]:
+        """Return the records of a CSV file's journal, or None if it has no current journal"""
+        try:
+            with open(self.journal_path(csv_path), 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                if header.get('inode') != os.stat(csv_path).st_ino:
+                    return None
+                lines = [] if header_only else f.read().splitlines()
+        except (OSError, ValueError, AttributeError):
+            return None
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break  # Torn write at the end of the journal
+        return records
+
+    def _parse(self, csv_path: Path) -> pd.DataFrame:
+        """Parse a CSV file and apply its journal"""
+        df = super()._parse(csv_path)
+        next_id = df.attrs['next_id']
+        for record in self._journal_records(csv_path) or []:
+            card_id = record.get('id')
+            if card_id not in df.index:
+                continue
+            if record.get('op') == 'update':
+                for col, value in record.get('fields', {}).items():
+                    if col in df.columns:
+                        df.at[card_id, col] = value
+            elif record.get('op') == 'delete':
+                df = df.drop(card_id)
+        df.attrs['next_id'] = next_id
+        return df
+
+    def _commit(self, deck_id: str, csv_path: Path, state: dict) -> None:
+        columns = state['columns']
+        appended = [row for change in state['changes'] if change[0] == 'append' for row in change[1]]
+        if any(col not in columns for row in appended for col in row):
+            # New columns change the header; rewrite the file
+            self._rewrite(deck_id, csv_path, state['df'])
+            return
+
+        journal_path = self.journal_path(csv_path)
+        records = [
+            {'op': 'update', 'id': change[1], 'fields': change[2]} if change[0] == 'update'
+            else {'op': 'delete', 'id': change[1]}
+            for change in state['changes'] if change[0] == 'delete' or (change[0] == 'update' and change[2])
+        ]
+
+        if appended:
+            self._append_rows(csv_path, columns, appended)
+        if records:
+            lines = [json.dumps(record) for record in records]
+            if self._journal_records(csv_path, header_only=True) is None:
+                lines.insert(0, json.dumps({'op': 'base', 'inode': os.stat(csv_path).st_ino}))
+                mode = 'w'
+            else:
+                mode = 'a'
+            with open(journal_path, mode, encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        self.cache.put(csv_path, state['df'], self._sidecar_paths(csv_path))
+
+        if records or journal_path.exists():
+            self._pending.add(deck_id)
+            if journal_path.stat().st_size > MAX_JOURNAL_BYTES:
+                self.compact(deck_id)
+            else:
+                self._compactions.schedule(deck_id)
+
+    @staticmethod
+    def _append_rows(csv_path: Path, columns: List[str], rows: List[Dict[str, str]]) -> None:
+        """Append rows to the end of a CSV file"""
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows([row.get(col, '') for col in columns] for row in rows)
+        with open(csv_path, 'r+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) not in (b'\n', b'\r'):
+                    f.write(b'\n')
+            f.write(buffer.getvalue().encode('utf-8'))
+
+    def _rewrite(self, deck_id: str, csv_path: Path, df: pd.DataFrame) -> None:
+        """Replace a CSV file with the given cards and drop its journal"""
+        journal_path = self.journal_path(csv_path)
+        _write_frame_atomic(csv_path, df)
+        write_card_ids(csv_path, df.index.tolist(), df.attrs['next_id'])
+        journal_path.unlink(missing_ok=True)
+        self._pending.discard(deck_id)
+        self.cache.put(csv_path, df, self._sidecar_paths(csv_path))
+
+    def compact(self, deck_id: str) -> bool:
+        """
+        Fold a deck's journal into its CSV file.
+
+        Returns:
+            True if the file was rewritten
+        """
+        self._compactions.cancel(deck_id)
+        csv_path = self.csv_path(deck_id)
+        with self.cache.lock(csv_path):
+            if not self.journal_path(csv_path).exists():
+                self._pending.discard(deck_id)
+                return False
+            if not csv_path.exists():
+                # The deck was deleted; drop its journal
+                self.journal_path(csv_path).unlink(missing_ok=True)
+                self._pending.discard(deck_id)
+                return False
+            self._rewrite(deck_id, csv_path, self._read(deck_id, csv_path))
+            return True
+
+    def _compact_quietly(self, deck_id: str) -> None:
+        try:
+            self.compact(deck_id)
+        except Exception as e:
+            print(f"Error compacting journal of {deck_id}: {e}")
+
+    def flush(self, deck_id: Optional[str] = None) -> None:
+        for pending_deck in ([deck_id] if deck_id is not None else list(self._pending)):
+            self.compact(pending_deck)
+
+
+class SqliteCardStore(CardStore):
+    """
+    Cards kept in a SQLite database in WAL mode, one row per card.
+
+    Creating, updating or deleting a card touches only that card's row, so
+    edits cost the same whatever the deck size, and concurrent writers are
+    serialized by SQLite instead of overwriting each other's files.
+
+    The deck's CSV file stays the exchange format: a deck is imported from
+    it on first use (and again whenever the file changes while the store has
+    no unexported edits), and edits are exported back to it export_delay
+    seconds after the last change, or immediately on flush(). Card IDs are
+    read and written with the file, so they are the same in every store.
+    """
+
+    def __init__(self, db_path: Path, csv_path: Callable[[str], Path], export_delay: Optional[float] = DEFAULT_EXPORT_DELAY):
+        """
+        Open (and if needed create) the card database.
+
+        Args:
+            db_path: Path to the SQLite database
+            csv_path: Function returning the CSV path of a deck ID
+            export_delay: Seconds to wait before exporting edits to the CSV file
+                (0 exports on every commit, None only on flush())
+        """
+        self.db_path = Path(db_path)
+        self.csv_path = csv_path
+        self.export_delay = export_delay
+        self._local = threading.local()
+        self._exports = DelayedTasks(export_delay, self._export_quietly)
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(CARD_SCHEMA)
+        _live_stores.add(self)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection to the database"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.changed = set()
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextlib.contextmanager
+    def transaction(self, deck_id: str) -> Iterator[sqlite3.Connection]:
+        conn = self._connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                self._ensure_deck(conn, deck_id)
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            self._ensure_deck(conn, deck_id)
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            self._local.changed.clear()
+            raise
+        finally:
+            self._local.depth = 0
+
+        changed, self._local.changed = self._local.changed, set()
+        for changed_deck in changed:
+            self._exports.schedule(changed_deck)
+
+    def _ensure_deck(self, conn: sqlite3.Connection, deck_id: str) -> None:
+        """Import a deck from its CSV file if it is new to the store or was edited outside it"""
+        csv_path = self.csv_path(deck_id)
+        signature = _csv_signature(csv_path)
+        row = conn.execute('SELECT csv_signature, dirty FROM decks WHERE deck_id = ?', (deck_id,)).fetchone()
+
+        if signature is None:
+            if row is not None:
+                # The deck was deleted; drop its cards
+                conn.execute('DELETE FROM cards WHERE deck_id = ?', (deck_id,))
+                conn.execute('DELETE FROM decks WHERE deck_id = ?', (deck_id,))
+            raise ValueError(f"Deck '{deck_id}' not found")
+
+        if row is not None and (row[1] or row[0] == signature):
+            return
+
+        df = pd.read_csv(csv_path, dtype=str).fillna('')
+        columns = [str(col) for col in df.columns]
+        records = df.to_dict('records')
+        ids, next_id = read_card_ids(csv_path, len(records))
+        conn.execute('DELETE FROM cards WHERE deck_id = ?', (deck_id,))
+        conn.executemany(
+            'INSERT INTO cards (deck_id, card_id, fields) VALUES (?, ?, ?)',
+            ((deck_id, card_id, json.dumps(record)) for card_id, record in zip(ids, records))
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO decks (deck_id, columns, next_id, csv_signature, dirty) VALUES (?, ?, ?, ?, 0)',
+            (deck_id, json.dumps(columns), next_id, signature)
+        )
+
+    def _mark_changed(self, conn: sqlite3.Connection, deck_id: str) -> None:
+        conn.execute('UPDATE decks SET dirty = 1 WHERE deck_id = ?', (deck_id,))
+        self._local.changed.add(deck_id)
+
+    def columns(self, deck_id: str) -> List[str]:
+        with self.transaction(deck_id) as conn:
+            row = conn.execute('SELECT columns FROM decks WHERE deck_id = ?', (deck_id,)).fetchone()
+            return json.loads(row[0])
+
+    def list_cards(self, deck_id: str) -> List[CardRow]:
+        with self.transaction(deck_id) as conn:
+            rows = conn.execute(
+                'SELECT card_id, fields FROM cards WHERE deck_id = ? ORDER BY card_id', (deck_id,)
+            ).fetchall()
+            return [(card_id, json.loads(fields)) for card_id, fields in rows]
+
+    def get_card(self, deck_id: str, card_id: int) -> Optional[Dict[str, str]]:
+        with self.transaction(deck_id) as conn:
+            row = conn.execute(
+                'SELECT fields FROM cards WHERE deck_id = ? AND card_id = ?', (deck_id, card_id)
+            ).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def create_cards(self, deck_id: str, rows: List[Dict[str, str]]) -> List[CardRow]:
+        with self.transaction(deck_id) as conn:
+            columns_json, next_id = conn.execute(
+                'SELECT columns, next_id FROM decks WHERE deck_id = ?', (deck_id,)
+            ).fetchone()
+            columns = json.loads(columns_json)
+
+            # Fill missing columns with empty string; unknown fields become new columns
+            rows = [{**{col: "" for col in columns}, **row} for row in rows]
+            for row in rows:
+                columns.extend(col for col in row if col not in columns)
+
+            created = [(next_id + i, row) for i, row in enumerate(rows)]
+            conn.executemany(
+                'INSERT INTO cards (deck_id, card_id, fields) VALUES (?, ?, ?)',
+                ((deck_id, card_id, json.dumps(row)) for card_id, row in created)
+            )
+            conn.execute(
+                'UPDATE decks SET columns = ?, next_id = ? WHERE deck_id = ?',
+                (json.dumps(columns), next_id + len(rows), deck_id)
+            )
+            self._mark_changed(conn, deck_id)
+            return created
+
+    def update_card(self, deck_id: str, card_id: int, fields: Dict[str, str]) -> Optional[Dict[str, str]]:
+        with self.transaction(deck_id) as conn:
+            current = self.get_card(deck_id, card_id)
+            if current is None:
+                return None
+
+            updated = {**current, **{col: value for col, value in fields.items() if col in current}}
+            if updated != current:
+                conn.execute(
+                    'UPDATE cards SET fields = ? WHERE deck_id = ? AND card_id = ?',
+                    (json.dumps(updated), deck_id, card_id)
+                )
+                self._mark_changed(conn, deck_id)
+            return updated
+
+    def delete_card(self, deck_id: str, card_id: int) -> bool:
+        with self.transaction(deck_id) as conn:
+            deleted = conn.execute(
+                'DELETE FROM cards WHERE deck_id = ? AND card_id = ?', (deck_id, card_id)
+            ).rowcount
+            if deleted:
+                self._mark_changed(conn, deck_id)
+            return bool(deleted)
+
+    def import_csv(self, deck_id: str) -> int:
+        """
+        Replace the stored cards of a deck with the contents of its CSV file.
+
+        Unexported edits are discarded.
+
+        Returns:
+            Number of cards imported
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('UPDATE decks SET csv_signature = NULL, dirty = 0 WHERE deck_id = ?', (deck_id,))
+            self._ensure_deck(conn, deck_id)
+            count = conn.execute('SELECT COUNT(*) FROM cards WHERE deck_id = ?', (deck_id,)).fetchone()[0]
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return count
+
+    def export_csv(self, deck_id: str) -> bool:
+        """
+        Write the stored cards of a deck to its CSV file if they have unexported edits.
+
+        Returns:
+            True if the file was written
+        """
+        self._exports.cancel(deck_id)
+
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT columns, dirty, next_id FROM decks WHERE deck_id = ?', (deck_id,)).fetchone()
+            csv_path = self.csv_path(deck_id)
+            if row is None or not row[1] or not csv_path.parent.exists():
+                conn.execute('COMMIT')
+                return False
+
+            cards = conn.execute(
+                'SELECT card_id, fields FROM cards WHERE deck_id = ? ORDER BY card_id', (deck_id,)
+            ).fetchall()
+            write_csv_atomic(csv_path, json.loads(row[0]), [json.loads(fields) for _, fields in cards])
+            write_card_ids(csv_path, [card_id for card_id, _ in cards], row[2])
+            conn.execute(
+                'UPDATE decks SET csv_signature = ?, dirty = 0 WHERE deck_id = ?',
+                (_csv_signature(csv_path), deck_id)
+            )
+            conn.execute('COMMIT')
+            return True
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _export_quietly(self, deck_id: str) -> None:
+        try:
+            self.export_csv(deck_id)
+        except Exception as e:
+            print(f"Error exporting cards of {deck_id}: {e}")
+        finally:
+            self.close()
+
+    def flush(self, deck_id: Optional[str] = None) -> None:
+        if deck_id is not None:
+            self.export_csv(deck_id)
+            return
+        conn = self._connection()
+        for (dirty_deck,) in conn.execute('SELECT deck_id FROM decks WHERE dirty = 1').fetchall():
+            self.export_csv(dirty_deck)
+
+
+def create_card_store(csv_path: Callable[[str], Path], storage: Optional[str] = None) -> CardStore:
+    """
+    Create the card store selected by settings.CARD_STORAGE.
+
+    Args:
+        csv_path: Function returning the CSV path of a deck ID
+        storage: "csv", "journal" or "sqlite", overriding the setting
+
+    Returns:
+        Card store
+    """
+    storage = (storage or settings.CARD_STORAGE).lower()
+    if storage == 'csv':
+        return CsvCardStore(csv_path)
+    if storage == 'journal':
+        return JournaledCsvCardStore(csv_path, compact_delay=settings.CARD_EXPORT_DELAY)
+    if storage == 'sqlite':
+        return SqliteCardStore(settings.CARDS_DB_PATH, csv_path, settings.CARD_EXPORT_DELAY)
+    raise ValueError(f"Unknown card storage '{storage}'")
+
+
+# Stores whose edits may not have reached the CSV files yet
+_live_stores: "weakref.WeakSet[CardStore]" = weakref.WeakSet()
+
+
+def flush_card_stores(deck_id: Optional[str] = None) -> None:
+    """
+    Write pending card edits to the CSV files, for one deck or all of them.
+
+    Called before anything reads a deck's CSV file directly, such as
+    building its APKG file.
+    """
+    for store in list(_live_stores):
+        try:
+            store.flush(deck_id)
+        except Exception as e:
+            print(f"Error flushing card store: {e}")
+
+
+atexit.register(flush_card_stores)
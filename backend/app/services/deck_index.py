@@ -0,0 +1,257 @@
+"""Deck index - Persistent cache of deck metadata keyed on CSV file stats"""
+
+import os
+import re
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Import existing anki generator
+import sys
+sys.path.append(str(settings.BASE_DIR))
+from anki_deck_generator.source import DeckSource
+
+# Name of the index file, kept next to the generated APKG files
+DECK_INDEX_FILE = 'deck_index.json'
+
+# Bump when the metadata derived from a CSV file changes
+DECK_INDEX_VERSION = 1
+
+# Number of threads probing changed CSV files at once
+PROBE_WORKERS = 8
+
+# Languages detected from deck file names
+DECK_LANGUAGES = ['spanish', 'english', 'french', 'german', 'italian']
+
+
+def deck_metadata(deck_id: str, columns: List[str], row_count: int) -> Dict[str, Any]:
+    """Derive the deck name, card type, language and tags from a deck's ID and columns"""
+    is_cloze = any('cloze' in col.lower() or 'text' in col.lower() for col in columns)
+    card_type = 'cloze' if is_cloze else 'basic'
+
+    # Detect language from filename
+    language = 'generic'
+    for lang in DECK_LANGUAGES:
+        if lang in deck_id.lower():
+            language = lang
+            break
+
+    # Extract tags from filename
+    tags = [word.lower() for word in re.split(r'[_\-]', deck_id) if len(word) > 2]
+    tags.append(language)
+    tags.append(card_type)
+
+    return {
+        'name': ' '.join(word.capitalize() for word in re.split(r'[_\-]', deck_id)),
+        'columns': list(columns),
+        'row_count': row_count,
+        'card_type': card_type,
+        'language': language,
+        'tags': sorted(set(tags)),
+    }
+
+
+class DeckIndex:
+    """
+    Metadata of every deck in the CSV directory, persisted between runs.
+
+    Entries are keyed on the CSV file's size and mtime, so refreshing the
+    index costs one directory scan; only new or changed files are probed,
+    reading just their header and counting their lines. APKG paths come from
+    one listing of the APKG directory, redone only when that directory changes.
+
+    The index file records the CSV directory it describes; entries written
+    for another CSV directory sharing the APKG directory are discarded.
+    """
+
+    def __init__(self, csv_dir: Path, apkg_dir: Path):
+        self.csv_dir = Path(csv_dir)
+        self.apkg_dir = Path(apkg_dir)
+        self.path = self.apkg_dir / DECK_INDEX_FILE
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._apkg_signature: Optional[int] = None
+        self._apkg_files: Dict[str, str] = {}
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the index file once"""
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') != DECK_INDEX_VERSION:
+                    raise ValueError('outdated deck index')
+                if data.get('csv_dir') != os.path.abspath(self.csv_dir):
+                    raise ValueError('deck index of another CSV directory')
+                self._entries = data['decks']
+            except (FileNotFoundError, ValueError, KeyError, TypeError):
+                self._entries = {}
+        return self._entries
+
+    def save(self) -> None:
+        """Write the index atomically if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.apkg_dir.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.apkg_dir, prefix='.deck_index.')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({
+                        'version': DECK_INDEX_VERSION,
+                        'csv_dir': os.path.abspath(self.csv_dir),
+                        'decks': self._entries,
+                    }, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                print(f"Error saving deck index: {e}")
+
+    def _probe(self, deck_id: str, stats: os.stat_result, source: Optional[DeckSource] = None) -> Dict[str, Any]:
+        """Read a deck's header and count its rows, reusing an already-parsed source if given"""
+        if source is None:
+            source = DeckSource(str(self.csv_dir / f"{deck_id}.csv"))
+        entry = deck_metadata(deck_id, source.columns, source.count_rows())
+        entry.update({
+            'size': stats.st_size,
+            'mtime_ns': stats.st_mtime_ns,
+            'mtime': stats.st_mtime,
+            'ctime': stats.st_ctime,
+        })
+        return entry
+
+    def _apkg_path(self, deck_id: str) -> Optional[str]:
+        """Return the APKG file of a deck from the cached directory listing"""
+        name = self._apkg_files.get(deck_id)
+        if name is None:
+            # Fall back to any .apkg file that starts with the deck_id
+            name = next((f for stem, f in sorted(self._apkg_files.items()) if stem.startswith(deck_id)), None)
+        return str(self.apkg_dir / name) if name else None
+
+    def _refresh_apkg_files(self) -> None:
+        """List the APKG directory again if files were added, removed or renamed in it"""
+        try:
+            signature = os.stat(self.apkg_dir).st_mtime_ns
+        except OSError:
+            signature = None
+        if signature == self._apkg_signature:
+            return
+        files = {}
+        if signature is not None:
+            for name in os.listdir(self.apkg_dir):
+                if name.endswith('.apkg'):
+                    files[name[:-len('.apkg')]] = name
+        self._apkg_files = files
+        self._apkg_signature = signature
+
+    def _with_apkg(self, deck_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        apkg_path = self._apkg_path(deck_id)
+        if 'apkg_path' not in entry or entry['apkg_path'] != apkg_path:
+            entry['apkg_path'] = apkg_path
+            self._dirty = True
+        return entry
+
+    def get(self, deck_id: str, source: Optional[DeckSource] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the metadata of one deck, probing its CSV file only if it changed.
+
+        An already-parsed source is used for the probe if given.
+        """
+        csv_path = self.csv_dir / f"{deck_id}.csv"
+        with self._lock:
+            entries = self._load()
+            try:
+                stats = os.stat(csv_path)
+            except OSError:
+                if entries.pop(deck_id, None) is not None:
+                    self._dirty = True
+                return None
+
+            entry = entries.get(deck_id)
+            if not entry or \
+                    entry.get('size') != stats.st_size or entry.get('mtime_ns') != stats.st_mtime_ns:
+                entry = self._probe(deck_id, stats, source)
+                entries[deck_id] = entry
+                self._dirty = True
+
+            self._refresh_apkg_files()
+            entry = dict(self._with_apkg(deck_id, entry))
+        self.save()
+        return entry
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Bring the index up to date with the CSV directory.
+
+        Returns:
+            Metadata of every deck, by deck ID
+        """
+        with self._lock:
+            entries = self._load()
+
+            current = {}
+            if self.csv_dir.exists():
+                for entry in os.scandir(self.csv_dir):
+                    if entry.name.endswith('.csv') and entry.is_file():
+                        current[entry.name[:-len('.csv')]] = entry.stat()
+
+            for deck_id in list(entries):
+                if deck_id not in current:
+                    del entries[deck_id]
+                    self._dirty = True
+
+            changed = [
+                (deck_id, stats) for deck_id, stats in current.items()
+                if deck_id not in entries
+                or entries[deck_id].get('size') != stats.st_size
+                or entries[deck_id].get('mtime_ns') != stats.st_mtime_ns
+            ]
+            if changed:
+                with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(changed))) as executor:
+                    probes = executor.map(lambda item: self._safe_probe(*item), changed)
+                    for (deck_id, _), entry in zip(changed, probes):
+                        if entry is not None:
+                            entries[deck_id] = entry
+                        else:
+                            entries.pop(deck_id, None)
+                self._dirty = True
+
+            self._refresh_apkg_files()
+            decks = {
+                deck_id: dict(self._with_apkg(deck_id, entry))
+                for deck_id, entry in entries.items()
+            }
+        self.save()
+        return decks
+
+    def _safe_probe(self, deck_id: str, stats: os.stat_result) -> Optional[Dict[str, Any]]:
+        try:
+            return self._probe(deck_id, stats)
+        except Exception as e:
+            print(f"Error loading deck metadata for {deck_id}: {e}")
+            return None
+
+    def forget(self, deck_id: str) -> None:
+        """Drop a deck from the index, e.g. after it was deleted or renamed"""
+        with self._lock:
+            if self._load().pop(deck_id, None) is not None:
+                self._dirty = True
+
+
+_indexes: Dict[Tuple[str, str], DeckIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_deck_index(csv_dir: Path, apkg_dir: Path) -> DeckIndex:
+    """Return the process-wide index for a CSV and APKG directory"""
+    key = (os.path.abspath(csv_dir), os.path.abspath(apkg_dir))
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = DeckIndex(csv_dir, apkg_dir)
+        return _indexes[key]
@@ -3,18 +3,21 @@
 import os
 import pandas as pd
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 import re
 
 from app.models.deck import Deck, DeckCreate, DeckUpdate
 from app.core.config import settings
+from app.services.deck_index import get_deck_index
+from app.services.card_store import deck_sidecar_paths, flush_card_stores
 
 # Import existing anki generator
 import sys
 sys.path.append(str(settings.BASE_DIR))
-from anki_deck_generator.core import create_dynamic_deck_generator
-from anki_deck_generator.config import load_config
+from anki_deck_generator.core import analyze_csv_structure, create_dynamic_deck_generator
+from anki_deck_generator.config import get_config
+from anki_deck_generator.source import DeckSource
 
 
 class DeckService:
@@ -23,7 +26,16 @@ class DeckService:
     def __init__(self):
         self.csv_dir = settings.CSV_DIR
         self.apkg_dir = settings.APKG_DIR
-        self.config = load_config()
+
+    @property
+    def index(self):
+        """Metadata index of the decks in csv_dir, shared by every service on the same directories"""
+        return get_deck_index(self.csv_dir, self.apkg_dir)
+
+    @property
+    def config(self):
+        """Current generator configuration, reloaded when config.json changes"""
+        return get_config()
 
     def _filename_to_id(self, filename: str) -> str:
         """Convert filename to deck ID (without extension)"""
@@ -39,65 +51,37 @@ class DeckService:
 
     def _get_apkg_path(self, deck_id: str) -> Optional[Path]:
         """Get full path to APKG file if it exists"""
+        deck = self.index.get(deck_id)
+        if deck and deck['apkg_path']:
+            return Path(deck['apkg_path'])
         # Look for any .apkg file that starts with the deck_id
         for apkg_file in self.apkg_dir.glob(f"{deck_id}*.apkg"):
             return apkg_file
         return None
 
-    def _load_deck_metadata(self, deck_id: str) -> Optional[Deck]:
-        """Load deck metadata from CSV file"""
-        csv_path = self._get_csv_path(deck_id)
-
-        if not csv_path.exists():
-            return None
-
+    def _to_deck(self, deck_id: str, entry: Dict[str, Any]) -> Deck:
+        """Build the deck model from an index entry"""
+        return Deck(
+            id=deck_id,
+            name=entry['name'],
+            language=entry['language'],
+            description=None,
+            tags=entry['tags'],
+            card_type=entry['card_type'],
+            card_count=entry['row_count'],
+            created_at=datetime.fromtimestamp(entry['ctime']),
+            updated_at=datetime.fromtimestamp(entry['mtime']),
+            csv_path=str(self._get_csv_path(deck_id)),
+            apkg_path=entry['apkg_path']
+        )
+
+    def _load_deck_metadata(self, deck_id: str, source: Optional[DeckSource] = None) -> Optional[Deck]:
+        """Load deck metadata from the index, re-probing the CSV file only if it changed"""
         try:
-            # Read CSV to get card count
-            df = pd.read_csv(csv_path)
-            card_count = len(df)
-
-            # Get file stats
-            stats = csv_path.stat()
-            created_at = datetime.fromtimestamp(stats.st_ctime)
-            updated_at = datetime.fromtimestamp(stats.st_mtime)
-
-            # Detect card type from CSV content
-            columns = df.columns.tolist()
-            is_cloze = any('cloze' in col.lower() or 'text' in col.lower() for col in columns)
-            card_type = 'cloze' if is_cloze else 'basic'
-
-            # Get APKG path if it exists
-            apkg_path = self._get_apkg_path(deck_id)
-
-            # Generate deck name from filename
-            deck_name = ' '.join(word.capitalize() for word in re.split(r'[_\-]', deck_id))
-
-            # Detect language from filename
-            language = 'generic'
-            for lang in ['spanish', 'english', 'french', 'german', 'italian']:
-                if lang in deck_id.lower():
-                    language = lang
-                    break
-
-            # Extract tags from filename
-            tags = [word.lower() for word in re.split(r'[_\-]', deck_id) if len(word) > 2]
-            tags.append(language)
-            tags.append(card_type)
-            tags = list(set(tags))  # Remove duplicates
-
-            return Deck(
-                id=deck_id,
-                name=deck_name,
-                language=language,
-                description=None,
-                tags=tags,
-                card_type=card_type,
-                card_count=card_count,
-                created_at=created_at,
-                updated_at=updated_at,
-                csv_path=str(csv_path),
-                apkg_path=str(apkg_path) if apkg_path else None
-            )
+            entry = self.index.get(deck_id, source)
+            if entry is None:
+                return None
+            return self._to_deck(deck_id, entry)
 
         except Exception as e:
             print(f"Error loading deck metadata for {deck_id}: {e}")
@@ -106,20 +90,17 @@ class DeckService:
     def list_decks(self, language: Optional[str] = None, tag: Optional[str] = None) -> List[Deck]:
         """List all decks with optional filters"""
         decks = []
+        flush_card_stores()
 
-        # Scan CSV directory
-        for csv_file in self.csv_dir.glob("*.csv"):
-            deck_id = self._filename_to_id(csv_file.name)
-            deck = self._load_deck_metadata(deck_id)
-
-            if deck:
-                # Apply filters
-                if language and deck.language != language:
-                    continue
-                if tag and tag not in deck.tags:
-                    continue
+        # Refresh the index from the CSV directory; unchanged decks are not re-read
+        for deck_id, entry in self.index.refresh().items():
+            # Apply filters
+            if language and entry['language'] != language:
+                continue
+            if tag and tag not in entry['tags']:
+                continue
 
-                decks.append(deck)
+            decks.append(self._to_deck(deck_id, entry))
 
         # Sort by updated date (newest first)
         decks.sort(key=lambda d: d.updated_at or datetime.min, reverse=True)
@@ -128,6 +109,7 @@ class DeckService:
 
     def get_deck(self, deck_id: str) -> Optional[Deck]:
         """Get a single deck by ID"""
+        flush_card_stores(deck_id)
         return self._load_deck_metadata(deck_id)
 
     def create_deck(self, deck_data: DeckCreate) -> Deck:
@@ -170,7 +152,13 @@ class DeckService:
             if new_csv_path.exists():
                 raise ValueError(f"Deck with name '{deck_data.name}' already exists")
 
+            flush_card_stores(deck_id)
             old_csv_path.rename(new_csv_path)
+            # Card IDs and journals move with the deck
+            for old_path, new_path in zip(deck_sidecar_paths(old_csv_path), deck_sidecar_paths(new_csv_path)):
+                if old_path.exists():
+                    old_path.rename(new_path)
+            self.index.forget(deck_id)
             deck_id = new_id
 
         return self._load_deck_metadata(deck_id)
@@ -182,11 +170,16 @@ class DeckService:
         if not csv_path.exists():
             return False
 
-        # Delete CSV file
+        # Look up the APKG file while the deck is still indexed
+        apkg_path = self._get_apkg_path(deck_id)
+
+        # Delete CSV file, with its card IDs and journal
         csv_path.unlink()
+        for sidecar_path in deck_sidecar_paths(csv_path):
+            sidecar_path.unlink(missing_ok=True)
+        self.index.forget(deck_id)
 
         # Delete APKG file if it exists
-        apkg_path = self._get_apkg_path(deck_id)
         if apkg_path and apkg_path.exists():
             apkg_path.unlink()
 
@@ -200,8 +193,14 @@ class DeckService:
             return None
 
         try:
+            # Write pending card edits before reading the deck file
+            flush_card_stores(deck_id)
+
+            # Parse the CSV once for metadata, generator setup and note building
+            source = DeckSource(str(csv_path)).load()
+
             # Get deck metadata
-            deck = self._load_deck_metadata(deck_id)
+            deck = self._load_deck_metadata(deck_id, source)
             if not deck:
                 return None
 
@@ -209,16 +208,15 @@ class DeckService:
             generator = create_dynamic_deck_generator(
                 str(csv_path),
                 language=deck.language,
-                custom_config=self.config
+                custom_config=self.config,
+                source=source
             )
 
-            # Get columns for field mapping
-            df = pd.read_csv(csv_path)
-            columns = df.columns.tolist()
-            field_mapping = {col: col for col in columns}
+            # Map the note fields; the Tags column holds per-note tags, not a field
+            _, field_mapping = analyze_csv_structure(str(csv_path), source)
 
             # Generate from CSV
-            generator.generate_from_csv(str(csv_path), field_mapping, tags=deck.tags)
+            generator.generate_from_csv(str(csv_path), field_mapping, tags=deck.tags, source=source)
 
             # Export to APKG
             output_filename = f"{deck_id}.apkg"
@@ -226,7 +224,7 @@ class DeckService:
             generator.export_to_apkg(str(output_path))
 
             # Return updated deck metadata
-            return self._load_deck_metadata(deck_id)
+            return self._load_deck_metadata(deck_id, source)
 
         except Exception as e:
             print(f"Error generating APKG for {deck_id}: {e}")
@@ -0,0 +1,153 @@
+"""Frame cache - Process-wide LRU cache of parsed deck CSV files"""
+
+import os
+import threading
+import importlib.util
+import pandas as pd
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# Cells are kept as strings; with pyarrow installed they are stored in Arrow
+# buffers, which take a fraction of the memory of Python string objects
+STRING_DTYPE = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') else str
+
+
+def read_deck_frame(csv_path: Path) -> pd.DataFrame:
+    """Parse a deck CSV file with every column as strings"""
+    return pd.read_csv(csv_path, dtype=STRING_DTYPE)
+
+
+def _stats(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stats = os.stat(path)
+    except OSError:
+        return None
+    return stats.st_size, stats.st_mtime_ns
+
+
+def _signature(csv_path: str, extra_paths: Sequence[Path] = ()) -> Optional[tuple]:
+    """Stats of a file and of the files its parse depends on, or None if the file does not exist"""
+    stats = _stats(csv_path)
+    if stats is None:
+        return None
+    return (stats, *(_stats(str(path)) for path in extra_paths))
+
+
+class FrameCache:
+    """
+    Parsed deck files, shared by every card store in the process.
+
+    Entries are validated against the file's size and mtime on every lookup
+    (and those of any extra files its frame was built from, such as a
+    journal), so a file changed by anything else is parsed again. Stores
+    write through: after saving a file they put their frame back, keyed on
+    the new stats.
+    The least recently used frames are evicted once the cache holds more than
+    max_bytes; a frame bigger than that on its own is not cached.
+
+    Cached frames are shared. Callers change one only while holding the
+    file's lock, and discard() it if the change does not reach the disk.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[tuple, pd.DataFrame, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_locks: Dict[str, threading.RLock] = {}
+
+    def lock(self, csv_path: Path) -> threading.RLock:
+        """Return the lock serializing changes to a file across the process"""
+        with self._lock:
+            return self._file_locks.setdefault(str(csv_path), threading.RLock())
+
+    def get(self, csv_path: Path, loader: Callable[[Path], pd.DataFrame] = read_deck_frame,
+            extra_paths: Sequence[Path] = ()) -> pd.DataFrame:
+        """
+        Return the parsed file, parsing it with loader if it is not cached or changed.
+
+        Args:
+            csv_path: Path to the CSV file
+            loader: Function parsing the file
+            extra_paths: Other files read by loader
+
+        Returns:
+            Parsed file
+        """
+        key = str(csv_path)
+        signature = _signature(key, extra_paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and signature is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Stats taken before parsing: a change made meanwhile fails the next lookup
+        df = loader(csv_path)
+        if signature is not None:
+            self._store(key, signature, df)
+        return df
+
+    def put(self, csv_path: Path, df: pd.DataFrame, extra_paths: Sequence[Path] = ()) -> None:
+        """Cache a frame just written to a file"""
+        key = str(csv_path)
+        signature = _signature(key, extra_paths)
+        if signature is None:
+            self.discard(csv_path)
+        else:
+            self._store(key, signature, df)
+
+    def _store(self, key: str, signature: tuple, df: pd.DataFrame) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+        if previous is not None and len(previous[1]):
+            # Measuring string columns walks every cell; scale the last measurement instead
+            nbytes = previous[2] * len(df) // len(previous[1])
+        else:
+            nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (signature, df, nbytes)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def discard(self, csv_path: Path) -> None:
+        """Drop a file from the cache"""
+        with self._lock:
+            entry = self._entries.pop(str(csv_path), None)
+            if entry is not None:
+                self.size -= entry[2]
+
+    def clear(self) -> None:
+        """Drop every cached frame"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_frame_cache: Optional[FrameCache] = None
+_frame_cache_lock = threading.Lock()
+
+
+def get_frame_cache() -> FrameCache:
+    """Return the process-wide frame cache, sized by settings.CARD_CACHE_BYTES"""
+    global _frame_cache
+    with _frame_cache_lock:
+        if _frame_cache is None:
+            _frame_cache = FrameCache(settings.CARD_CACHE_BYTES)
+        return _frame_cache
@@ -42,7 +42,7 @@ class ImportService:
 
     def __init__(self):
         self.deck_service = DeckService()
-        self.card_service = CardService()
+        self.card_service = CardService(self.deck_service)
 
     def import_from_csv(
         self,
@@ -6,6 +6,8 @@ from pathlib import Path
 
 from app.services.card_service import CardService
 from app.models.card import CardCreate, CardUpdate
+from app.services.card_store import CardStore, CsvCardStore, JournaledCsvCardStore, SqliteCardStore, card_ids_path
+from app.services.frame_cache import FrameCache, read_deck_frame
 
 
 @pytest.fixture
@@ -21,6 +23,7 @@ def card_service(temp_csv_dir, monkeypatch):
     """Create a card service instance with mocked paths"""
     from app.core.config import settings
     monkeypatch.setattr(settings, "CSV_DIR", temp_csv_dir)
+    monkeypatch.setattr(settings, "APKG_DIR", temp_csv_dir.parent / "apkg")
     return CardService()
 
 
@@ -199,3 +202,293 @@ class TestDuplicatePrevention:
         # Verify last update was applied
         cards = card_service.list_cards(sample_deck)
         assert cards[0].fields['English'] == 'update_4'
+
+
+@pytest.fixture
+def sqlite_card_service(card_service, tmp_path):
+    """Create a card service keeping cards in SQLite, exporting to CSV only on flush"""
+    store = SqliteCardStore(tmp_path / "cards.db", card_service.deck_service._get_csv_path, export_delay=None)
+    return CardService(card_service.deck_service, store=store)
+
+
+class TestSqliteCardStore:
+    """Tests for the SQLite card storage backend"""
+
+    def test_crud_matches_csv_storage(self, sqlite_card_service, sample_deck):
+        """Test that the SQLite store returns the same cards as the CSV store"""
+        service = sqlite_card_service
+        assert [c.fields for c in service.list_cards(sample_deck)] == \
+            [c.fields for c in CardService(service.deck_service).list_cards(sample_deck)]
+
+        card = service.create_card(sample_deck, CardCreate(fields={'English': 'please'}))
+        assert card.id == 3
+        assert card.fields['Spanish'] == ''
+
+        updated = service.update_card(sample_deck, 1, CardUpdate(fields={'English': 'bye'}))
+        assert updated.fields == {'English': 'bye', 'Spanish': 'adiós', 'Example': 'Adiós, hasta luego.', 'Notes': 'farewell'}
+        assert service.update_card(sample_deck, 999, CardUpdate(fields={'English': 'x'})) is None
+        assert service.delete_card(sample_deck, 999) is False
+
+    def test_card_ids_are_stable(self, sqlite_card_service, sample_deck):
+        """Test that deleting a card does not renumber the others or reuse its ID"""
+        service = sqlite_card_service
+        assert service.delete_card(sample_deck, 0) is True
+
+        cards = service.list_cards(sample_deck)
+        assert [c.id for c in cards] == [1, 2]
+        assert service.get_card(sample_deck, 2).fields['English'] == 'thanks'
+        assert service.get_card(sample_deck, 0) is None
+
+        card = service.create_card(sample_deck, CardCreate(fields={'English': 'please'}))
+        assert card.id == 3
+
+    def test_edits_reach_csv_on_flush(self, sqlite_card_service, sample_deck, temp_csv_dir):
+        """Test that edits are exported to the deck CSV, and only when flushed"""
+        service = sqlite_card_service
+        csv_path = temp_csv_dir / f"{sample_deck}.csv"
+        service.update_card(sample_deck, 0, CardUpdate(fields={'English': 'hi'}))
+        service.delete_card(sample_deck, 2)
+
+        assert pd.read_csv(csv_path)['English'].tolist() == ['hello', 'goodbye', 'thanks']
+
+        service.store.flush()
+        df = pd.read_csv(csv_path)
+        assert df['English'].tolist() == ['hi', 'goodbye']
+        assert list(df.columns) == ['English', 'Spanish', 'Example', 'Notes']
+
+    def test_external_csv_edit_is_imported(self, sqlite_card_service, sample_deck, temp_csv_dir):
+        """Test that a CSV file replaced outside the store is imported again"""
+        service = sqlite_card_service
+        assert len(service.list_cards(sample_deck)) == 3
+
+        pd.DataFrame({'English': ['one'], 'Spanish': ['uno'], 'Example': [''], 'Notes': ['']}).to_csv(
+            temp_csv_dir / f"{sample_deck}.csv", index=False
+        )
+
+        cards = service.list_cards(sample_deck)
+        assert [c.fields['English'] for c in cards] == ['one']
+
+    def test_transaction_rolls_back_batch(self, sqlite_card_service, sample_deck):
+        """Test that a failed transaction leaves no partial edits behind"""
+        store = sqlite_card_service.store
+        with pytest.raises(RuntimeError):
+            with store.transaction(sample_deck):
+                store.create_cards(sample_deck, [{'English': 'yes'}, {'English': 'no'}])
+                store.delete_card(sample_deck, 0)
+                raise RuntimeError("abort")
+
+        cards = sqlite_card_service.list_cards(sample_deck)
+        assert [c.fields['English'] for c in cards] == ['hello', 'goodbye', 'thanks']
+
+    def test_edits_survive_reopening(self, sqlite_card_service, sample_deck, tmp_path):
+        """Test that unexported edits and ID assignment persist in the database"""
+        service = sqlite_card_service
+        service.delete_card(sample_deck, 0)
+
+        reopened = SqliteCardStore(tmp_path / "cards.db", service.deck_service._get_csv_path, export_delay=None)
+        assert [card_id for card_id, _ in reopened.list_cards(sample_deck)] == [1, 2]
+        assert reopened.create_cards(sample_deck, [{'English': 'please'}])[0][0] == 3
+
+
+@pytest.fixture
+def cached_card_service(card_service):
+    """Create a card service with its own frame cache"""
+    store = CsvCardStore(card_service.deck_service._get_csv_path, cache=FrameCache(1 << 20))
+    return CardService(card_service.deck_service, store=store)
+
+
+class TestFrameCache:
+    """Tests for the cache of parsed deck files"""
+
+    def test_reads_after_write_skip_parsing(self, cached_card_service, sample_deck, temp_csv_dir):
+        """Test that a write keeps the deck cached and reaches the file"""
+        service = cached_card_service
+        cache = service.store.cache
+        service.update_card(sample_deck, 0, CardUpdate(fields={'English': 'hi'}))
+        assert cache.misses == 1
+
+        assert service.get_card(sample_deck, 0).fields['English'] == 'hi'
+        assert len(service.list_cards(sample_deck)) == 3
+        assert cache.misses == 1
+        assert cache.hits == 2
+        assert pd.read_csv(temp_csv_dir / f"{sample_deck}.csv")['English'][0] == 'hi'
+
+    def test_external_change_is_reparsed(self, cached_card_service, sample_deck, temp_csv_dir):
+        """Test that a cached deck changed on disk is parsed again"""
+        service = cached_card_service
+        assert len(service.list_cards(sample_deck)) == 3
+
+        pd.DataFrame({'English': ['one'], 'Spanish': ['uno']}).to_csv(
+            temp_csv_dir / f"{sample_deck}.csv", index=False
+        )
+
+        assert [c.fields['English'] for c in service.list_cards(sample_deck)] == ['one']
+        assert service.store.cache.misses == 2
+
+    def test_least_recently_used_deck_is_evicted(self, temp_csv_dir):
+        """Test that the cache stays within its memory budget"""
+        paths = []
+        for i in range(3):
+            path = temp_csv_dir / f"deck_{i}.csv"
+            pd.DataFrame({'Front': [f'front {j}' for j in range(50)], 'Back': ['back'] * 50}).to_csv(path, index=False)
+            paths.append(path)
+
+        deck_bytes = int(read_deck_frame(paths[0]).memory_usage(index=True, deep=True).sum())
+        cache = FrameCache(2 * deck_bytes)
+        for path in [paths[0], paths[1], paths[0], paths[2]]:
+            cache.get(path)
+
+        assert len(cache) == 2
+        assert cache.size <= cache.max_bytes
+        cache.get(paths[0])
+        cache.get(paths[1])
+        assert cache.hits == 2  # deck_0 again, then deck_1 was evicted
+        assert cache.misses == 4
+
+    def test_failed_change_is_not_cached(self, cached_card_service, sample_deck):
+        """Test that a change that never reached the file is dropped from the cache"""
+        store = cached_card_service.store
+        with pytest.raises(RuntimeError):
+            with store.transaction(sample_deck):
+                store.update_card(sample_deck, 0, {'English': 'lost'})
+                raise RuntimeError("abort")
+
+        assert cached_card_service.get_card(sample_deck, 0).fields['English'] == 'hello'
+
+
+@pytest.fixture
+def journaled_store(card_service):
+    """Create a journaled CSV store that compacts only on flush"""
+    return JournaledCsvCardStore(card_service.deck_service._get_csv_path, cache=FrameCache(1 << 20), compact_delay=None)
+
+
+class TestJournaledCardStore:
+    """Tests for the journaled CSV storage backend"""
+
+    def test_edits_write_only_the_change(self, journaled_store, sample_deck, temp_csv_dir):
+        """Test that appends go to the CSV file and updates and deletes to the journal"""
+        store = journaled_store
+        csv_path = temp_csv_dir / f"{sample_deck}.csv"
+        original = csv_path.read_bytes()
+
+        store.create_cards(sample_deck, [{'English': 'please', 'Spanish': 'por favor'}])
+        assert csv_path.read_bytes().startswith(original)
+        assert csv_path.read_bytes().endswith(b'please,por favor,,\n')
+        assert not store.journal_path(csv_path).exists()
+
+        store.update_card(sample_deck, 1, {'English': 'bye'})
+        store.delete_card(sample_deck, 0)
+        assert len(store.journal_path(csv_path).read_text().splitlines()) == 3
+
+        expected = ['bye', 'thanks', 'please']
+        assert [fields['English'] for _, fields in store.list_cards(sample_deck)] == expected
+        replayed = JournaledCsvCardStore(store.csv_path, cache=FrameCache(1 << 20), compact_delay=None)
+        assert [fields['English'] for _, fields in replayed.list_cards(sample_deck)] == expected
+
+    def test_flush_compacts_journal(self, journaled_store, sample_deck, temp_csv_dir):
+        """Test that compaction folds the journal into a clean CSV file"""
+        store = journaled_store
+        csv_path = temp_csv_dir / f"{sample_deck}.csv"
+        store.delete_card(sample_deck, 1)
+        store.update_card(sample_deck, 2, {'Notes': 'thankful'})
+
+        store.flush()
+
+        assert not store.journal_path(csv_path).exists()
+        df = pd.read_csv(csv_path)
+        assert df['English'].tolist() == ['hello', 'thanks']
+        assert df['Notes'].tolist() == ['greeting', 'thankful']
+
+    def test_stale_journal_is_ignored(self, journaled_store, sample_deck, temp_csv_dir):
+        """Test that a journal left behind by an interrupted compaction is not applied twice"""
+        store = journaled_store
+        journal_path = store.journal_path(temp_csv_dir / f"{sample_deck}.csv")
+        store.delete_card(sample_deck, 0)
+        leftover = journal_path.read_bytes()
+
+        store.flush()
+        journal_path.write_bytes(leftover)
+
+        fresh = JournaledCsvCardStore(store.csv_path, cache=FrameCache(1 << 20), compact_delay=None)
+        assert [fields['English'] for _, fields in fresh.list_cards(sample_deck)] == ['goodbye', 'thanks']
+        assert fresh.delete_card(sample_deck, 0) is False
+        fresh.delete_card(sample_deck, 1)
+        assert fresh.list_cards(sample_deck) == [(2, fresh.get_card(sample_deck, 2))]
+
+    def test_matches_full_rewrites(self, journaled_store, card_service, sample_deck, temp_csv_dir):
+        """Test that journaled edits give the same deck as rewriting the file on every edit"""
+        pd.read_csv(temp_csv_dir / f"{sample_deck}.csv").to_csv(temp_csv_dir / "copy.csv", index=False)
+        plain = card_service.store
+
+        for store, deck_id in [(journaled_store, sample_deck), (plain, "copy")]:
+            with store.transaction(deck_id):
+                store.create_cards(deck_id, [{'English': 'yes'}, {'English': 'no'}])
+                store.delete_card(deck_id, 3)
+            store.update_card(deck_id, 3, {'Spanish': 'no'})
+            store.delete_card(deck_id, 0)
+            store.create_cards(deck_id, [{'English': 'new', 'Level': 'A1'}])
+            store.update_card(deck_id, 0, {'English': 'farewell'})
+
+        assert journaled_store.list_cards(sample_deck) == plain.list_cards("copy")
+        journaled_store.flush()
+        assert (temp_csv_dir / f"{sample_deck}.csv").read_text() == (temp_csv_dir / "copy.csv").read_text()
+
+
+class TestStableCardIds:
+    """Tests for card IDs persisted with the deck"""
+
+    def test_delete_does_not_renumber_cards(self, card_service, sample_deck):
+        """Test that card IDs survive deleting other cards and reloading the deck"""
+        assert card_service.delete_card(sample_deck, 0) is True
+
+        assert [c.id for c in card_service.list_cards(sample_deck)] == [1, 2]
+        assert card_service.get_card(sample_deck, 1).fields['English'] == 'goodbye'
+        assert card_service.get_card(sample_deck, 0) is None
+        assert card_service.update_card(sample_deck, 0, CardUpdate(fields={'English': 'x'})) is None
+        assert card_service.create_card(sample_deck, CardCreate(fields={'English': 'please'})).id == 3
+
+        reloaded = CsvCardStore(card_service.deck_service._get_csv_path, cache=FrameCache(1 << 20))
+        assert [card_id for card_id, _ in reloaded.list_cards(sample_deck)] == [1, 2, 3]
+
+    def test_ids_are_stored_only_when_needed(self, card_service, sample_deck, temp_csv_dir):
+        """Test that decks numbered from 0 need no ID file, and rows added outside get new IDs"""
+        csv_path = temp_csv_dir / f"{sample_deck}.csv"
+        card_service.create_card(sample_deck, CardCreate(fields={'English': 'please'}))
+        assert not card_ids_path(csv_path).exists()
+
+        card_service.delete_card(sample_deck, 1)
+        assert card_ids_path(csv_path).exists()
+
+        with open(csv_path, 'a') as f:
+            f.write('yes,sí,,\n')
+        assert [c.id for c in card_service.list_cards(sample_deck)] == [0, 2, 3, 4]
+
+        card_service.deck_service.delete_deck(sample_deck)
+        assert not card_ids_path(csv_path).exists()
+
+    def test_ids_are_shared_between_stores(self, card_service, sqlite_card_service, sample_deck):
+        """Test that the SQLite store imports and exports the IDs stored with the deck"""
+        card_service.delete_card(sample_deck, 1)
+        assert [c.id for c in sqlite_card_service.list_cards(sample_deck)] == [0, 2]
+
+        sqlite_card_service.delete_card(sample_deck, 0)
+        sqlite_card_service.create_card(sample_deck, CardCreate(fields={'English': 'please'}))
+        sqlite_card_service.store.flush()
+        assert [(c.id, c.fields['English']) for c in card_service.list_cards(sample_deck)] == [(2, 'thanks'), (3, 'please')]
+
+
+class TestCardStoreWrites:
+    """Tests for the card store interface and how CSV files are written"""
+
+    def test_interface_cannot_be_instantiated(self):
+        """Test that the interface only serves as a base for backends"""
+        with pytest.raises(TypeError):
+            CardStore()
+
+    def test_rewrite_is_atomic_and_keeps_empty_fields(self, card_service, sample_deck, temp_csv_dir):
+        """Test that a rewritten deck leaves no temporary file and writes missing fields as empty cells"""
+        card_service.create_card(sample_deck, CardCreate(fields={'English': 'please'}))
+
+        assert [path.name for path in temp_csv_dir.iterdir()] == [f"{sample_deck}.csv"]
+        with open(temp_csv_dir / f"{sample_deck}.csv") as f:
+            assert f.read().splitlines()[-1] == 'please,,,'
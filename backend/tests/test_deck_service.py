@@ -0,0 +1,223 @@
+"""Tests for the deck service - metadata loading and APKG generation"""
+
+import json
+import os
+import sqlite3
+import zipfile
+import pytest
+import pandas as pd
+from unittest.mock import patch
+
+from app.services.deck_service import DeckService
+from app.services.deck_index import DeckIndex
+from anki_deck_generator import ids, source
+
+
+@pytest.fixture
+def temp_dirs(tmp_path):
+    """Create temporary CSV and APKG directories for tests"""
+    csv_dir = tmp_path / "csv"
+    apkg_dir = tmp_path / "apkg"
+    csv_dir.mkdir()
+    apkg_dir.mkdir()
+    return csv_dir, apkg_dir
+
+
+@pytest.fixture
+def deck_service(temp_dirs, monkeypatch):
+    """Create a deck service instance with mocked paths"""
+    from app.core.config import settings
+    csv_dir, apkg_dir = temp_dirs
+    monkeypatch.setattr(settings, "CSV_DIR", csv_dir)
+    monkeypatch.setattr(settings, "APKG_DIR", apkg_dir)
+    # Keep the deck and model IDs assigned by the tests out of the project's registry
+    monkeypatch.setattr(ids, "_default_registry", ids.IdRegistry(apkg_dir.parent / "id_registry.json"))
+    return DeckService()
+
+
+@pytest.fixture
+def sample_deck(temp_dirs):
+    """Create a sample deck CSV for testing"""
+    csv_dir, _ = temp_dirs
+    deck_id = "spanish_numbers"
+    df = pd.DataFrame({
+        'English': ['one', 'two', 'three'],
+        'Spanish': ['uno', 'dos', 'tres'],
+        'Number': ['1', '2', '3'],
+    })
+    df.to_csv(csv_dir / f"{deck_id}.csv", index=False)
+    return deck_id
+
+
+class TestDeckMetadata:
+    """Tests for loading deck metadata"""
+
+    def test_metadata_counts_rows_and_detects_language(self, deck_service, sample_deck):
+        """Test that metadata reflects the CSV contents"""
+        deck = deck_service.get_deck(sample_deck)
+
+        assert deck is not None
+        assert deck.card_count == 3
+        assert deck.language == 'spanish'
+        assert deck.card_type == 'basic'
+
+    def test_missing_deck_returns_none(self, deck_service):
+        """Test that a missing CSV yields no metadata"""
+        assert deck_service.get_deck("does_not_exist") is None
+
+
+class TestGenerateApkg:
+    """Tests for APKG generation"""
+
+    def test_generate_apkg_writes_package(self, deck_service, sample_deck, temp_dirs):
+        """Test that generating a deck produces an APKG file"""
+        _, apkg_dir = temp_dirs
+
+        deck = deck_service.generate_apkg(sample_deck)
+
+        assert deck is not None
+        assert (apkg_dir / f"{sample_deck}.apkg").exists()
+        assert deck.apkg_path is not None
+
+    def test_generate_apkg_keeps_tags_out_of_the_fields(self, deck_service, temp_dirs, tmp_path):
+        """Test that a Tags column tags the notes but is neither a note field nor scanned as note text"""
+        csv_dir, apkg_dir = temp_dirs
+        pd.DataFrame({
+            'English': ['one', 'two'],
+            'Spanish': ['uno', 'dos'],
+            'Tags': ['numbers futuro', ''],
+        }).to_csv(csv_dir / "tagged.csv", index=False)
+
+        deck_service.generate_apkg("tagged")
+
+        db_path = tmp_path / "collection.anki2"
+        with zipfile.ZipFile(apkg_dir / "tagged.apkg") as package:
+            db_path.write_bytes(package.read('collection.anki2'))
+        conn = sqlite3.connect(db_path)
+        notes = conn.execute('SELECT flds, tags FROM notes ORDER BY id').fetchall()
+        conn.close()
+
+        assert [flds.split('\x1f') for flds, _ in notes] == [['one', 'uno'], ['two', 'dos']]
+        assert {'numbers', 'futuro'} <= set(notes[0][1].split())
+        # 'futuro' in the note text would add the 'future' content tag
+        assert 'future' not in notes[0][1].split()
+
+    def test_generate_apkg_parses_csv_once(self, deck_service, sample_deck):
+        """Test that metadata, generator setup and note building share one parse"""
+        with patch('anki_deck_generator.source._open_csv', wraps=source._open_csv) as open_csv, \
+                patch('pandas.read_csv', wraps=pd.read_csv) as read_csv:
+            deck_service.generate_apkg(sample_deck)
+
+        # A small deck is parsed with the csv module alone
+        assert open_csv.call_count == 1
+        assert read_csv.call_count == 0
+
+    def test_generate_apkg_parses_large_csv_once_with_pandas(self, deck_service, sample_deck, monkeypatch):
+        """Test that decks above the small-deck size are parsed once by pandas"""
+        monkeypatch.setattr(source, 'SMALL_DECK_BYTES', 0)
+        with patch('pandas.read_csv', wraps=pd.read_csv) as read_csv:
+            deck = deck_service.generate_apkg(sample_deck)
+
+        assert read_csv.call_count == 1
+        assert deck.card_count == 3
+
+
+class TestConfigReload:
+    """Tests for picking up configuration changes without a restart"""
+
+    def test_config_edits_are_seen_by_existing_service(self, deck_service, tmp_path, monkeypatch):
+        """Test that an edited config.json reaches an already-constructed service"""
+        from anki_deck_generator import config as generator_config
+
+        config_file = tmp_path / "config.json"
+        monkeypatch.setattr(generator_config, "_config_cache", generator_config.ConfigCache(config_file))
+
+        assert deck_service.config['custom_tags'] == {}
+        first = deck_service.config
+        assert deck_service.config is first
+
+        edited = first.thaw()
+        edited['custom_tags'] = {'spanish': ['edited']}
+        config_file.write_text(json.dumps(edited))
+        os.utime(config_file, ns=(0, 0))
+
+        assert deck_service.config['custom_tags'] == {'spanish': ('edited',)}
+
+    def test_config_snapshot_is_read_only(self, deck_service):
+        """Test that callers cannot modify the shared snapshot"""
+        with pytest.raises(TypeError):
+            deck_service.config['css'] = ''
+
+
+class TestDeckIndex:
+    """Tests for the persistent deck metadata index"""
+
+    def test_list_decks_only_probes_changed_files(self, deck_service, sample_deck, temp_dirs):
+        """Test that unchanged decks are served from the index"""
+        csv_dir, _ = temp_dirs
+        pd.DataFrame({'Text': ['{{c1::uno}}'], 'Translation': ['one']}).to_csv(csv_dir / "cloze_deck.csv", index=False)
+
+        assert {deck.id for deck in deck_service.list_decks()} == {sample_deck, 'cloze_deck'}
+
+        with patch.object(DeckIndex, '_probe', autospec=True, side_effect=DeckIndex._probe) as probe:
+            deck_service.list_decks()
+            assert probe.call_count == 0
+
+            with open(csv_dir / f"{sample_deck}.csv", 'a') as f:
+                f.write("four,cuatro,4\n")
+            decks = {deck.id: deck for deck in deck_service.list_decks()}
+            assert probe.call_count == 1
+
+        assert decks[sample_deck].card_count == 4
+        assert decks['cloze_deck'].card_type == 'cloze'
+
+    def test_index_is_reused_by_a_new_process(self, deck_service, sample_deck, monkeypatch):
+        """Test that the index file spares a restarted service from probing"""
+        deck_service.list_decks()
+
+        from app.services import deck_index
+        monkeypatch.setattr(deck_index, "_indexes", {})
+
+        with patch.object(DeckIndex, '_probe', autospec=True, side_effect=DeckIndex._probe) as probe:
+            decks = DeckService().list_decks()
+
+        assert probe.call_count == 0
+        assert decks[0].card_count == 3
+
+    def test_index_tracks_apkg_files_and_deleted_decks(self, deck_service, sample_deck, temp_dirs):
+        """Test that generated packages and removed CSV files show up in the listing"""
+        csv_dir, apkg_dir = temp_dirs
+        assert deck_service.list_decks()[0].apkg_path is None
+
+        deck_service.generate_apkg(sample_deck)
+        assert deck_service.list_decks()[0].apkg_path == str(apkg_dir / f"{sample_deck}.apkg")
+
+        (csv_dir / f"{sample_deck}.csv").unlink()
+        assert deck_service.list_decks() == []
+
+    def test_index_ignores_entries_of_another_csv_dir(self, deck_service, sample_deck, temp_dirs, tmp_path):
+        """Test that CSV directories sharing an APKG directory do not read each other's entries"""
+        csv_dir, apkg_dir = temp_dirs
+        csv_path = csv_dir / f"{sample_deck}.csv"
+
+        # Same deck ID, size and mtime, but different columns
+        other_csv_dir = tmp_path / "other_csv"
+        other_csv_dir.mkdir()
+        other_path = other_csv_dir / f"{sample_deck}.csv"
+        other_path.write_text(csv_path.read_text().replace('English', 'Anglais'))
+        stats = os.stat(csv_path)
+        os.utime(other_path, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+        assert os.stat(other_path).st_size == stats.st_size
+
+        assert DeckIndex(other_csv_dir, apkg_dir).get(sample_deck)['columns'][0] == 'Anglais'
+        assert DeckIndex(csv_dir, apkg_dir).get(sample_deck)['columns'][0] == 'English'
+
+    def test_row_probe_matches_full_parse(self, temp_dirs):
+        """Test that counting lines agrees with parsing for blank lines and multi-line cells"""
+        csv_dir, _ = temp_dirs
+        csv_path = csv_dir / "tricky.csv"
+        csv_path.write_text('Front,Back\none,uno\n\n"two\nlines",dos\n  \nthree,tres\n')
+        assert source.DeckSource(str(csv_path)).count_rows() == source.DeckSource(str(csv_path)).row_count == 3
+
+        csv_path.write_text('Front,Back\none,uno\n\ntwo,dos\n')
+        assert source.DeckSource(str(csv_path)).count_rows() == source.DeckSource(str(csv_path)).row_count == 2
@@ -19,8 +19,9 @@ def temp_csv_dir(tmp_path):
 def import_service(temp_csv_dir):
     """Create an import service instance with mocked paths"""
     service = ImportService()
-    # Mock the deck_service's csv_dir to use temp directory
+    # Point the deck_service's directories at temp directories
     service.deck_service.csv_dir = temp_csv_dir
+    service.deck_service.apkg_dir = temp_csv_dir.parent / "apkg"
     return service
 
 
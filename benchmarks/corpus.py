@@ -0,0 +1,232 @@
+"""
+Deterministic synthetic deck corpus for the benchmarks.
+
+Every deck is generated from a seeded random.Random, so the same kind, size
+and seed always produce byte-identical CSV files and media, on every
+machine. Generated decks are cached in the corpus directory and only
+rebuilt when the corpus version or seed changes.
+"""
+
+import os
+import csv
+import json
+import random
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Bump when the generated content changes, so cached corpora are rebuilt
+CORPUS_VERSION = 1
+
+DEFAULT_SEED = 20240501
+
+# Default location of the generated corpus (ignored by git)
+DEFAULT_CORPUS_DIR = Path(__file__).resolve().parent / '.corpus'
+
+# Deck sizes, by label
+SIZES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Deck kinds: plain front/back, cloze deletions, media references and many columns
+KINDS = ('basic', 'cloze', 'media', 'wide')
+
+# Number of distinct media files referenced by the media decks
+MEDIA_FILE_COUNT = 200
+
+# Number of columns of the wide decks
+WIDE_COLUMNS = 20
+
+SUBJECTS = ['yo', 'tú', 'él', 'ella', 'nosotros', 'vosotros', 'ellos', 'ustedes']
+VERBS = [
+    ('hablar', 'to speak'), ('comer', 'to eat'), ('vivir', 'to live'), ('tener', 'to have'),
+    ('hacer', 'to do'), ('poder', 'to be able'), ('decir', 'to say'), ('ir', 'to go'),
+    ('ver', 'to see'), ('dar', 'to give'), ('saber', 'to know'), ('querer', 'to want'),
+    ('llegar', 'to arrive'), ('pasar', 'to pass'), ('deber', 'to owe'), ('poner', 'to put'),
+]
+NOUNS = [
+    ('la casa', 'the house'), ('el libro', 'the book'), ('la ciudad', 'the city'),
+    ('el museo', 'the museum'), ('la playa', 'the beach'), ('el mercado', 'the market'),
+    ('la escuela', 'the school'), ('el tren', 'the train'), ('la comida', 'the food'),
+    ('el trabajo', 'the work'), ('la familia', 'the family'), ('el parque', 'the park'),
+]
+# Words that trigger the per-note content tags
+MARKERS = ['presente', 'pretérito', 'futuro', 'condicional', 'voy a', 'van a', 'ser', 'estar', 'por', 'para']
+ROW_TAGS = ['', '', '', 'a1', 'a2 verbs', 'b1,review', 'irregular']
+
+
+def deck_name(kind: str, size: str) -> str:
+    """Return the base name of the CSV file for a deck kind and size."""
+    return f"bench_{kind}_{size}"
+
+
+def media_name(index: int) -> str:
+    """Return the file name of the index-th media file."""
+    return f"bench_audio_{index:03d}.mp3" if index % 2 else f"bench_image_{index:03d}.png"
+
+
+def _sentence(rng: random.Random) -> str:
+    subject = rng.choice(SUBJECTS)
+    verb, _ = rng.choice(VERBS)
+    noun, _ = rng.choice(NOUNS)
+    sentence = f"{subject.capitalize()} {verb} {noun}"
+    if rng.random() < 0.3:
+        sentence += f" ({rng.choice(MARKERS)})"
+    return sentence
+
+
+def _media_reference(rng: random.Random) -> str:
+    name = media_name(rng.randrange(MEDIA_FILE_COUNT))
+    if name.endswith('.mp3'):
+        return f"[sound:{name}]"
+    return f'<img src="{name}">'
+
+
+def iter_rows(kind: str, count: int, seed: int = DEFAULT_SEED) -> Iterator[List[str]]:
+    """
+    Generate the header and rows of a deck.
+
+    Args:
+        kind: Deck kind (one of KINDS)
+        count: Number of data rows
+        seed: Seed of the random generator
+
+    Yields:
+        The header row, then count data rows
+    """
+    rng = random.Random(f"{seed}:{kind}")
+
+    if kind == 'basic':
+        yield ['Spanish', 'English', 'Example', 'Tags']
+        for index in range(count):
+            verb, meaning = rng.choice(VERBS)
+            yield [f"{verb} {index}", meaning, _sentence(rng), rng.choice(ROW_TAGS)]
+    elif kind == 'cloze':
+        yield ['Text', 'Translation', 'Explanation']
+        for index in range(count):
+            subject = rng.choice(SUBJECTS)
+            verb, meaning = rng.choice(VERBS)
+            noun, noun_meaning = rng.choice(NOUNS)
+            yield [
+                f"{subject.capitalize()} {{{{c1::{verb}}}}} {noun} #{index}",
+                f"{subject} {meaning} {noun_meaning}",
+                f"Conjugación en {rng.choice(MARKERS)}",
+            ]
+    elif kind == 'media':
+        yield ['Spanish', 'English', 'Picture', 'Audio']
+        for index in range(count):
+            noun, meaning = rng.choice(NOUNS)
+            picture = _media_reference(rng) if rng.random() < 0.8 else ''
+            yield [f"{noun} {index}", meaning, picture, _media_reference(rng)]
+    elif kind == 'wide':
+        yield ['Spanish', 'English'] + [f"Field {number}" for number in range(3, WIDE_COLUMNS + 1)]
+        for index in range(count):
+            verb, meaning = rng.choice(VERBS)
+            yield [f"{verb} {index}", meaning] + [_sentence(rng) for _ in range(WIDE_COLUMNS - 2)]
+    else:
+        raise ValueError(f"Unknown deck kind: {kind} (expected one of {', '.join(KINDS)})")
+
+
+def write_media(media_dir: Path, seed: int = DEFAULT_SEED) -> List[Path]:
+    """
+    Write the media files referenced by the media decks.
+
+    Args:
+        media_dir: Directory to write the files to
+        seed: Seed of the random generator
+
+    Returns:
+        Paths of the media files
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    rng = random.Random(f"{seed}:media")
+    paths = []
+    for index in range(MEDIA_FILE_COUNT):
+        path = Path(media_dir) / media_name(index)
+        data = rng.randbytes(rng.randint(2_000, 20_000))
+        if not path.exists() or path.stat().st_size != len(data):
+            path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+def _write_csv(path: Path, rows: Iterable[Sequence[str]]) -> None:
+    """Write rows to a CSV file atomically."""
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def generate_corpus(
+    corpus_dir: Path = DEFAULT_CORPUS_DIR,
+    kinds: Sequence[str] = KINDS,
+    sizes: Sequence[str] = ('1k',),
+    seed: int = DEFAULT_SEED
+) -> Dict[str, Path]:
+    """
+    Generate (or reuse) the decks of a corpus.
+
+    Decks are written to corpus_dir/<size>/csv and the media files to
+    corpus_dir/media. A deck is only rewritten if it is missing or was
+    generated with another corpus version or seed.
+
+    Args:
+        corpus_dir: Root directory of the corpus
+        kinds: Deck kinds to generate
+        sizes: Size labels to generate (keys of SIZES)
+        seed: Seed of the random generator
+
+    Returns:
+        Map of deck base names to CSV paths
+    """
+    corpus_dir = Path(corpus_dir)
+    os.makedirs(corpus_dir, exist_ok=True)
+    info_path = corpus_dir / 'corpus.json'
+    try:
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        info = {}
+    if info.get('version') != CORPUS_VERSION or info.get('seed') != seed:
+        info = {'version': CORPUS_VERSION, 'seed': seed, 'decks': {}}
+
+    if 'media' in kinds:
+        write_media(corpus_dir / 'media', seed)
+
+    decks = {}
+    for size in sizes:
+        if size not in SIZES:
+            raise ValueError(f"Unknown corpus size: {size} (expected one of {', '.join(SIZES)})")
+        csv_dir = corpus_dir / size / 'csv'
+        os.makedirs(csv_dir, exist_ok=True)
+        for kind in kinds:
+            name = deck_name(kind, size)
+            path = csv_dir / f"{name}.csv"
+            if not path.exists() or name not in info['decks']:
+                print(f"Generating {name} ({SIZES[size]:,} rows)...")
+                _write_csv(path, iter_rows(kind, SIZES[size], seed))
+                info['decks'][name] = {'kind': kind, 'rows': SIZES[size], 'bytes': path.stat().st_size}
+                with open(info_path, 'w') as f:
+                    json.dump(info, f, indent=4, sort_keys=True)
+            decks[name] = path
+    return decks
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Generate the synthetic benchmark corpus')
+    parser.add_argument('--corpus-dir', type=Path, default=DEFAULT_CORPUS_DIR, help='Directory of the corpus')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k'], help='Deck sizes to generate')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS), help='Deck kinds to generate')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='Seed of the random generator')
+    args = parser.parse_args(argv)
+
+    decks = generate_corpus(args.corpus_dir, args.kinds, args.sizes, args.seed)
+    for name, path in decks.items():
+        print(f"  {name}: {path}")
+
+
+if __name__ == '__main__':
+    main()
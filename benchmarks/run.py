@@ -0,0 +1,408 @@
+"""
+Throughput benchmarks for the deck generator and the backend API.
+
+Each case runs in a fresh process, so its peak RSS is not inflated by the
+cases before it. Results are written as JSON and can be saved as a named
+baseline under benchmarks/baselines/ and compared against later runs.
+
+Usage:
+    python -m benchmarks.run                              # 1k decks, summary only
+    python -m benchmarks.run --sizes 1k 100k --output results.json
+    python -m benchmarks.run --save-baseline local        # store benchmarks/baselines/local.json
+    python -m benchmarks.run --compare local              # exit 1 if a case regressed
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import warnings
+import contextlib
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from unittest import mock
+
+from benchmarks.corpus import DEFAULT_CORPUS_DIR, KINDS, SIZES, deck_name, generate_corpus
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / 'baselines'
+
+# Bump when results stop being comparable with older result files
+RESULTS_VERSION = 1
+
+# Samples taken per case, by corpus size (overridden by --repeat)
+DEFAULT_REPEAT = {'1k': 7, '100k': 3, '1m': 1}
+
+# Requests sent per sample by the API cases
+API_REQUESTS_PER_SAMPLE = 10
+
+# The genanki export engine is too slow to be worth timing above this many rows
+GENANKI_MAX_ROWS = 100_000
+
+# Relative change of p50/p99 latency or peak RSS reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextlib.contextmanager
+def isolated_generator(workdir: Path, media_dir: Path) -> Iterator[None]:
+    """
+    Point the generator's side outputs at a scratch directory.
+
+    The history database, the ID registry and the media directory would
+    otherwise be the project's own.
+    """
+    from anki_deck_generator import auto_generator, ids
+    from anki_deck_generator.history import GenerationHistory
+
+    history = partial(GenerationHistory, workdir / 'generation_history.db', None)
+    with mock.patch.object(auto_generator, 'MEDIA_DIR', media_dir), \
+            mock.patch.object(auto_generator, 'GenerationHistory', history), \
+            mock.patch.object(ids, '_default_registry', ids.IdRegistry(workdir / 'id_registry.json')):
+        yield
+
+
+def _timed(function: Callable[[], Any]) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def bench_generate_from_csv(csv_path: Path, workdir: Path, repeat: int, **_) -> Dict[str, Any]:
+    """Time parsing a CSV file and building its notes."""
+    from anki_deck_generator.core import create_dynamic_deck_generator
+    from anki_deck_generator.source import DeckSource
+
+    samples = []
+    for _ in range(repeat):
+        generator = create_dynamic_deck_generator(str(csv_path), 'spanish')
+        field_mapping = {field['name']: field['name'] for field in generator.fields}
+        samples.append(_timed(lambda: generator.generate_from_csv(
+            str(csv_path), field_mapping, source=DeckSource(str(csv_path))
+        )))
+    return {'rows': len(generator.note_rows), 'samples': samples}
+
+
+def bench_export_to_apkg(csv_path: Path, workdir: Path, repeat: int, engine: str = 'sqlite', **_) -> Dict[str, Any]:
+    """Time writing the notes of a CSV file to an APKG file."""
+    from anki_deck_generator.core import create_dynamic_deck_generator
+
+    generator = create_dynamic_deck_generator(str(csv_path), 'spanish')
+    generator.generate_from_csv(str(csv_path), {field['name']: field['name'] for field in generator.fields})
+    output_path = workdir / f"{csv_path.stem}.apkg"
+    samples = [_timed(lambda: generator.export_to_apkg(str(output_path), engine=engine)) for _ in range(repeat)]
+    return {'rows': len(generator.note_rows), 'samples': samples}
+
+
+def bench_process_media_files(csv_path: Path, workdir: Path, repeat: int, **_) -> Dict[str, Any]:
+    """Time finding and resolving the media files referenced by a CSV file."""
+    from anki_deck_generator.auto_generator import process_media_files
+    from anki_deck_generator.core import create_dynamic_deck_generator
+    from anki_deck_generator.source import DeckSource
+
+    generator = create_dynamic_deck_generator(str(csv_path), 'spanish')
+    samples = []
+    for _ in range(repeat):
+        samples.append(_timed(lambda: process_media_files(
+            str(csv_path), generator, source=DeckSource(str(csv_path))
+        )))
+    return {'rows': DeckSource(str(csv_path)).row_count, 'samples': samples}
+
+
+def bench_generate_decks_from_directory(csv_dir: Path, workdir: Path, repeat: int, **_) -> Dict[str, Any]:
+    """Time a full forced build of every deck in a directory."""
+    from anki_deck_generator.auto_generator import generate_decks_from_directory
+    from anki_deck_generator.source import DeckSource
+
+    output_dir = workdir / 'apkg'
+    samples = [
+        _timed(lambda: generate_decks_from_directory(
+            csv_dir=csv_dir, output_dir=output_dir, language='spanish', force=True, engine='sqlite'
+        ))
+        for _ in range(repeat)
+    ]
+    rows = sum(DeckSource(str(path)).row_count for path in csv_dir.glob('*.csv'))
+    return {'rows': rows, 'samples': samples}
+
+
+def bench_api(csv_dir: Path, workdir: Path, repeat: int, method: str = 'GET', path: str = '/', rows: int = 1, **_) -> Dict[str, Any]:
+    """Time requests to one API endpoint, one sample per request."""
+    # The backend reads its directories from the environment when imported
+    os.environ['CSV_DIR'] = str(csv_dir)
+    os.environ['APKG_DIR'] = str(workdir / 'apkg')
+    os.makedirs(workdir / 'apkg', exist_ok=True)
+    sys.path.insert(0, str(ROOT_DIR / 'backend'))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+    client = TestClient(app)
+    response = client.request(method, path)  # Warm up
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+
+    samples = []
+    for _ in range(repeat * API_REQUESTS_PER_SAMPLE):
+        started = time.perf_counter()
+        client.request(method, path)
+        samples.append(time.perf_counter() - started)
+    return {'rows': rows, 'samples': samples}
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'generate_from_csv': bench_generate_from_csv,
+    'export_to_apkg': bench_export_to_apkg,
+    'process_media_files': bench_process_media_files,
+    'generate_decks_from_directory': bench_generate_decks_from_directory,
+    'api': bench_api,
+}
+
+
+def plan_cases(sizes: Sequence[str], kinds: Sequence[str], benchmarks: Sequence[str], corpus_dir: Path) -> List[Dict[str, Any]]:
+    """
+    List the cases to run.
+
+    Args:
+        sizes: Corpus sizes
+        kinds: Deck kinds
+        benchmarks: Names of the benchmarks to include
+        corpus_dir: Root directory of the corpus
+
+    Returns:
+        Case descriptions with a unique id, the benchmark name and its arguments
+    """
+    cases = []
+    for size in sizes:
+        csv_dir = corpus_dir / size / 'csv'
+        rows = SIZES[size]
+        for kind in kinds:
+            name = deck_name(kind, size)
+            csv_path = csv_dir / f"{name}.csv"
+            if 'generate_from_csv' in benchmarks:
+                cases.append({'id': f"generate_from_csv[{name}]", 'benchmark': 'generate_from_csv',
+                              'size': size, 'args': {'csv_path': csv_path}})
+            if 'export_to_apkg' in benchmarks:
+                for engine in ('sqlite', 'genanki'):
+                    if engine == 'genanki' and rows > GENANKI_MAX_ROWS:
+                        continue
+                    cases.append({'id': f"export_to_apkg:{engine}[{name}]", 'benchmark': 'export_to_apkg',
+                                  'size': size, 'args': {'csv_path': csv_path, 'engine': engine}})
+            if 'process_media_files' in benchmarks:
+                cases.append({'id': f"process_media_files[{name}]", 'benchmark': 'process_media_files',
+                              'size': size, 'args': {'csv_path': csv_path}})
+
+        if 'generate_decks_from_directory' in benchmarks:
+            cases.append({'id': f"generate_decks_from_directory[{size}]", 'benchmark': 'generate_decks_from_directory',
+                          'size': size, 'args': {'csv_dir': csv_dir}})
+
+        if 'api' in benchmarks:
+            deck_id = deck_name(kinds[0], size)
+            endpoints = [
+                ('GET', '/api/v1/decks', len(kinds)),
+                ('GET', f"/api/v1/decks/{deck_id}", rows),
+                ('GET', f"/api/v1/cards/{deck_id}/cards", rows),
+                ('POST', f"/api/v1/decks/{deck_id}/generate", rows),
+            ]
+            for method, path, endpoint_rows in endpoints:
+                cases.append({'id': f"api:{method} {path}[{size}]", 'benchmark': 'api', 'size': size,
+                              'args': {'csv_dir': csv_dir, 'method': method, 'path': path, 'rows': endpoint_rows}})
+    return cases
+
+
+def run_case(case: Dict[str, Any], repeat: int, media_dir: Path) -> Dict[str, Any]:
+    """
+    Run one case and summarize its samples (called in a fresh worker process).
+
+    Args:
+        case: Case description from plan_cases
+        repeat: Number of samples to take
+        media_dir: Media directory of the corpus
+
+    Returns:
+        Rows, latency percentiles, throughput and peak RSS of the case
+    """
+    with tempfile.TemporaryDirectory(prefix='anki-bench-') as tmp:
+        workdir = Path(tmp)
+        with isolated_generator(workdir, media_dir), contextlib.redirect_stdout(io.StringIO()):
+            measured = BENCHMARKS[case['benchmark']](workdir=workdir, repeat=repeat, **case['args'])
+
+    samples = measured['samples']
+    p50 = percentile(samples, 0.50)
+    return {
+        'benchmark': case['benchmark'],
+        'size': case['size'],
+        'rows': measured['rows'],
+        'samples': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+        'p50_ms': round(p50 * 1000, 3),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+        'rows_per_s': round(measured['rows'] / p50, 1) if p50 > 0 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(cases: List[Dict[str, Any]], repeat: Optional[int], corpus_dir: Path) -> Dict[str, Any]:
+    """
+    Run every case in its own process and collect the results.
+
+    Args:
+        cases: Cases from plan_cases
+        repeat: Samples per case (defaults to DEFAULT_REPEAT for the case's size)
+        corpus_dir: Root directory of the corpus
+
+    Returns:
+        The results document
+    """
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        print(f"Running {case['id']}...", flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            future = executor.submit(run_case, case, repeat or DEFAULT_REPEAT[case['size']], corpus_dir / 'media')
+            try:
+                results[case['id']] = future.result()
+            except Exception as e:
+                print(f"Error running {case['id']}: {e}")
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def print_summary(document: Dict[str, Any]) -> None:
+    """Print one line per case."""
+    print(f"\n{'Case':<62} {'Rows':>9} {'p50 ms':>10} {'p99 ms':>10} {'Rows/s':>12} {'RSS MB':>8}")
+    for case_id, result in document['results'].items():
+        rows_per_s = f"{result['rows_per_s']:,.0f}" if result['rows_per_s'] else '-'
+        print(
+            f"{case_id:<62} {result['rows']:>9,} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+            f"{rows_per_s:>12} {result['peak_rss_mb']:>8.1f}"
+        )
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD
+) -> List[Tuple[str, str, float, float, float]]:
+    """
+    Compare two results documents case by case.
+
+    Args:
+        baseline: Results to compare against
+        current: New results
+        threshold: Relative increase of latency or peak RSS counted as a regression
+
+    Returns:
+        (case, metric, baseline value, current value, relative change) for
+        every metric that got worse by more than the threshold
+    """
+    regressions = []
+    print(f"\n{'Case':<62} {'p50 ms':>21} {'p99 ms':>21} {'RSS MB':>17}")
+    for case_id, result in current['results'].items():
+        old = baseline['results'].get(case_id)
+        if old is None:
+            continue
+        columns = []
+        for metric in ('p50_ms', 'p99_ms', 'peak_rss_mb'):
+            change = (result[metric] - old[metric]) / old[metric] if old[metric] else 0.0
+            columns.append(f"{old[metric]:.1f} -> {result[metric]:.1f} ({change:+.0%})")
+            if change > threshold:
+                regressions.append((case_id, metric, old[metric], result[metric], change))
+        print(f"{case_id:<62} {columns[0]:>21} {columns[1]:>21} {columns[2]:>17}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark deck generation and the backend API')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['1k'], help='Corpus sizes to benchmark')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS), help='Deck kinds to benchmark')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='Benchmarks to run')
+    parser.add_argument('--repeat', type=int, help='Samples per case (default depends on the corpus size)')
+    parser.add_argument('--corpus-dir', type=Path, default=DEFAULT_CORPUS_DIR, help='Directory of the synthetic corpus')
+    parser.add_argument('--output', type=Path, help='Write the results JSON to this file')
+    parser.add_argument('--save-baseline', metavar='NAME', help='Save the results as benchmarks/baselines/NAME.json')
+    parser.add_argument('--compare', metavar='NAME_OR_PATH', help='Compare the results against a saved baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative slowdown or memory growth reported as a regression (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    generate_corpus(args.corpus_dir, args.kinds, args.sizes)
+    cases = plan_cases(args.sizes, args.kinds, args.benchmarks, args.corpus_dir)
+    document = run_benchmarks(cases, args.repeat, args.corpus_dir)
+    print_summary(document)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=4)
+        print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        with open(path, 'w') as f:
+            json.dump(document, f, indent=4)
+        print(f"\nBaseline saved to {path}")
+
+    if args.compare:
+        path = Path(args.compare)
+        if not path.exists():
+            path = BASELINE_DIR / f"{args.compare}.json"
+        with open(path, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, document, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+            for case_id, metric, old, new, change in regressions:
+                print(f"  - {case_id} {metric}: {old} -> {new} ({change:+.0%})")
+            return 1
+        print("\n✅ No regressions")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Shared fixtures for the deck generator tests"""
+
+import os
+import sys
+import csv
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Sequence
+
+import pytest
+
+# Add the project directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anki_deck_generator import auto_generator, ids  # noqa: E402
+from anki_deck_generator.history import GenerationHistory  # noqa: E402
+
+
+def write_csv(path: Path, header: Sequence[str], rows: List[Sequence[str]]) -> Path:
+    """Write a deck CSV file"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch) -> SimpleNamespace:
+    """
+    Point the generator's directories and side outputs at a scratch project.
+
+    The history database, the ID registry and the media directory would
+    otherwise be the project's own.
+    """
+    dirs: Dict[str, Path] = {name: tmp_path / name for name in ('csv', 'apkg', 'media', 'config')}
+    for path in dirs.values():
+        path.mkdir()
+
+    monkeypatch.setattr(auto_generator, 'MEDIA_DIR', dirs['media'])
+    monkeypatch.setattr(
+        auto_generator, 'GenerationHistory', partial(GenerationHistory, dirs['apkg'] / 'generation_history.db', None)
+    )
+    monkeypatch.setattr(ids, '_default_registry', ids.IdRegistry(dirs['config'] / 'id_registry.json'))
+    return SimpleNamespace(**dirs)
+
+
+@pytest.fixture
+def basic_deck(project) -> Path:
+    """A small two-column deck"""
+    return write_csv(project.csv / 'basic_words.csv', ['Front', 'Back'], [
+        ['hola', 'hello'],
+        ['adiós', 'goodbye'],
+        ['gracias', 'thank you'],
+    ])
@@ -0,0 +1,48 @@
+"""Smoke tests for the auto_generate_decks command line"""
+
+import sys
+import json
+
+import pytest
+
+import auto_generate_decks
+
+
+@pytest.fixture
+def run_cli(project, monkeypatch):
+    """Run auto_generate_decks.py with the given arguments against the scratch project"""
+    monkeypatch.setattr(auto_generate_decks, 'CSV_DIR', project.csv)
+    monkeypatch.setattr(auto_generate_decks, 'OUTPUT_DIR', project.apkg)
+    monkeypatch.setattr(auto_generate_decks, 'MEDIA_DIR', project.media)
+
+    def run(*argv: str) -> None:
+        monkeypatch.setattr(sys, 'argv', ['auto_generate_decks.py', *argv])
+        auto_generate_decks.main()
+
+    return run
+
+
+class TestGenerateCommand:
+    """Tests for the generate command"""
+
+    def test_generate_without_profile(self, run_cli, project, basic_deck):
+        """Test that a plain build writes the deck"""
+        run_cli('generate')
+
+        assert (project.apkg / 'basic_words.apkg').exists()
+        assert not (project.apkg / 'profile.json').exists()
+
+    def test_generate_merge_without_profile(self, run_cli, project, basic_deck):
+        """Test that a merged build writes the merged deck"""
+        run_cli('generate', '--merge', '--merge-name', 'all_words')
+
+        assert (project.apkg / 'all_words.apkg').exists()
+
+    def test_generate_with_profile(self, run_cli, project, basic_deck, capsys):
+        """Test that a profiled build writes the deck and a report of its stages"""
+        run_cli('generate', '--profile')
+
+        assert (project.apkg / 'basic_words.apkg').exists()
+        report = json.loads((project.apkg / 'profile.json').read_text())
+        assert [deck['name'] for deck in report['decks']] == ['basic_words.csv']
+        assert 'parse' in report['decks'][0]['stages']
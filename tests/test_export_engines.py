@@ -0,0 +1,77 @@
+"""Tests that the genanki and sqlite export engines write the same packages"""
+
+import json
+import sqlite3
+import zipfile
+
+import genanki
+import pytest
+
+from anki_deck_generator.core import create_dynamic_deck_generator
+
+from tests.conftest import write_csv
+
+# Model JSON keys that change with every export
+VOLATILE_MODEL_KEYS = ('mod',)
+
+
+def read_collection(apkg_path, tmp_path):
+    """Return the notes, cards and models of a package, without IDs or timestamps"""
+    db_path = tmp_path / f'{apkg_path.stem}.anki2'
+    with zipfile.ZipFile(apkg_path) as package:
+        db_path.write_bytes(package.read('collection.anki2'))
+
+    conn = sqlite3.connect(db_path)
+    try:
+        notes = conn.execute('SELECT guid, mid, tags, flds, sfld, csum FROM notes ORDER BY id').fetchall()
+        cards = conn.execute(
+            'SELECT notes.guid, cards.did, cards.ord FROM cards JOIN notes ON notes.id = cards.nid ORDER BY cards.id'
+        ).fetchall()
+        models = json.loads(conn.execute('SELECT models FROM col').fetchone()[0])
+    finally:
+        conn.close()
+    for model in models.values():
+        for key in VOLATILE_MODEL_KEYS:
+            model.pop(key, None)
+    return notes, cards, models
+
+
+@pytest.fixture
+def export(project, tmp_path):
+    """Build a deck from a CSV file and export it with an engine"""
+    def run(csv_path, engine, extra_fields=None):
+        generator = create_dynamic_deck_generator(str(csv_path))
+        generator.generate_from_csv(str(csv_path), {field['name']: field['name'] for field in generator.model.fields})
+        if extra_fields:
+            generator.deck.add_note(genanki.Note(model=generator.model, fields=extra_fields, tags=['extra']))
+        output_path = tmp_path / f'{engine}.apkg'
+        generator.export_to_apkg(str(output_path), engine=engine)
+        return read_collection(output_path, tmp_path)
+    return run
+
+
+class TestExportEngines:
+    def test_basic_deck(self, basic_deck, export):
+        assert export(basic_deck, 'sqlite') == export(basic_deck, 'genanki')
+
+    def test_tags_and_empty_fields(self, project, export):
+        csv_path = write_csv(project.csv / 'tagged.csv', ['Front', 'Back', 'Tags'], [
+            ['uno', 'one', 'numbers easy'],
+            ['dos', 'two', ''],
+            ['', 'empty front', 'odd'],
+        ])
+        assert export(csv_path, 'sqlite') == export(csv_path, 'genanki')
+
+    def test_cloze_deck(self, project, export):
+        csv_path = write_csv(project.csv / 'cloze.csv', ['Text', 'Extra'], [
+            ['{{c1::Madrid}} is in {{c2::Spain}}', ''],
+            ['no cloze here', 'x'],
+        ])
+        sqlite_collection = export(csv_path, 'sqlite')
+        assert sqlite_collection == export(csv_path, 'genanki')
+        assert len(sqlite_collection[1]) == 2
+
+    def test_notes_added_to_the_deck_are_exported(self, basic_deck, export):
+        notes, cards, models = export(basic_deck, 'sqlite', extra_fields=['extra', 'note'])
+        assert (notes, cards, models) == export(basic_deck, 'genanki', extra_fields=['extra', 'note'])
+        assert any(note[3] == 'extra\x1fnote' for note in notes)
@@ -0,0 +1,92 @@
+"""Tests for skipping up-to-date decks with the build manifest"""
+
+import os
+import copy
+
+import pytest
+
+from anki_deck_generator import auto_generator
+from anki_deck_generator.auto_generator import generate_decks_from_directory
+from anki_deck_generator.config import DEFAULT_CONFIG
+from anki_deck_generator.manifest import BuildManifest
+
+from tests.conftest import write_csv
+
+
+@pytest.fixture
+def build(project):
+    """Build the project's decks and return the mtime of each APKG file"""
+    def run(config=None):
+        outputs = generate_decks_from_directory(
+            csv_dir=project.csv, output_dir=project.apkg, custom_config=config or copy.deepcopy(DEFAULT_CONFIG)
+        )
+        return {os.path.basename(path): os.stat(path).st_mtime_ns for path in outputs}
+    return run
+
+
+class TestBuildManifest:
+    def test_unchanged_deck_is_skipped(self, basic_deck, build):
+        first = build()
+        assert build() == first
+
+    def test_touched_but_unchanged_csv_is_skipped(self, basic_deck, build):
+        first = build()
+        os.utime(basic_deck, ns=(0, 0))
+        assert build() == first
+
+    def test_csv_change_rebuilds(self, basic_deck, build):
+        first = build()
+        write_csv(basic_deck, ['Front', 'Back'], [['hola', 'hi']])
+        assert build()['basic_words.apkg'] != first['basic_words.apkg']
+
+    def test_csv_edited_during_the_build_rebuilds(self, basic_deck, build, monkeypatch):
+        generate = auto_generator.generate_deck_from_csv
+
+        def generate_then_edit(csv_path, *args):
+            result = generate(csv_path, *args)
+            write_csv(basic_deck, ['Front', 'Back'], [['hola', 'hi']])
+            return result
+
+        monkeypatch.setattr(auto_generator, 'generate_deck_from_csv', generate_then_edit)
+        first = build()
+        monkeypatch.setattr(auto_generator, 'generate_deck_from_csv', generate)
+        assert build()['basic_words.apkg'] != first['basic_words.apkg']
+
+    def test_config_change_rebuilds(self, basic_deck, build):
+        first = build()
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        config['css'] = '.card { color: red; }'
+        assert build(config)['basic_words.apkg'] != first['basic_words.apkg']
+
+    def test_missing_output_rebuilds(self, basic_deck, build, project):
+        build()
+        os.remove(project.apkg / 'basic_words.apkg')
+        assert 'basic_words.apkg' in build()
+
+    def test_media_change_rebuilds(self, project, build):
+        write_csv(project.csv / 'sounds.csv', ['Front', 'Back'], [['hola', '[sound:hola.mp3]']])
+        (project.media / 'hola.mp3').write_bytes(b'one')
+        first = build()
+        assert build() == first
+
+        (project.media / 'hola.mp3').write_bytes(b'two')
+        assert build()['sounds.apkg'] != first['sounds.apkg']
+
+    def test_media_added_after_build_rebuilds(self, project, build):
+        write_csv(project.csv / 'sounds.csv', ['Front', 'Back'], [['hola', '[sound:hola.mp3]']])
+        first = build()
+        assert build() == first
+
+        (project.media / 'hola.mp3').write_bytes(b'late')
+        assert build()['sounds.apkg'] != first['sounds.apkg']
+
+    def test_decks_using_media(self, project, basic_deck, build):
+        write_csv(project.csv / 'sounds.csv', ['Front', 'Back'], [['hola', '[sound:hola.mp3]']])
+        (project.media / 'hola.mp3').write_bytes(b'sound')
+        write_csv(project.csv / 'later.csv', ['Front', 'Back'], [['adiós', '[sound:adios.mp3]']])
+        build()
+
+        manifest = BuildManifest(project.apkg)
+        assert manifest.decks_using_media({'hola.mp3'}) == ['sounds.csv']
+        assert manifest.decks_using_media({'adios.mp3', 'hola.mp3'}) == ['later.csv', 'sounds.csv']
+        assert manifest.decks_using_media({'other.mp3'}) == []
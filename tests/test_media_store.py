@@ -0,0 +1,116 @@
+"""Tests for the content-addressed media store and packaging from it"""
+
+import os
+import stat
+import hashlib
+import zipfile
+
+import pytest
+
+from anki_deck_generator.apkg_writer import write_package_file
+from anki_deck_generator.auto_generator import generate_deck_from_csv
+from anki_deck_generator.media_store import MediaStore
+from anki_deck_generator.merge import merge_packages
+
+from tests.conftest import write_csv
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def store(project) -> MediaStore:
+    return MediaStore(project.media)
+
+
+class TestMediaStore:
+    def test_put_keeps_a_separate_read_only_copy(self, project, store):
+        path = project.media / 'a.mp3'
+        path.write_bytes(b'sound')
+
+        digest = store.put(str(path))
+        target = store.object_path(digest)
+
+        assert digest == sha256(b'sound')
+        assert not os.path.samefile(path, target)
+        assert stat.S_IMODE(os.stat(target).st_mode) & 0o222 == 0
+        assert target.read_bytes() == b'sound'
+
+    def test_editing_a_file_in_place_leaves_the_object_alone(self, project, store):
+        path = project.media / 'a.mp3'
+        path.write_bytes(b'sound')
+        target = store.object_path(store.put(str(path)))
+
+        with open(path, 'r+b') as f:
+            f.write(b'SOUND')
+
+        assert target.read_bytes() == b'sound'
+
+    def test_put_replaces_hard_linked_objects(self, project, store):
+        path = project.media / 'a.mp3'
+        path.write_bytes(b'sound')
+        target = store.object_path(sha256(b'sound'))
+        target.parent.mkdir(parents=True)
+        os.link(path, target)
+
+        store.put(str(path))
+
+        assert not os.path.samefile(path, target)
+
+    def test_deduplicate_splits_hard_links(self, project, store):
+        first = project.media / 'a.mp3'
+        second = project.media / 'b.mp3'
+        first.write_bytes(b'sound')
+        os.link(first, second)
+
+        store.deduplicate()
+        with open(second, 'r+b') as f:
+            f.write(b'SOUND')
+
+        assert first.read_bytes() == b'sound'
+        assert store.object_path(sha256(b'sound')).read_bytes() == b'sound'
+
+    def test_deduplicate_keeps_duplicates_independent(self, project, store):
+        first = project.media / 'a.mp3'
+        second = project.media / 'b.mp3'
+        first.write_bytes(b'sound')
+        second.write_bytes(b'sound')
+
+        store.deduplicate()
+        second.write_bytes(b'other')
+
+        assert first.read_bytes() == b'sound'
+        assert store.stats()['unique'] == 2
+
+
+class TestPackaging:
+    def test_package_media_is_streamed_from_the_file(self, project, store, tmp_path):
+        path = project.media / 'a.mp3'
+        path.write_bytes(b'sound')
+        db_path = tmp_path / 'collection.anki2'
+        db_path.write_bytes(b'')
+
+        write_package_file(str(db_path), str(tmp_path / 'deck.apkg'), [str(path)])
+
+        with zipfile.ZipFile(tmp_path / 'deck.apkg') as package:
+            assert package.read('0') == b'sound'
+            assert package.getinfo('0').comment == sha256(b'sound').encode('ascii')
+        assert not store.store_dir.exists()
+
+    def test_merge_reuses_recorded_digests(self, project, tmp_path):
+        (project.media / 'hola.mp3').write_bytes(b'sound')
+        outputs = []
+        for name in ('one', 'two'):
+            csv_path = write_csv(project.csv / f'{name}.csv', ['Front', 'Back'], [[name, '[sound:hola.mp3]']])
+            output_path, media_files, _ = generate_deck_from_csv(str(csv_path), project.apkg)
+            assert media_files
+            outputs.append(output_path)
+
+        merged = str(project.apkg / 'merged.apkg')
+        merge_packages(outputs, merged, 1, 'merged')
+
+        with zipfile.ZipFile(merged) as package:
+            media = [info for info in package.infolist() if info.filename.isdigit()]
+            assert len(media) == 1
+            assert media[0].comment == sha256(b'sound').encode('ascii')
@@ -0,0 +1,136 @@
+"""Tests for merging generated decks into one package"""
+
+import json
+import sqlite3
+import zipfile
+
+import genanki
+import pytest
+
+from anki_deck_generator import ids
+from anki_deck_generator.apkg_writer import ApkgWriter, write_package_file
+from anki_deck_generator.auto_generator import generate_deck_from_csv, merge_decks
+from anki_deck_generator.merge import merge_packages
+
+# Every test package is written at the same time, so their note and card IDs overlap
+TIMESTAMP = 1_700_000_000.0
+
+MODEL = genanki.Model(
+    1_234_567_890, 'Basic: Front, Back',
+    fields=[{'name': 'Front'}, {'name': 'Back'}],
+    templates=[
+        {'name': 'Card 1', 'qfmt': '{{Front}}', 'afmt': '{{Back}}'},
+        {'name': 'Card 2', 'qfmt': '{{Back}}', 'afmt': '{{Front}}'},
+    ],
+)
+
+
+def read_collection(apkg_path, tmp_path):
+    """Return an open connection to the collection of a package"""
+    db_path = tmp_path / 'merged.anki2'
+    with zipfile.ZipFile(apkg_path) as package:
+        db_path.write_bytes(package.read('collection.anki2'))
+    return sqlite3.connect(db_path)
+
+
+@pytest.fixture
+def package(tmp_path):
+    """Write a package with one two-card note per row"""
+    def write(name, rows, media=None):
+        db_path = tmp_path / f'{name}.anki2'
+        with ApkgWriter(str(db_path), MODEL, ids.stable_id('deck', name), name, TIMESTAMP) as writer:
+            writer.add_notes(rows, [name])
+        media_files = []
+        for media_name, data in (media or {}).items():
+            media_dir = tmp_path / name
+            media_dir.mkdir(exist_ok=True)
+            (media_dir / media_name).write_bytes(data)
+            media_files.append(str(media_dir / media_name))
+        output_path = tmp_path / f'{name}.apkg'
+        write_package_file(str(db_path), str(output_path), media_files)
+        return str(output_path)
+    return write
+
+
+class TestMergePackages:
+    def test_overlapping_ids_are_offset(self, package, tmp_path):
+        first = package('first', [('uno', 'one'), ('dos', 'two')])
+        second = package('second', [('tres', 'three'), ('cuatro', 'four')])
+
+        merged = str(tmp_path / 'merged.apkg')
+        assert merge_packages([first, second], merged, 1, 'Merged') == (4, 8, 0)
+
+        conn = read_collection(merged, tmp_path)
+        note_ids = [row[0] for row in conn.execute('SELECT id FROM notes')]
+        card_ids = [row[0] for row in conn.execute('SELECT id FROM cards')]
+        orphans = conn.execute('SELECT COUNT(*) FROM cards WHERE nid NOT IN (SELECT id FROM notes)').fetchone()[0]
+        tags = {row[0].strip() for row in conn.execute('SELECT tags FROM notes')}
+        conn.close()
+
+        assert len(set(note_ids)) == 4
+        assert len(set(card_ids)) == 8
+        assert orphans == 0
+        assert tags == {'first', 'second'}
+
+    def test_duplicate_guids_are_skipped(self, package, tmp_path):
+        first = package('first', [('uno', 'one'), ('dos', 'two')])
+        second = package('second', [('dos', 'two'), ('tres', 'three')])
+
+        merged = str(tmp_path / 'merged.apkg')
+        assert merge_packages([first, second], merged, 1, 'Merged') == (3, 6, 1)
+
+        conn = read_collection(merged, tmp_path)
+        rows = conn.execute('SELECT flds, tags FROM notes ORDER BY id').fetchall()
+        conn.close()
+        assert [flds for flds, _ in rows] == ['uno\x1fone', 'dos\x1ftwo', 'tres\x1fthree']
+        # The first package's copy of the duplicate is kept
+        assert rows[1][1].strip() == 'first'
+
+    def test_decks_become_subdecks_sharing_one_model(self, package, tmp_path):
+        first = package('first', [('uno', 'one')])
+        second = package('second', [('dos', 'two')])
+
+        merged = str(tmp_path / 'merged.apkg')
+        merge_packages([first, second], merged, 1, 'Merged')
+
+        conn = read_collection(merged, tmp_path)
+        decks = json.loads(conn.execute('SELECT decks FROM col').fetchone()[0])
+        models = json.loads(conn.execute('SELECT models FROM col').fetchone()[0])
+        conn.close()
+        assert {'Merged', 'Merged::first', 'Merged::second'} <= {deck['name'] for deck in decks.values()}
+        assert len(models) == 1
+
+    def test_media_name_conflicts_are_renamed(self, package, tmp_path):
+        first = package('first', [('uno', '[sound:a.mp3]')], {'a.mp3': b'one'})
+        second = package('second', [('dos', '[sound:a.mp3]')], {'a.mp3': b'two'})
+        third = package('third', [('tres', '[sound:a.mp3]')], {'a.mp3': b'one'})
+
+        merged = str(tmp_path / 'merged.apkg')
+        merge_packages([first, second, third], merged, 1, 'Merged')
+
+        with zipfile.ZipFile(merged) as zf:
+            media = json.loads(zf.read('media'))
+            contents = {name: zf.read(member) for member, name in media.items()}
+        conn = read_collection(merged, tmp_path)
+        backs = [row[0].split('\x1f')[1] for row in conn.execute('SELECT flds FROM notes ORDER BY id')]
+        conn.close()
+
+        renamed = next(name for name in contents if name != 'a.mp3')
+        assert contents == {'a.mp3': b'one', renamed: b'two'}
+        assert backs == ['[sound:a.mp3]', f'[sound:{renamed}]', '[sound:a.mp3]']
+
+
+class TestMergeDecks:
+    def test_merged_deck_id_differs_from_a_deck_of_the_same_name(self, project, basic_deck, tmp_path):
+        output_path, _, _ = generate_deck_from_csv(str(basic_deck), project.apkg)
+
+        merged_path = merge_decks([output_path], 'basic_words', tmp_path)
+
+        deck_id = ids.get_id_registry().ids_for('basic_words')[1]
+        conn = read_collection(merged_path, tmp_path)
+        decks = json.loads(conn.execute('SELECT decks FROM col').fetchone()[0])
+        conn.close()
+        merged = [deck for deck in decks.values() if deck['name'] == 'basic_words']
+        assert len(merged) == 1
+        assert merged[0]['id'] != deck_id
+        assert merged[0]['id'] == ids.get_id_registry().ids_for('merge:basic_words')[1]
@@ -0,0 +1,67 @@
+"""Tests that the csv module fast path reads decks exactly like pandas"""
+
+import pandas as pd
+import pytest
+
+from anki_deck_generator.source import DeckSource
+
+DECKS = {
+    'plain': b'Front,Back\nuno,one\ndos,two\n',
+    'na_values': b'Front,Back,Notes\nNA,n/a,null\nNone,,#N/A\nnan,NaN,ok\n',
+    'short_rows': b'Front,Back,Notes\nuno,one\ndos\ntres,three,x\n',
+    'blank_lines': b'Front,Back\n\nuno,one\n\n\ndos,two\n   \ntres,three\n',
+    'crlf': b'Front,Back\r\nuno,one\r\n\r\ndos,two\r\n',
+    'cr_only': b'Front,Back\runo,one\r\rdos,two\rtres,three\r',
+    'quoted': b'Front,Back\n"uno, dos","line\none"\n"tres",three\n',
+    'bom': b'\xef\xbb\xbfFront,Back\nuno,one\n',
+    'numbers': b'Front,Back\n007,1.50\n1e3,-0\n',
+}
+
+
+def pandas_rows(csv_path, nrows=None):
+    frame = pd.read_csv(csv_path, dtype=str, nrows=nrows).fillna('')
+    return list(zip(*(frame[col].astype(str).tolist() for col in frame.columns)))
+
+
+@pytest.fixture(params=sorted(DECKS))
+def deck(request, tmp_path):
+    path = tmp_path / f'{request.param}.csv'
+    path.write_bytes(DECKS[request.param])
+    return str(path)
+
+
+class TestFastPath:
+    def test_rows_match_pandas(self, deck):
+        source = DeckSource(deck)
+        assert source.rows == pandas_rows(deck)
+        assert source.has_rows
+        assert source.columns == list(pd.read_csv(deck, nrows=0).columns)
+
+    def test_row_counts_match_pandas(self, deck):
+        expected = len(pd.read_csv(deck, dtype=str))
+        assert DeckSource(deck).count_rows() == expected
+        assert DeckSource(deck).row_count == expected
+
+    @pytest.mark.parametrize('n', [1, 2, 5])
+    def test_head_rows_match_pandas(self, deck, n):
+        assert DeckSource(deck).head_rows(n) == pandas_rows(deck, nrows=n)
+
+    def test_head_rows_reuse_the_parse(self, deck):
+        source = DeckSource(deck).load()
+        assert source.head_rows(2) == pandas_rows(deck)[:2]
+
+
+class TestPandasFallback:
+    def test_duplicate_header_is_read_with_pandas(self, tmp_path):
+        path = tmp_path / 'dupes.csv'
+        path.write_bytes(b'Front,Front\nuno,one\n')
+        source = DeckSource(str(path))
+        assert source.rows == pandas_rows(str(path))
+        assert not source.has_rows
+
+    def test_wide_row_is_read_with_pandas(self, tmp_path):
+        path = tmp_path / 'wide.csv'
+        path.write_bytes(b'Front,Back\nuno,one,extra\n')
+        source = DeckSource(str(path))
+        assert source.rows == pandas_rows(str(path))
+        assert source.count_rows() == 1
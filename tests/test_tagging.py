@@ -0,0 +1,121 @@
+"""Tests for the compiled tag inference engine"""
+
+import copy
+
+import pandas as pd
+import pytest
+
+from anki_deck_generator import ids
+from anki_deck_generator.config import DEFAULT_CONFIG
+from anki_deck_generator.core import create_dynamic_deck_generator
+from anki_deck_generator.tagging import get_tag_engine
+
+NOTES = pd.DataFrame({
+    'Spanish': ['voy a comer', 'ser o estar', 'hola', '<img src="a.png">', 'NA'],
+    'English': ['', '', 'past tense', '', ''],
+    'Tags': ['x, y', '', 'z', '', 'w'],
+})
+
+EXPECTED_NOTE_TAGS = [
+    ['base', 'ir-a', 'x', 'y'],
+    ['base', 'ser-estar'],
+    ['base', 'past', 'z'],
+    ['base', 'media'],
+    ['base', 'w'],
+]
+
+
+@pytest.fixture
+def config():
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    config['custom_tags'] = {
+        '*_verb_*.csv': ['verbs'],
+        'spanish': ['es'],
+        '[ab]*.csv': ['ab'],
+    }
+    return config
+
+
+class TestDeckTags:
+    @pytest.mark.parametrize('filename, expected', [
+        ('spanish_verb_present.csv', ['verbs', 'es']),
+        ('verb_list.csv', []),
+        ('a_spanish.csv', ['es', 'ab']),
+        ('c_verb_x.csv.bak', []),
+        ('SPANISH_verb_x.csv', ['verbs']),
+    ])
+    def test_custom_tag_patterns(self, config, filename, expected):
+        assert get_tag_engine(config).custom_tags(filename) == expected
+
+    def test_glob_patterns_match_the_whole_name(self, config):
+        engine = get_tag_engine(config)
+        assert engine.custom_tags('spanish_verb_present.csv') == ['verbs', 'es']
+        assert 'verbs' not in engine.custom_tags('my_verb_.csv.txt')
+
+    def test_inferred_deck_tags(self, config):
+        tags = get_tag_engine(config).tags_for('spanish_present_verbs.csv', ['Spanish', 'English'], 'spanish', False)
+        assert tags == ['spanish', 'auto-generated', 'basic', 'present', 'verbs', 'es', 'verb', 'translation']
+
+    def test_disabled_filters_drop_their_tags(self, config):
+        config['tag_filters'] = dict(config['tag_filters'], grammar=False, filename=False, source=False)
+        tags = get_tag_engine(config).tags_for('spanish_present_verbs.csv', ['Spanish', 'English'], 'spanish', False)
+        assert 'verb' not in tags
+        assert 'auto-generated' not in tags
+        assert 'verbs' not in tags
+
+    def test_engine_is_built_once_per_configuration(self, config):
+        engine = get_tag_engine(config)
+        assert get_tag_engine(copy.deepcopy(config)) is engine
+        config['custom_tags'] = {'*.csv': ['all']}
+        assert get_tag_engine(config) is not engine
+
+
+class TestNoteTags:
+    def test_content_and_tags_column(self, config):
+        assert get_tag_engine(config).note_tags(NOTES, ['base']) == EXPECTED_NOTE_TAGS
+
+    def test_rows_match_the_data_frame(self, config):
+        rows = list(NOTES.itertuples(index=False, name=None))
+        assert get_tag_engine(config).row_tags(rows, list(NOTES.columns), ['base']) == EXPECTED_NOTE_TAGS
+
+    @pytest.mark.parametrize('text, expected', [
+        ('Voy para casa', ['base']),
+        ('Lo hice por ti', ['base']),
+        ('Quiero ser médico', ['base']),
+        ('Está cansado', ['base']),
+        ('Por vs para', ['base', 'por-para']),
+        ('estar o ser', ['base', 'ser-estar']),
+        ('Es para ti, gracias por todo', ['base', 'por-para']),
+    ])
+    def test_contrasts_need_both_words(self, config, text, expected):
+        notes = pd.DataFrame({'Spanish': [text], 'English': ['']})
+        assert get_tag_engine(config).note_tags(notes, ['base']) == [expected]
+        rows = list(notes.itertuples(index=False, name=None))
+        assert get_tag_engine(config).row_tags(rows, list(notes.columns), ['base']) == [expected]
+
+    def test_text_columns_limit_the_scan(self, config):
+        tags = get_tag_engine(config).note_tags(NOTES, ['base'], text_columns=['English'])
+        assert tags[0] == ['base', 'x', 'y']
+        assert tags[2] == ['base', 'past', 'z']
+
+    def test_disabled_note_content(self, config):
+        config['tag_filters'] = dict(config['tag_filters'], note_content=False)
+        tags = get_tag_engine(config).note_tags(NOTES, ['base'])
+        assert tags == [['base', 'x', 'y'], ['base'], ['base', 'z'], ['base'], ['base', 'w']]
+
+    def test_generated_notes_get_their_tags(self, tmp_path, monkeypatch, config):
+        monkeypatch.setattr(ids, '_default_registry', ids.IdRegistry(tmp_path / 'id_registry.json'))
+        csv_path = tmp_path / 'phrases.csv'
+        pd.DataFrame({
+            'Spanish': ['voy a comer', 'hola'],
+            'English': ["I'm going to eat", 'hello'],
+            'Tags': ['food', ''],
+        }).to_csv(csv_path, index=False)
+        generator = create_dynamic_deck_generator(str(csv_path), custom_config=config)
+        field_mapping = {field['name']: field['name'] for field in generator.model.fields}
+        generator.generate_from_csv(str(csv_path), field_mapping)
+
+        first, second = (note.tags for note in generator.deck.notes)
+        assert first[:len(generator.tags)] == generator.tags
+        assert {'ir-a', 'food'} <= set(first)
+        assert second == generator.tags
@@ -0,0 +1,103 @@
+"""Tests for the compiled template cache and shared note models"""
+
+import copy
+
+import genanki
+import pytest
+
+from anki_deck_generator.config import DEFAULT_CONFIG, _freeze
+from anki_deck_generator.core import create_dynamic_deck_generator
+from anki_deck_generator.templates import clear_template_cache, compile_templates
+
+from tests.conftest import write_csv
+
+COLUMNS = ['Spanish', 'English', 'Example']
+
+
+@pytest.fixture
+def config():
+    return copy.deepcopy(DEFAULT_CONFIG)
+
+
+class TestTemplateCache:
+    def test_same_signature_is_compiled_once(self, config):
+        assert compile_templates(config, COLUMNS, False) is compile_templates(copy.deepcopy(config), COLUMNS, False)
+
+    def test_frozen_snapshot_matches_plain_config(self, config):
+        assert compile_templates(_freeze(config), COLUMNS, False) is compile_templates(config, COLUMNS, False)
+
+    @pytest.mark.parametrize('change', [
+        lambda config: config.update(create_reversed=not config.get('create_reversed', False)),
+        lambda config: config.update(templates={'basic': {'name': 'Custom', 'qfmt': '<i>{{Front}}</i>'}}),
+    ])
+    def test_config_changes_miss_the_cache(self, config, change):
+        before = compile_templates(config, COLUMNS, False)
+        change(config)
+        assert compile_templates(config, COLUMNS, False) is not before
+
+    def test_clearing_the_cache_compiles_again(self, config):
+        compiled = compile_templates(config, COLUMNS, False)
+        clear_template_cache()
+        assert compile_templates(config, COLUMNS, False) is not compiled
+
+    def test_columns_and_cloze_are_part_of_the_key(self, config):
+        basic = compile_templates(config, COLUMNS, False)
+        assert compile_templates(config, COLUMNS[:2], False) is not basic
+        cloze = compile_templates(config, COLUMNS, True)
+        assert cloze.model_type == genanki.Model.CLOZE
+        assert basic.model_type == 0
+
+    def test_templates_are_copies(self, config):
+        compiled = compile_templates(config, COLUMNS, False)
+        compiled.templates()[0]['qfmt'] = 'changed'
+        assert compiled.templates()[0]['qfmt'] != 'changed'
+
+    def test_custom_template_placeholders_use_the_columns(self, config):
+        config['templates'] = {'basic': {'name': 'Custom', 'qfmt': '<i>{{Front}}</i>', 'afmt': '{{Back}}'}}
+        template = compile_templates(config, COLUMNS, False).templates()[0]
+        assert template['qfmt'] == '<i>{{Spanish}}</i>'
+        assert template['afmt'].startswith('{{English}}')
+        assert '{{Example}}' in template['afmt']
+
+
+class TestSharedModels:
+    @pytest.fixture
+    def decks(self, project):
+        return [
+            write_csv(project.csv / f'{name}.csv', COLUMNS, [['hola', 'hello', 'Hola, amigo']])
+            for name in ('greetings', 'phrases')
+        ]
+
+    def test_same_structure_shares_one_model(self, decks, config):
+        first, second = (create_dynamic_deck_generator(str(path), custom_config=config) for path in decks)
+        assert first.model.model_id == second.model.model_id
+        assert first.model.name == second.model.name == 'Basic: Spanish, English, Example'
+        assert first.deck_id != second.deck_id
+
+    def test_styling_keeps_the_model_id(self, decks, config):
+        before = create_dynamic_deck_generator(str(decks[0]), custom_config=config)
+        config['css'] = '.card { color: red; }'
+        config['templates'] = {'basic': {'name': 'Basic Card', 'qfmt': '<b>{{Front}}</b>'}}
+        after = create_dynamic_deck_generator(str(decks[0]), custom_config=config)
+
+        assert after.model.model_id == before.model.model_id
+        assert after.model.css == '.card { color: red; }'
+        assert after.model.templates[0]['qfmt'] == '<b>{{Spanish}}</b>'
+
+    def test_card_types_change_the_model_id(self, decks, config):
+        before = create_dynamic_deck_generator(str(decks[0]), custom_config=config)
+        config['create_reversed'] = not config.get('create_reversed', False)
+        after = create_dynamic_deck_generator(str(decks[0]), custom_config=config)
+        assert after.model.model_id != before.model.model_id
+
+    def test_different_columns_get_different_models(self, project, decks, config):
+        other = write_csv(project.csv / 'other.csv', ['English', 'Spanish'], [['hello', 'hola']])
+        first = create_dynamic_deck_generator(str(decks[0]), custom_config=config)
+        second = create_dynamic_deck_generator(str(other), custom_config=config)
+        assert first.model.model_id != second.model.model_id
+
+    def test_sharing_can_be_turned_off(self, decks, config):
+        config['share_models'] = False
+        first, second = (create_dynamic_deck_generator(str(path), custom_config=config) for path in decks)
+        assert first.model.model_id != second.model.model_id
+        assert first.model.name == 'Greetings Model'
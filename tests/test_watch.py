@@ -0,0 +1,69 @@
+"""Tests for working out which decks a watch event rebuilds"""
+
+import csv
+
+import pytest
+
+from anki_deck_generator.watch import plan_rebuild
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    dirs = {key: tmp_path / name for key, name in (
+        ('csv_dir', 'csv'), ('media_dir', 'media'), ('config_dir', 'config'), ('templates_dir', 'templates')
+    )}
+    for path in dirs.values():
+        path.mkdir()
+    return dirs
+
+
+@pytest.fixture
+def basic_deck(dirs):
+    return write_csv(dirs['csv_dir'] / 'basic_words.csv', ['Front', 'Back'], [['hola', 'hello']])
+
+
+class TestPlanRebuild:
+    def test_changed_and_removed_csv_files(self, dirs, basic_deck):
+        plan = plan_rebuild({str(basic_deck), str(dirs['csv_dir'] / 'gone.csv')}, **dirs)
+        assert plan['csv_files'] == {'basic_words.csv'}
+        assert plan['removed'] == {'gone.csv'}
+        assert not plan['config']
+
+    def test_media_config_and_templates(self, dirs):
+        changed = {
+            str(dirs['media_dir'] / 'hola.mp3'),
+            str(dirs['config_dir'] / 'config.json'),
+            str(dirs['templates_dir'] / 'basic.html'),
+        }
+        plan = plan_rebuild(changed, **dirs)
+        assert plan['media'] == {'hola.mp3'}
+        assert plan['config']
+        assert plan['templates'] == {str(dirs['templates_dir'] / 'basic.html')}
+
+    @pytest.mark.parametrize('name', ['.basic_words.csv.swp', 'basic_words.csv~', '#basic_words.csv#', 'x.tmp'])
+    def test_editor_files_are_ignored(self, dirs, name):
+        plan = plan_rebuild({str(dirs['csv_dir'] / name), str(dirs['media_dir'] / name)}, **dirs)
+        assert plan['csv_files'] == plan['removed'] == plan['media'] == set()
+
+    def test_other_config_files_and_directories_are_ignored(self, dirs, tmp_path):
+        plan = plan_rebuild({
+            str(dirs['config_dir'] / 'id_registry.json'),
+            str(tmp_path / 'elsewhere' / 'deck.csv'),
+            str(dirs['csv_dir'] / 'notes.txt'),
+        }, **dirs)
+        assert plan == {'csv_files': set(), 'removed': set(), 'media': set(), 'config': False, 'templates': set()}
+
+    def test_directory_event_rescans_it(self, dirs, basic_deck):
+        write_csv(dirs['csv_dir'] / 'other.csv', ['Front', 'Back'], [['a', 'b']])
+        (dirs['media_dir'] / 'hola.mp3').write_bytes(b'sound')
+        plan = plan_rebuild({str(dirs['csv_dir']), str(dirs['media_dir'])}, **dirs)
+        assert plan['csv_files'] == {'basic_words.csv', 'other.csv'}
+        assert plan['media'] == {'hola.mp3'}